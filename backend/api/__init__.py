@@ -5,6 +5,8 @@ from .pikpak import router as pikpak_router
 from .client import router as client_router
 from .episodes import router as episodes_router
 from .logs import router as logs_router
+from .status import router as status_router
+from .jobs import router as jobs_router
 
 # 创建主路由
 from config.settings import settings
@@ -18,5 +20,7 @@ api_router.include_router(pikpak_router)
 api_router.include_router(client_router)
 api_router.include_router(episodes_router)
 api_router.include_router(logs_router)
+api_router.include_router(status_router)
+api_router.include_router(jobs_router)
 
 __all__ = ["api_router"]
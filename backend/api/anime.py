@@ -2,58 +2,102 @@
 动漫相关路由
 """
 
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
 
 from services.anime import AnimeSearch
 from services.bangumi import BangumiApi
-from database.pikpak import PikPakDatabase
+from database import get_anime_db
+from database.paging import ANIME_LIST_FIELDS, parse_fields
 from config.settings import settings
 from services.pikpak import PikPakService
 from schemas.anime import SearchRequest, AnimeInfoRequest
 from exceptions import ValidationException, SystemException, NotFoundException
 from utils import success
+from utils.responses import encode_success, encoded_response
+from utils.response_cache import response_cache
+from utils.streaming import check_format, stream_response
+from utils.http_cache import make_etag, not_modified, with_cache_headers
 
 router = APIRouter(prefix="/anime", tags=["动漫"])
 
 
 @router.post("/search")
-async def search(request: SearchRequest):
-    """搜索动漫资源"""
+async def search(
+    request: SearchRequest,
+    format: Optional[str] = Query(None, description="json（默认）或 ndjson"),
+):
+    """搜索动漫资源（逐页流式返回）"""
 
     if not request.name:
         raise ValidationException("请指定动漫名称")
 
     anime_search = AnimeSearch()
-    data = await anime_search.search_anime(request.name)
-
-    return success(data, f"找到 {len(data)} 个 {request.name} 相关资源")
+    return await stream_response(
+        anime_search.iter_anime(request.name),
+        format,
+        head={"code": 200},
+        tail=lambda count: {"msg": f"找到 {count} 个 {request.name} 相关资源"},
+    )
 
 
 @router.get("/list")
-async def get_anime_list():
-    """获取动漫列表"""
-    db = PikPakDatabase()
-    result = db.load_data()
-
-    # 解析成表格数据
-    animes_container = result.get("animes", {}).get(settings.ANIME_CONTAINER_ID, {})
+async def get_anime_list(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="每页条数，不传返回全部"),
+    after: Optional[str] = Query(None, description="上一页的 next_cursor"),
+    fields: Optional[str] = Query(
+        None, description="返回的字段，逗号分隔，如 id,title,cover_url"
+    ),
+    format: Optional[str] = Query(None, description="json（默认）或 ndjson"),
+):
+    """
+    获取动漫列表
+
+    不传 limit/after 时返回完整列表；分页时返回 {items, next_cursor, total}；
+    format=ndjson 时每行返回一部动漫
+    """
+    db = get_anime_db()
+    if check_format(format) == "ndjson":
+        # 逐条生成记录，不在内存中构建整页列表
+        return await stream_response(
+            db.iter_animes(
+                settings.ANIME_CONTAINER_ID,
+                limit=limit,
+                after=after,
+                fields=parse_fields(fields, ANIME_LIST_FIELDS),
+            ),
+            "ndjson",
+        )
 
-    if not animes_container:
-        raise NotFoundException("动漫列表", "任何动漫")
+    version = await db.listing_version()
+    etag = make_etag(request, version)
+    cached = not_modified(request, etag, "anime_list")
+    if cached is not None:
+        return cached
 
-    anime_list = []
-    for anime_id, anime_info in animes_container.items():
-        anime_list.append(
-            {
-                "id": anime_id,
-                "title": anime_info.get("title", ""),
-                "status": anime_info.get("status", "连载"),
-                "cover_url": anime_info.get("cover_url", ""),
-                "summary": anime_info.get("summary", ""),
-            }
+    async def build() -> bytes:
+        page = await db.list_animes(
+            settings.ANIME_CONTAINER_ID,
+            limit=limit,
+            after=after,
+            fields=parse_fields(fields, ANIME_LIST_FIELDS),
         )
 
-    return success(anime_list, "获取动漫列表成功")
+        if not page["total"]:
+            raise NotFoundException("动漫列表", "任何动漫")
+
+        if limit is None and after is None:
+            return encode_success(page["items"], "获取动漫列表成功")
+        return encode_success(page, "获取动漫列表成功")
+
+    if limit is None and after is None:
+        # 完整列表预编码缓存，列表字段变化或增删动漫后失效
+        body = await response_cache.get_or_build(("anime_list", fields), version, build)
+    else:
+        body = await build()
+    return with_cache_headers(encoded_response(body), etag, "anime_list")
 
 
 @router.post("/info")
@@ -71,8 +115,10 @@ async def get_anime_info(request: SearchRequest):
 @router.post("/info/id")
 async def get_anime_info_by_id(request: AnimeInfoRequest):
     """根据ID获取动漫信息（数据库）"""
-    anime_db = PikPakDatabase()
-    anime_info = anime_db.get_anime_detail(request.id, settings.ANIME_CONTAINER_ID)
+    anime_db = get_anime_db()
+    anime_info = await anime_db.aget_anime_detail(
+        request.id, settings.ANIME_CONTAINER_ID
+    )
 
     if not anime_info:
         raise NotFoundException("动漫信息", f"ID: {request.id}")
@@ -85,8 +131,8 @@ async def save_anime_info(request: AnimeInfoRequest):
     """更新动漫信息"""
     try:
         # 获取更新前的动漫信息
-        anime_db = PikPakDatabase()
-        old_anime_info = anime_db.get_anime_detail(
+        anime_db = get_anime_db()
+        old_anime_info = await anime_db.aget_anime_detail(
             request.id, settings.ANIME_CONTAINER_ID
         )
 
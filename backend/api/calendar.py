@@ -2,23 +2,32 @@
 番剧表相关路由
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from loguru import logger
 
 from services.bangumi import BangumiApi
 from exceptions import SystemException
 from utils.responses import success
+from utils.http_cache import make_etag, not_modified, with_cache_headers
 
 router = APIRouter(prefix="/calendar", tags=["番剧表"])
 
 
 @router.get("")
-async def get_calendar():
+async def get_calendar(request: Request):
     """获取当季新番信息"""
     try:
         bangumi_service = BangumiApi()
+        version = bangumi_service.calendar_version()
+        etag = make_etag(request, version) if version else None
+        if etag:
+            cached = not_modified(request, etag, "calendar")
+            if cached is not None:
+                return cached
+
         data = await bangumi_service.load_calendar_data()
-        return success(data, msg="获取番剧表成功")
+        response = success(data, msg="获取番剧表成功")
+        return with_cache_headers(response, etag, "calendar") if etag else response
 
     except SystemException:
         raise
@@ -2,14 +2,19 @@
 客户端路由
 """
 
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
 from loguru import logger
 
-from database.pikpak import PikPakDatabase
+from database import get_anime_db
+from database.paging import SEARCH_FIELDS, parse_fields
 from config.settings import settings
 from schemas.client import SearchRequest
 from exceptions import SystemException
-from utils.responses import success
+from utils.responses import success, encode_success, encoded_response
+from utils.response_cache import response_cache
+from utils.http_cache import make_etag, not_modified, with_cache_headers
 
 router = APIRouter(prefix="/client", tags=["客户端"])
 
@@ -19,8 +24,13 @@ async def search_client(request: SearchRequest):
     """客户端搜索动漫"""
     try:
         logger.debug(f"客户端开始搜索动漫：{request.name}")
-        anime_db = PikPakDatabase()
-        result = await anime_db.search_anime_by_title(request.name)
+        anime_db = get_anime_db()
+        result = await anime_db.search_anime_by_title(
+            request.name,
+            request.limit,
+            after=request.after,
+            fields=parse_fields(request.fields, SEARCH_FIELDS),
+        )
 
         return success(result, msg="搜索客户端动漫成功")
 
@@ -30,15 +40,45 @@ async def search_client(request: SearchRequest):
         raise SystemException(message="搜索客户端动漫失败", original_error=e)
 
 
+@router.get("/suggest")
+async def suggest_client(
+    q: str = Query(..., description="输入的前缀"),
+    k: Optional[int] = Query(None, ge=1, description="返回条数，最多 SUGGEST_TOP_K"),
+):
+    """客户端标题联想"""
+    try:
+        anime_db = get_anime_db()
+        result = await anime_db.suggest_titles(q, k)
+
+        return success(result, msg="获取标题联想成功")
+
+    except SystemException:
+        raise
+    except Exception as e:
+        raise SystemException(message="获取标题联想失败", original_error=e)
+
+
 @router.get("/anime/{anime_id}")
-async def get_client_anime(anime_id: str):
+async def get_client_anime(anime_id: str, request: Request):
     """获取客户端动漫信息"""
     try:
         logger.debug(f"获取客户端动漫信息：{anime_id}")
-        anime_db = PikPakDatabase()
-        result = await anime_db.get_anime_all(anime_id, settings.ANIME_CONTAINER_ID)
+        anime_db = get_anime_db()
+        version = await anime_db.folder_version(settings.ANIME_CONTAINER_ID, anime_id)
+        etag = make_etag(request, version)
+        cached = not_modified(request, etag, "client_anime")
+        if cached is not None:
+            return cached
+
+        async def build() -> bytes:
+            result = await anime_db.get_anime_all(anime_id, settings.ANIME_CONTAINER_ID)
+            return encode_success(result, msg="获取客户端动漫信息成功")
 
-        return success(result, msg="获取客户端动漫信息成功")
+        # 预编码缓存，只有该动漫修改后才失效
+        body = await response_cache.get_or_build(
+            ("client_anime", anime_id), version, build
+        )
+        return with_cache_headers(encoded_response(body), etag, "client_anime")
 
     except SystemException:
         raise
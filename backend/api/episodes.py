@@ -2,53 +2,49 @@
 集数管理路由
 """
 
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Query
 from loguru import logger
 
 from services.pikpak import PikPakService
-from database.pikpak import PikPakDatabase
+from database import get_anime_db
 from config.settings import settings
 from schemas.episodes import EpisodeListRequest, FileDeleteRequest, FileRenameRequest
 from exceptions import SystemException, ValidationException
 from utils.responses import success
+from utils.streaming import stream_response
 
 router = APIRouter(prefix="/episodes", tags=["集数管理"])
 
 
 @router.post("/list")
-async def get_episode_list(request: EpisodeListRequest):
-    """获取动漫文件夹内的所有集数"""
+async def get_episode_list(
+    request: EpisodeListRequest,
+    format: Optional[str] = Query(None, description="json（默认）或 ndjson"),
+):
+    """获取动漫文件夹内的所有集数（流式返回）"""
     try:
         if not request.folder_id:
             raise ValidationException("请指定动漫")
 
-        anime_db = PikPakDatabase()
-        result = anime_db.load_data()
-
-        # 获取json中对应文件夹的集数
-        episode_list = (
-            result.get("animes", {})
-            .get(settings.ANIME_CONTAINER_ID, {})
-            .get(request.folder_id, {})
-            .get("files", [])
+        # 只读取这个文件夹的集数
+        episode_list = await get_anime_db().aget_folder_files(
+            settings.ANIME_CONTAINER_ID, request.folder_id
         )
 
-        logger.info("获取集数：", len(episode_list))
-
-        if episode_list:
-            return {
-                "success": True,
-                "data": episode_list,
-                "total": len(episode_list),
-                "message": "获取集数列表成功",
-            }
-        else:
-            return {
-                "success": True,
-                "data": [],
-                "total": 0,
-                "message": "暂无集数",
-            }
+        logger.info(f"获取集数：{len(episode_list)}")
+
+        # 复制列表引用，发送期间删除集数不影响本次响应
+        return await stream_response(
+            list(episode_list),
+            format,
+            head={"success": True},
+            tail=lambda count: {
+                "total": count,
+                "message": "获取集数列表成功" if count else "暂无集数",
+            },
+        )
 
     except SystemException:
         raise
@@ -74,7 +70,7 @@ async def delete_episodes(request: FileDeleteRequest):
         if result["success"]:
             # 同步数据以更新本地数据库
             logger.info(f" 开始同步数据以更新本地数据库...")
-            sync_result = await pikpak_service.sync_data(client, blocking_wait=True)
+            sync_result = await pikpak_service.sync_data(client)
 
             return {
                 "success": True,
@@ -121,7 +117,7 @@ async def rename_episode(request: FileRenameRequest):
         logger.info("重命名成功，开始更新本地数据库……")
         if result:
             # 更新数据库
-            anime_db = PikPakDatabase()
+            anime_db = get_anime_db()
             res = await anime_db.rename_anime_file(
                 request.file_id,
                 request.new_name,
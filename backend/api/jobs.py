@@ -0,0 +1,97 @@
+"""
+后台任务路由
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import (
+    APIRouter,
+    Header,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from services.jobs import job_queue
+from utils.responses import success
+
+router = APIRouter(prefix="/jobs", tags=["后台任务"])
+
+
+def _sse_frame(event: Optional[Dict[str, Any]]) -> str:
+    """事件编码为 SSE 格式，None 编码为心跳注释"""
+    if event is None:
+        return ": keepalive\n\n"
+    data = json.dumps(event, ensure_ascii=False)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+@router.get("")
+async def list_jobs(
+    status: Optional[str] = Query(None, description="按状态过滤"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """按创建时间倒序列出后台任务"""
+    return success(await job_queue.list(status, limit), "获取后台任务列表成功")
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """获取后台任务的状态、当前阶段和进度"""
+    return success(await job_queue.get(job_id), "获取后台任务成功")
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    after: int = Query(0, ge=0, description="只返回该事件ID之后的事件"),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    以 Server-Sent Events 推送任务进度
+
+    先补发错过的事件再实时推送，任务结束后关闭；
+    断线重连时浏览器自动带上 Last-Event-ID，从该事件之后继续。
+    任务已结束且没有更多事件时返回 204，浏览器的 EventSource 收到后不再重连。
+    """
+    # 任务不存在时直接返回 404，而不是开始一个空的事件流
+    await job_queue.get(job_id)
+    after = max(after, last_event_id or 0)
+    if await job_queue.drained(job_id, after):
+        return Response(status_code=204)
+    events = job_queue.events(job_id, after)
+
+    async def stream():
+        async for event in events:
+            yield _sse_frame(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{job_id}/ws")
+async def job_events_websocket(websocket: WebSocket, job_id: str, after: int = 0):
+    """以 WebSocket 推送任务进度，任务结束后关闭连接"""
+    await websocket.accept()
+    try:
+        await job_queue.get(job_id)
+    except Exception as e:
+        await websocket.close(code=4404, reason=str(e))
+        return
+
+    try:
+        async for event in job_queue.events(job_id, after):
+            if event is None:
+                await websocket.send_text(json.dumps({"type": "keepalive"}))
+            else:
+                await websocket.send_text(json.dumps(event, ensure_ascii=False))
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.debug(f"任务 {job_id} 的事件连接已断开")
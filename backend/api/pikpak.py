@@ -2,10 +2,17 @@
 PikPak相关路由
 """
 
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query
 
 from services.pikpak import PikPakService
-from database.pikpak import PikPakDatabase
+from services.rate_limit import pikpak_limiter
+from services.pikpak_jobs import (
+    submit_batch_download,
+    submit_sync,
+    submit_update_links,
+)
+from database import get_anime_db
 from config.settings import settings
 from schemas.pikpak import (
     DownloadRequest,
@@ -13,61 +20,74 @@ from schemas.pikpak import (
     UpdateAnimeRequest,
     VideoUrlUpdateRequest,
     DeleteAnimeRequest,
+    RateLimitRequest,
 )
 from exceptions import ValidationException, SystemException
+from utils import is_collection
 from utils.responses import success
 
 router = APIRouter(prefix="/pikpak", tags=["PikPak"])
 
 
+def _job_response(job, created: bool, message: str, **extra):
+    """后台任务提交结果，进度通过 /jobs/{job_id}/events 订阅"""
+    return success(
+        {
+            "job_id": job["id"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "created": created,
+            **extra,
+        },
+        f"{message}已提交" if created else f"{message}已存在",
+    )
+
+
 @router.post("/batch-download")
-async def batch_download_anime(request: DownloadRequest):
-    """批量下载动漫"""
+async def batch_download_anime(
+    request: DownloadRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """
+    批量下载动漫
+
+    提交后台任务后立即返回任务ID，下载、重命名和同步在后台依次完成；
+    相同 Idempotency-Key 的重复请求返回同一个任务。
+    """
     try:
         if not request.username or not request.password:
             raise ValidationException("用户名和密码不能为空")
 
-        pikpak_service = PikPakService()
+        # 单季为一组，多季每季一组
+        if request.mode == "single_season" and request.anime_list:
+            groups = [
+                {
+                    "title": request.title,
+                    "anime_list": [a.dict() for a in request.anime_list],
+                }
+            ]
+        elif request.mode == "multi_season" and request.groups:
+            groups = [
+                {
+                    "title": group.title,
+                    "anime_list": [a.dict() for a in group.anime_list],
+                }
+                for group in request.groups
+            ]
+        else:
+            raise ValidationException("请选择下载的动漫")
 
-        # 获取客户端
+        # 提交前先登录，后台任务使用注册表中保存的登录状态，不保存密码
+        pikpak_service = PikPakService()
         try:
-            client = await pikpak_service.get_client(request.username, request.password)
+            await pikpak_service.get_client(request.username, request.password)
         except Exception as e:
             raise ValidationException("PikPak 登录失败，请检查用户名和密码")
 
-        # 处理单季动漫
-        if request.mode == "single_season" and request.anime_list:
-            result = await pikpak_service.batch_download_selected(
-                client, request.anime_list, request.title
-            )
-
-            if not result:
-                raise SystemException(
-                    message="下载失败", original_error="批量下载选择返回空结果"
-                )
-
-            return success(result, "批量下载动漫成功")
-
-        # 处理多季动漫
-        elif request.mode == "multi_season" and request.groups:
-            result = {}
-            # 遍历每一季
-            for group in request.groups:
-                # 调用下载 api
-                result = await pikpak_service.batch_download_selected(
-                    client, group.anime_list, group.title
-                )
-
-                if not result:
-                    # 如果任何一个失败，立即抛出异常
-                    raise SystemException(
-                        message="下载失败", original_error="批量下载选择返回空结果"
-                    )
-
-            return success(result, "批量下载动漫成功")
-
-        else:
-            raise ValidationException("请选择下载的动漫")
+        job, created = await submit_batch_download(
+            request.username, groups, idempotency_key
+        )
+        return _job_response(job, created, "下载任务")
 
     except SystemException:
         raise
@@ -76,7 +96,11 @@ async def batch_download_anime(request: DownloadRequest):
 
 
 @router.post("/sync")
-async def sync_pikpak_data(credentials: PikPakCredentials):
+async def sync_pikpak_data(
+    credentials: PikPakCredentials,
+    background: bool = Query(False, description="作为后台任务执行，立即返回任务ID"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
     """同步PikPak数据"""
     try:
         pikpak_service = PikPakService()
@@ -84,6 +108,10 @@ async def sync_pikpak_data(credentials: PikPakCredentials):
             credentials.username, credentials.password
         )
 
+        if background:
+            job, created = await submit_sync(credentials.username, idempotency_key)
+            return _job_response(job, created, "同步任务")
+
         success = await pikpak_service.sync_data(client)
 
         if success:
@@ -98,7 +126,11 @@ async def sync_pikpak_data(credentials: PikPakCredentials):
 
 
 @router.post("/update-links")
-async def update_anime_links(request: VideoUrlUpdateRequest):
+async def update_anime_links(
+    request: VideoUrlUpdateRequest,
+    background: bool = Query(False, description="作为后台任务执行，立即返回任务ID"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
     """更新指定动漫的播放链接"""
     try:
         if not request.username or not request.password:
@@ -112,109 +144,29 @@ async def update_anime_links(request: VideoUrlUpdateRequest):
 
         pikpak_service = PikPakService()
         client = await pikpak_service.get_client(request.username, request.password)
-        anime_db = PikPakDatabase()
-
-        # 批量更新视频链接
-        success_count = 0
-        failed_count = 0
-        results = []
-
-        for file_id in request.file_ids:
-            try:
-                # 获取视频播放链接
-                try:
-                    play_url = await pikpak_service.get_video_play_url(file_id, client)
-                except SystemException:
-                    raise
-                except Exception as e:
-                    raise SystemException(
-                        message="获取视频播放链接服务异常", original_error=e
-                    )
-
-                if play_url:
-                    # 更新数据库
-                    try:
-                        res = await anime_db.update_anime_file_link(
-                            file_id,
-                            play_url,
-                            settings.ANIME_CONTAINER_ID,
-                            request.folder_id,
-                        )
-                    except SystemException:
-                        raise
-                    except Exception as e:
-                        raise SystemException(
-                            message="更新动漫文件链接数据库异常", original_error=e
-                        )
-
-                    if res["success"]:
-                        results.append(
-                            {
-                                "file_id": file_id,
-                                "success": True,
-                                "play_url": res["data"]["play_url"],
-                                "updated_time": res["data"]["updated_time"],
-                            }
-                        )
-                        success_count += 1
-                    else:
-                        results.append(
-                            {
-                                "file_id": file_id,
-                                "success": False,
-                                "message": "获取链接成功，但更新数据库失败",
-                            }
-                        )
-                        failed_count += 1
-                else:
-                    results.append(
-                        {
-                            "file_id": file_id,
-                            "success": False,
-                            "message": "获取视频链接失败",
-                        }
-                    )
-                    failed_count += 1
-
-            except SystemException:
-                raise
-            except Exception as e:
-                raise SystemException(
-                    message=f"处理文件{file_id}时发生系统异常", original_error=e
-                )
-
-        # 如果有成功更新的文件，更新动漫文件夹的更新时间
-        if success_count > 0:
-            try:
-                folder_update_result = await anime_db.update_anime_info(
-                    request.folder_id, {}, settings.ANIME_CONTAINER_ID
-                )
-
-                # 更新视频链接时间记录
-                video_time_update_result = (
-                    await anime_db.update_folder_video_links_time(
-                        request.folder_id, settings.ANIME_CONTAINER_ID
-                    )
-                )
-
-                if folder_update_result:
-                    print(f"已更新动漫文件夹的更新时间")
-                if video_time_update_result:
-                    print(f"已记录视频链接更新时间")
-
-            except Exception as e:
-                raise SystemException(
-                    message="更新时间记录时发生系统异常", original_error=e
-                )
+
+        if background:
+            job, created = await submit_update_links(
+                request.username,
+                request.folder_id,
+                request.file_ids,
+                idempotency_key,
+            )
+            return _job_response(job, created, "更新链接任务")
+
+        try:
+            data = await pikpak_service.update_file_links(
+                client, request.folder_id, request.file_ids
+            )
+        except SystemException:
+            raise
+        except Exception as e:
+            raise SystemException(message="获取视频播放链接服务异常", original_error=e)
 
         return {
-            "success": success_count > 0,
-            "message": f"更新完成: 成功 {success_count} 个，失败 {failed_count} 个",
-            "data": {
-                "success_count": success_count,
-                "failed_count": failed_count,
-                "results": results,
-            },
+            "success": data["success_count"] > 0,
+            "message": f"更新完成: 成功 {data['success_count']} 个，失败 {data['failed_count']} 个",
+            "data": data,
         }
 
     except SystemException:
@@ -224,8 +176,15 @@ async def update_anime_links(request: VideoUrlUpdateRequest):
 
 
 @router.post("/update-episode")
-async def update_anime_episode(request: UpdateAnimeRequest):
-    """更新动漫集数"""
+async def update_anime_episode(
+    request: UpdateAnimeRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """
+    更新动漫集数
+
+    与批量下载使用同一个后台任务，下载到已有的动漫文件夹后重命名并同步。
+    """
     try:
         if not request.username or not request.password:
             raise ValidationException("请配置PikPak账号密码")
@@ -236,25 +195,29 @@ async def update_anime_episode(request: UpdateAnimeRequest):
         if not request.anime_list or len(request.anime_list) == 0:
             raise ValidationException("请指定要更新的集数")
 
-        pikpak_service = PikPakService()
-        client = await pikpak_service.get_client(request.username, request.password)
-
-        anime_list_dict = []
-        for anime in request.anime_list:
-            anime_list_dict.append(
-                {"id": anime.id, "title": anime.title, "magnet": anime.magnet}
-            )
+        if any(is_collection(anime.title) for anime in request.anime_list):
+            raise ValidationException("更新动漫集数不支持合集，请使用单集更新")
 
-        try:
-            result = await pikpak_service.update_anime_episodes(
-                client, anime_list_dict, request.folder_id
-            )
-        except SystemException:
-            raise
-        except Exception as e:
-            raise SystemException(message="更新动漫集数服务异常", original_code=e)
+        pikpak_service = PikPakService()
+        await pikpak_service.get_client(request.username, request.password)
 
-        return success(result, "更新动漫成功")
+        # 标题只用于任务进度显示
+        detail = await get_anime_db().aget_anime_detail(
+            request.folder_id, settings.ANIME_CONTAINER_ID
+        )
+        groups = [
+            {
+                "title": detail.get("title") or request.folder_id,
+                "folder_id": request.folder_id,
+                "anime_list": [a.dict() for a in request.anime_list],
+            }
+        ]
+        job, created = await submit_batch_download(
+            request.username, groups, idempotency_key
+        )
+        return _job_response(
+            job, created, "更新任务", single_count=len(request.anime_list)
+        )
 
     except SystemException:
         raise
@@ -276,13 +239,13 @@ async def delete_anime(request: DeleteAnimeRequest):
         pikpak_service = PikPakService()
         client = await pikpak_service.get_client(request.username, request.password)
 
-        # 直接调用PikPak API删除文件夹
-        delete_result = await client.delete_to_trash(ids=[request.folder_id])
+        # 删除文件夹
+        delete_result = await pikpak_service.delete_file(client, request.folder_id)
 
-        if delete_result:
+        if delete_result["success"]:
             # 同步数据以更新本地数据库
             print(f"开始同步数据以更新本地数据库...")
-            sync_result = await pikpak_service.sync_data(client, blocking_wait=True)
+            sync_result = await pikpak_service.sync_data(client)
 
             return {
                 "success": True,
@@ -299,3 +262,16 @@ async def delete_anime(request: DeleteAnimeRequest):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"删除动漫失败: {str(e)}")
+
+
+@router.get("/rate-limit")
+async def get_rate_limit():
+    """获取 PikPak API 限流配置和等待情况"""
+    return success(pikpak_limiter.stats(), "获取限流配置成功")
+
+
+@router.put("/rate-limit")
+async def update_rate_limit(request: RateLimitRequest):
+    """调整 PikPak API 限流速率和突发容量，立即生效"""
+    pikpak_limiter.configure(request.rate_per_minute, request.burst)
+    return success(pikpak_limiter.stats(), "限流配置已更新")
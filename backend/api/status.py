@@ -0,0 +1,52 @@
+"""
+系统状态路由
+"""
+
+from fastapi import APIRouter
+
+from database import get_anime_db
+from utils.responses import success
+from utils.response_cache import response_cache
+from services.clients import pikpak_clients
+from services.resolver import play_url_resolver
+from services.listing_cache import folder_listing_cache
+from services.offline_tasks import offline_task_tracker
+
+router = APIRouter(prefix="/status", tags=["系统状态"])
+
+
+@router.get("/catalog")
+async def get_catalog_status():
+    """获取动漫目录缓存状态"""
+    anime_db = get_anime_db()
+    return success(anime_db.get_cache_stats(), "获取目录缓存状态成功")
+
+
+@router.get("/responses")
+async def get_response_cache_status():
+    """获取预编码响应缓存的命中率和内存占用"""
+    return success(response_cache.stats(), "获取响应缓存状态成功")
+
+
+@router.get("/pikpak")
+async def get_pikpak_client_status():
+    """获取 PikPak 登录次数、耗时和令牌状态"""
+    return success(pikpak_clients.stats(), "获取 PikPak 客户端状态成功")
+
+
+@router.get("/play-urls")
+async def get_play_url_resolver_status():
+    """获取播放链接并发获取的并发上限和重试情况"""
+    return success(play_url_resolver.stats(), "获取播放链接解析状态成功")
+
+
+@router.get("/listings")
+async def get_listing_cache_status():
+    """获取 My Pack 文件夹列表缓存的命中率和节省的请求数"""
+    return success(folder_listing_cache.stats(), "获取文件夹列表缓存状态成功")
+
+
+@router.get("/offline-tasks")
+async def get_offline_task_status():
+    """获取离线下载任务跟踪状态"""
+    return success(offline_task_tracker.stats(), "获取离线下载任务状态成功")
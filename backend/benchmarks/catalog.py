@@ -0,0 +1,72 @@
+"""
+基准测试用的合成动漫目录
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+CONTAINER_ID = "bench_container"
+
+
+def make_catalog(
+    anime_count: int = 10_000, files_per_anime: int = 20, seed: int = 0
+) -> Dict[str, Any]:
+    """
+    生成与 data/anime.json 结构一致的合成目录
+
+    Args:
+        anime_count: 动漫数量
+        files_per_anime: 每部动漫的文件数量
+        seed: 随机种子
+
+    Returns:
+        目录数据
+    """
+    rng = random.Random(seed)
+    base_time = datetime(2025, 7, 1)
+    words = [
+        "魔法",
+        "少女",
+        "物语",
+        "勇者",
+        "Slime",
+        "Frieren",
+        "学园",
+        "日常",
+        "Re",
+        "Zero",
+    ]
+
+    folders = {}
+    for i in range(anime_count):
+        folder_id = f"folder{i:07d}"
+        files = []
+        for j in range(files_per_anime):
+            file_id = f"file{i:07d}{j:04d}"
+            update_time = base_time + timedelta(seconds=rng.randint(0, 86400 * 30))
+            files.append(
+                {
+                    "id": file_id,
+                    "name": f"{j + 1:02d}.mkv",
+                    "play_url": f"https://dl.example.com/download/?fid={file_id}&sign="
+                    + "%032x" % rng.getrandbits(128),
+                    "update_time": update_time.isoformat(),
+                }
+            )
+        folders[folder_id] = {
+            "title": f"{rng.choice(words)}{rng.choice(words)} {i}",
+            "status": rng.choice(["连载", "完结"]),
+            "files": files,
+            "updated_at": base_time.isoformat(),
+            "summary": "简介" * 20,
+            "cover_url": f"https://lain.bgm.tv/pic/cover/l/{i}.jpg",
+        }
+
+    return {
+        "animes": {CONTAINER_ID: folders},
+        "metadata": {
+            "created_at": base_time.isoformat(),
+            "last_updated": base_time.isoformat(),
+        },
+    }
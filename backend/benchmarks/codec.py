@@ -0,0 +1,52 @@
+"""
+目录编解码器基准测试
+
+用法（在 backend 目录下）:
+    python -m benchmarks.codec [anime_count] [files_per_anime]
+"""
+
+import sys
+import time
+
+from benchmarks.catalog import make_catalog
+from database import codec as codec_module
+from database.codec import CatalogCodec
+
+
+def best_of(fn, *args, repeat: int = 3) -> float:
+    """多次执行取最短耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    anime_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    files_per_anime = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    catalog = make_catalog(anime_count, files_per_anime)
+
+    libraries = ["json"] + [
+        name for name in ("orjson", "msgspec") if getattr(codec_module, name)
+    ]
+    compressions = ["", "gzip"] + (["zstd"] if codec_module.zstandard else [])
+
+    print(f"目录: {anime_count} 部动漫, {anime_count * files_per_anime} 个文件")
+    print(f"  {'codec':<28} {'dump ms':>10} {'load ms':>10} {'size MB':>10}")
+    for library in libraries:
+        for compact in (False, True):
+            for compression in compressions if compact else [""]:
+                codec = CatalogCodec(library, compact, compression)
+                raw = codec.dumps(catalog)
+                dump_ms = best_of(codec.dumps, catalog)
+                load_ms = best_of(codec.loads, raw)
+                print(
+                    f"  {codec.name:<28} {dump_ms:10.2f} {load_ms:10.2f} "
+                    f"{len(raw) / 1024 / 1024:10.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
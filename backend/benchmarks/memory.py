@@ -0,0 +1,59 @@
+"""
+目录内存占用基准测试：字典文件记录与紧凑记录
+
+用法（在 backend 目录下）:
+    python -m benchmarks.memory [anime_count] [files_per_anime]
+"""
+
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmarks.catalog import make_catalog
+from database.codec import CatalogCodec
+from database.records import compact_catalog
+
+
+def measure(build):
+    """构建目录并返回 (对象, 占用字节, 耗时毫秒)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = build()
+    elapsed = (time.perf_counter() - start) * 1000
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, size, elapsed
+
+
+def main():
+    anime_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    files_per_anime = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    raw = CatalogCodec("json", compact=True).dumps(
+        make_catalog(anime_count, files_per_anime)
+    )
+
+    # 与加载数据库相同：从文件内容解析，紧凑模式再转换文件列表
+    plain, plain_bytes, plain_ms = measure(lambda: json.loads(raw))
+    del plain
+    compact, compact_bytes, compact_ms = measure(
+        lambda: compact_catalog(json.loads(raw))
+    )
+
+    codec = CatalogCodec("json", compact=True)
+    assert json.loads(codec.dumps(compact)) == json.loads(raw), "紧凑记录往返不一致"
+
+    print(f"目录: {anime_count} 部动漫, {anime_count * files_per_anime} 个文件")
+    print(f"  {'representation':<20} {'memory MB':>10} {'load ms':>10}")
+    print(f"  {'dict':<20} {plain_bytes / 1024 / 1024:10.2f} {plain_ms:10.2f}")
+    print(
+        f"  {'FileRecord':<20} {compact_bytes / 1024 / 1024:10.2f} {compact_ms:10.2f}"
+    )
+    print(f"  减少 {(1 - compact_bytes / plain_bytes) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
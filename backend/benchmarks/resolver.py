@@ -0,0 +1,108 @@
+"""
+播放链接获取基准测试：逐个获取与 AIMD 并发获取
+
+本地模拟 PikPak 接口：每个请求固定延迟，同时处理的请求超过容量时返回限流错误。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.resolver [file_count] [latency_ms] [capacity]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+from pikpakapi import PikPakApi
+
+from services.pikpak import PikPakService
+from services.rate_limit import pikpak_limiter
+from services.resolver import play_url_resolver
+
+
+class FakePikPak:
+    """模拟 PikPak 的验证码和文件详情接口"""
+
+    def __init__(self, latency: float, capacity: int):
+        self.latency = latency
+        self.capacity = capacity
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if request.url.path.endswith("/captcha/init"):
+            return httpx.Response(200, json={"captcha_token": "token"})
+
+        if self.in_flight >= self.capacity:
+            self.throttled += 1
+            return httpx.Response(
+                429,
+                content=json.dumps(
+                    {"error": "too_many_requests", "error_description": "操作频繁"}
+                ),
+            )
+
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        file_id = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(
+            200, json={"id": file_id, "web_content_link": f"https://play/{file_id}"}
+        )
+
+
+def make_client(server: FakePikPak) -> PikPakApi:
+    client = PikPakApi(
+        username="bench",
+        password="bench",
+        httpx_client_args={"transport": httpx.MockTransport(server.handle)},
+    )
+    client.access_token = "access"
+    client.refresh_token = "refresh"
+    client.user_id = "bench"
+    return client
+
+
+async def run(file_count: int, latency: float, capacity: int):
+    file_ids = [f"file{i}" for i in range(file_count)]
+    service = PikPakService()
+    # 只比较并发策略，令牌桶不参与
+    pikpak_limiter.configure(rate_per_minute=1_000_000, burst=1_000_000)
+
+    server = FakePikPak(latency, capacity)
+    client = make_client(server)
+    start = time.perf_counter()
+    for file_id in file_ids:
+        await service.get_video_play_url(file_id, client)
+    sequential = time.perf_counter() - start
+    print(f"  {'sequential':<12} {sequential:8.2f} s  {server.requests:6} requests")
+
+    server = FakePikPak(latency, capacity)
+    client = make_client(server)
+    start = time.perf_counter()
+    play_urls = await service.get_video_play_urls(client, file_ids)
+    adaptive = time.perf_counter() - start
+    resolved = sum(1 for url in play_urls.values() if url)
+    print(
+        f"  {'adaptive':<12} {adaptive:8.2f} s  {server.requests:6} requests, "
+        f"{server.throttled} throttled, {resolved}/{file_count} resolved"
+    )
+    print(f"  加速 {sequential / adaptive:.1f}x，并发状态: {play_url_resolver.stats()}")
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 200) / 1000
+    capacity = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+    print(
+        f"{file_count} 个文件，延迟 {latency * 1000:.0f} ms，模拟服务端容量 {capacity}"
+    )
+    asyncio.run(run(file_count, latency, capacity))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+标题搜索基准测试：线性扫描与 n-gram 索引，以及前缀联想
+
+用法（在 backend 目录下）:
+    python -m benchmarks.search [title_count]
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from database.search import TitleIndex, normalize
+from database.suggest import SuggestIndex
+
+KANA = "のをにはがとでもへ"
+SYLLABLES = ["ka", "ri", "to", "ne", "sa", "mi", "ro", "zu", "shi", "na", "re", "ko"]
+
+
+def make_titles(count: int, seed: int = 0):
+    """生成混合中日文和拉丁字母的标题，常用字按 Zipf 分布出现"""
+    rng = random.Random(seed)
+    hanzi = [chr(0x4E00 + i) for i in rng.sample(range(0x5000), 3000)]
+    weights = [1 / (rank + 1) for rank in range(len(hanzi))]
+    words = [
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+        for _ in range(500)
+    ]
+
+    titles = []
+    for i in range(count):
+        head = "".join(rng.choices(hanzi, weights, k=rng.randint(2, 6)))
+        middle = rng.choice(KANA) + "".join(
+            rng.choices(hanzi, weights, k=rng.randint(1, 4))
+        )
+        tail = " ".join(rng.sample(words, rng.randint(0, 2)))
+        titles.append(f"{head}{middle} {tail} {i % 5 + 1}".replace("  ", " "))
+    return titles
+
+
+def linear_search(titles, query):
+    """与原来的 search_anime_by_title 相同的逐个子串比较"""
+    query = query.lower()
+    return [t for t in titles if query in t.lower()]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def measure(fn, queries, rounds: int = 5, reset=None):
+    """
+    首次查询和重复查询各自的 p50、p99（毫秒）
+
+    首轮每次查询前调用 reset(query) 丢弃该查询的缓存，模拟第一次出现或因标题变化失效的查询
+    """
+    first, repeat = [], []
+    for i in range(rounds):
+        for query in queries:
+            if not i and reset is not None:
+                reset(query)
+            start = time.perf_counter()
+            fn(query)
+            (repeat if i else first).append((time.perf_counter() - start) * 1000)
+    return (*percentiles(first), *percentiles(repeat))
+
+
+def build(titles) -> TitleIndex:
+    index = TitleIndex()
+    index.sync((i, title) for i, title in enumerate(titles))
+    return index
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    titles = make_titles(count)
+    rng = random.Random(1)
+
+    # 从真实标题中截取片段模拟用户输入，长度 1~6
+    queries = []
+    for _ in range(200):
+        title = rng.choice(titles)
+        start = rng.randrange(len(title))
+        queries.append(title[start : start + rng.randint(1, 6)].strip() or title[:2])
+    # 输入框的第一个字
+    queries += [title[0] for title in rng.sample(titles, 20)] + ["2", "k", "re"]
+
+    start = time.perf_counter()
+    index = build(titles)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    index.update(0, "新的标题 Updated")
+    update_ms = (time.perf_counter() - start) * 1000
+
+    print(f"标题: {count}, 查询: {len(queries)}")
+    print(f"  {'build index':<28} {build_ms:10.2f} ms")
+    print(f"  {'update one title':<28} {update_ms:10.4f} ms")
+    print(
+        f"  {'':<24} {'first p50':>10} {'first p99':>10} {'repeat p50':>10} {'repeat p99':>10}"
+    )
+
+    def forget(query):
+        index._ranked.pop(normalize(query).strip(), None)
+
+    for label, fn, reset in [
+        ("linear scan", lambda q: linear_search(titles, q), None),
+        ("index (all matches)", lambda q: index.search(q), forget),
+        ("index (limit=20)", lambda q: index.search(q, 20), forget),
+    ]:
+        row = " ".join(f"{value:10.4f}" for value in measure(fn, queries, reset=reset))
+        print(f"  {label:<24} {row} ms")
+
+    # 前缀联想：输入标题的前 1~6 个字
+    suggest = SuggestIndex()
+    start = time.perf_counter()
+    suggest.sync((i, title, "") for i, title in enumerate(titles))
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    suggest.update(0, "新的标题 Updated")
+    update_ms = (time.perf_counter() - start) * 1000
+    prefixes = [title[: rng.randint(1, 6)] for title in rng.sample(titles, 200)]
+
+    print(f"  {'build suggest':<28} {build_ms:10.2f} ms")
+    print(f"  {'update one suggestion':<28} {update_ms:10.4f} ms")
+    row = " ".join(f"{value:10.4f}" for value in measure(suggest.suggest, prefixes))
+    print(f"  {'suggest (top-k)':<24} {row} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+JSON、SQLite 与分片存储后端基准测试
+
+用法（在 backend 目录下）:
+    python -m benchmarks.storage [anime_count] [files_per_anime]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.catalog import CONTAINER_ID, make_catalog
+from config.settings import settings
+from database.pikpak import PikPakDatabase
+from database import sharded
+from database.sqlite import SQLitePikPakDatabase, migrate_from_json
+
+
+def timed(label: str, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f"  {label:<32} {(time.perf_counter() - start) * 1000:10.2f} ms")
+    return result
+
+
+async def run_ops(db: PikPakDatabase, folder_ids, file_ids, rounds: int):
+    """模拟一次链接刷新和播放链接查询"""
+    start = time.perf_counter()
+    for folder_id, file_id in zip(folder_ids, file_ids):
+        await db.update_anime_file_link(file_id, "https://new", CONTAINER_ID, folder_id)
+    db.flush()
+    print(
+        f"  {'update_anime_file_link x%d' % rounds:<32} {(time.perf_counter() - start) * 1000:10.2f} ms"
+    )
+
+    start = time.perf_counter()
+    for file_id in file_ids:
+        await db.aget_file_play_url(file_id)
+    print(
+        f"  {'aget_file_play_url x%d' % rounds:<32} {(time.perf_counter() - start) * 1000:10.2f} ms"
+    )
+
+
+def main():
+    anime_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    files_per_anime = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rounds = 200
+
+    catalog = make_catalog(anime_count, files_per_anime)
+    folder_ids = list(catalog["animes"][CONTAINER_ID])[-rounds:]
+    file_ids = [
+        catalog["animes"][CONTAINER_ID][f]["files"][-1]["id"] for f in folder_ids
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "anime.json")
+        sqlite_path = os.path.join(tmp, "anime.sqlite")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, ensure_ascii=False, indent=2)
+        settings.DATABASE_PATH = json_path
+
+        print(f"目录: {anime_count} 部动漫, {anime_count * files_per_anime} 个文件")
+        print(f"  anime.json 大小 {os.path.getsize(json_path) / 1024 / 1024:.1f} MB")
+
+        print("[json]")
+        json_db = PikPakDatabase(json_path)
+        timed("load_data (冷启动)", json_db.load_data)
+        timed("get_all_animes", json_db.get_all_animes)
+        asyncio.run(run_ops(json_db, folder_ids, file_ids, rounds))
+
+        print("[sqlite]")
+        timed("migrate_from_json", migrate_from_json, json_path, sqlite_path)
+        sqlite_db = SQLitePikPakDatabase(sqlite_path)
+        timed("load_data (完整文档)", sqlite_db.load_data)
+        timed("get_all_animes", sqlite_db.get_all_animes)
+        asyncio.run(run_ops(sqlite_db, folder_ids, file_ids, rounds))
+
+        print("[sharded]")
+        shard_root = os.path.join(tmp, "anime")
+        timed("migrate_from_json", sharded.migrate_from_json, json_path, shard_root)
+        sharded_db = sharded.ShardedPikPakDatabase(shard_root)
+        timed("load index (冷启动)", sharded_db.store.index)
+        timed(
+            "get_anime_all",
+            lambda: asyncio.run(sharded_db.get_anime_all(folder_ids[0], CONTAINER_ID)),
+        )
+        asyncio.run(run_ops(sharded_db, folder_ids, file_ids, rounds))
+
+
+if __name__ == "__main__":
+    main()
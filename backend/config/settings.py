@@ -34,9 +34,58 @@ class Settings:
     PIKPAK_USERNAME: Optional[str] = os.getenv("PIKPAK_USERNAME")
     PIKPAK_PASSWORD: Optional[str] = os.getenv("PIKPAK_PASSWORD")
     ANIME_CONTAINER_ID: str = os.getenv("ANIME_CONTAINER_ID")
+    PIKPAK_TOKEN_PATH: str = "data/pikpak_tokens.json"  # 登录令牌，重启后免登录
+    PIKPAK_TOKEN_REFRESH_AFTER: int = 6000  # access token 有效期 2 小时，提前刷新(秒)
+    PIKPAK_TOKEN_CHECK_INTERVAL: int = 300  # 后台检查令牌的间隔(秒)
+    PIKPAK_PAGE_SIZE: int = 100  # 列出文件夹内容时每页的数量
+    MYPACK_LISTING_TTL: float = 10.0  # My Pack 文件夹列表缓存时间(秒)
+    OFFLINE_TASK_POLL_INTERVAL: float = 3.0  # 批量查询离线任务状态的间隔(秒)
+    OFFLINE_TASK_TIMEOUT: float = 600.0  # 等待单个离线任务的最长时间(秒)
+    OFFLINE_TASK_PAGE_SIZE: int = 100  # 每次查询的任务数
+    OFFLINE_TASK_MAX_PAGES: int = 5  # 每轮查询最多翻页数
+
+    # 后台任务队列
+    JOB_DATABASE_PATH: str = "data/jobs.sqlite"
+    JOB_WORKERS: int = 2  # 同时执行的任务数
+    JOB_MAX_ATTEMPTS: int = 3  # 每个任务最多执行次数
+    JOB_RETRY_DELAY: float = 10.0  # 首次重试前的等待时间(秒)，之后每次翻倍
+    JOB_POLL_INTERVAL: float = 5.0  # 空闲时检查到期任务的间隔(秒)
+    JOB_EVENTS_KEEPALIVE: float = 15.0  # 事件流空闲时发送心跳的间隔(秒)
+    JOB_RETENTION_DAYS: float = 7.0  # 已结束任务及其事件的保留天数
 
     # 数据库配置
+    DATABASE_BACKEND: str = os.getenv(
+        "DATABASE_BACKEND", "json"
+    )  # "json"、"sqlite" 或 "sharded"
     DATABASE_PATH: str = "data/anime.json"
+    SQLITE_DATABASE_PATH: str = "data/anime.sqlite"
+    SHARDED_DATABASE_PATH: str = "data/anime"  # 分片存储目录
+    DATABASE_SHARD_CACHE_SIZE: int = 256  # 内存中最多缓存的分片数
+    DATABASE_FLUSH_DELAY: float = 2.0  # 合并写入的防抖窗口(秒)
+    DATABASE_FLUSH_MAX_PENDING: int = 50  # 待落盘修改数达到该值时立即写入
+    DATABASE_JOURNAL: bool = True  # 小修改写入追加日志
+    DATABASE_JOURNAL_COMPACT_BYTES: int = 1024 * 1024  # 日志超过该大小时压缩进快照
+    DATABASE_CODEC: str = os.getenv(
+        "DATABASE_CODEC", "auto"
+    )  # auto/orjson/msgspec/json
+    DATABASE_COMPACT: bool = False  # 不缩进写入，减小文件体积
+    DATABASE_COMPRESSION: str = ""  # ""、"gzip" 或 "zstd"
+    DATABASE_IO_QUEUE_SIZE: int = 8  # 数据库 I/O 线程最多排队的任务数
+
+    # 搜索配置
+    BANGUMI_NEWS_PATH: str = "data/news.json"  # 当季新番数据，提供 Bangumi 名称
+    SUGGEST_TOP_K: int = 10  # 联想最多返回的条数
+
+    # HTTP 缓存配置（按路由设置 Cache-Control，留空则只返回 ETag）
+    CACHE_CONTROL: dict = {
+        "anime_list": "no-cache",  # 管理页面，每次都用 ETag 重新验证
+        "client_anime": "public, max-age=60",
+        "calendar": "public, max-age=3600",
+    }
+
+    RESPONSE_CACHE_SIZE: int = 512  # 预编码响应最多缓存的条数
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 预编码响应最多占用的内存
+    STREAM_CHUNK_SIZE: int = 64 * 1024  # 流式响应每块的大小（字符）
 
     # 日志配置
     LOG_DIR: Path = BASE_DIR / "logs"  # 日志文件目录
@@ -59,10 +108,17 @@ class Settings:
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8002"))
 
-    # API限流配置
+    # API限流配置（按账号的令牌桶，运行中可通过 /pikpak/rate-limit 调整）
     API_RATE_LIMIT: int = 13  # 每分钟请求数
-    API_BATCH_SIZE: int = 3  # 批量API调用大小
-    API_DELAY: int = 8  # API调用延迟(秒)
+    API_RATE_BURST: int = 3  # 允许连续发出的请求数
+
+    # 播放链接并发获取（AIMD 调整并发数，限流时按抖动的指数退避重试）
+    PLAY_URL_CONCURRENCY_START: int = 2  # 初始并发数
+    PLAY_URL_CONCURRENCY_MIN: int = 1
+    PLAY_URL_CONCURRENCY_MAX: int = 8
+    PLAY_URL_RETRIES: int = 3  # 单个文件被限流时最多重试次数
+    PLAY_URL_BACKOFF: float = 1.0  # 首次重试前的等待时间(秒)
+    PLAY_URL_BACKOFF_MAX: float = 30.0  # 最长等待时间(秒)
 
 
 # 创建全局配置实例
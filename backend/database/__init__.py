@@ -0,0 +1,21 @@
+from config.settings import settings
+from .pikpak import PikPakDatabase
+from .sqlite import SQLitePikPakDatabase
+from .sharded import ShardedPikPakDatabase
+
+
+def get_anime_db() -> PikPakDatabase:
+    """根据配置创建动漫数据库实例"""
+    if settings.DATABASE_BACKEND == "sqlite":
+        return SQLitePikPakDatabase()
+    if settings.DATABASE_BACKEND == "sharded":
+        return ShardedPikPakDatabase()
+    return PikPakDatabase()
+
+
+__all__ = [
+    "PikPakDatabase",
+    "SQLitePikPakDatabase",
+    "ShardedPikPakDatabase",
+    "get_anime_db",
+]
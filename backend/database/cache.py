@@ -0,0 +1,208 @@
+"""
+动漫数据库缓存
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from database.index import FileIndex
+from database.journal import journal_path
+from database.search import TitleIndex
+from database.suggest import SuggestIndex
+from database.versions import CatalogVersions, catalog_generation
+
+
+class CatalogCache:
+    """
+    进程级动漫目录缓存
+
+    同一个数据库文件在进程内只解析一次，所有 PikPakDatabase 实例共享同一份数据。
+    缓存通过写入版本号和文件（含追加日志）的 mtime/size 判断是否失效，外部修改文件后会自动重新加载。
+    尚未落盘的脏数据以内存为准，不会被磁盘上的旧文件覆盖。
+    每份缓存数据附带一个 file_id 索引，重新加载时整体重建；
+    以及标题搜索和前缀联想索引，重新加载后标记为过期，查询时按差异同步；
+    按文件夹记录的版本用于响应缓存和 ETag，重新加载后整体失效。
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.abspath(path)
+
+    @staticmethod
+    def _file_stat(path: str) -> Optional[Tuple[int, int]]:
+        """获取文件的 (mtime_ns, size)，文件不存在返回 None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @classmethod
+    def _stat(cls, path: str) -> Optional[Tuple]:
+        """数据库文件及其追加日志的状态"""
+        return cls._file_stat(path), cls._file_stat(journal_path(path))
+
+    def get(self, path: str, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        获取缓存的目录数据
+
+        Args:
+            path: 数据库文件路径
+            loader: 缓存失效时用于重新加载数据的函数
+
+        Returns:
+            目录数据（进程内共享，修改后需调用 save_data 持久化）
+        """
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            stat = self._stat(path)
+            if entry is not None and (entry["dirty"] or entry["stat"] == stat):
+                self.hits += 1
+                return entry["data"]
+
+            self.misses += 1
+            data = loader()
+            self._store(key, data, stat)
+            return data
+
+    def peek(self, path: str) -> Optional[Dict[str, Any]]:
+        """缓存有效时返回数据，否则返回 None（不触发加载）"""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry["dirty"] or entry["stat"] == self._stat(path)
+            ):
+                self.hits += 1
+                return entry["data"]
+            return None
+
+    def put(
+        self,
+        path: str,
+        data: Dict[str, Any],
+        dirty: bool = False,
+        reindex: bool = True,
+    ) -> int:
+        """
+        写入后更新缓存
+
+        Args:
+            path: 数据库文件路径
+            data: 最新的目录数据
+            dirty: 数据是否尚未落盘
+            reindex: 是否重建文件索引，调用方已自行维护索引时传 False
+
+        Returns:
+            新的写入版本号
+        """
+        key = self._key(path)
+        with self._lock:
+            return self._store(key, data, self._stat(path), dirty, reindex)
+
+    def index(self, path: str) -> Optional[FileIndex]:
+        """获取缓存数据对应的文件索引"""
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            return entry["index"] if entry else None
+
+    def search_index(self, path: str, name: str):
+        """获取缓存数据对应的搜索索引，name 为 "titles"（标题搜索）或 "suggest"（前缀联想）"""
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            return entry["search"][name] if entry else None
+
+    def versions(self, path: str) -> Optional[CatalogVersions]:
+        """获取缓存数据对应的文件夹版本"""
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            return entry["versions"] if entry else None
+
+    def mark_clean(self, path: str):
+        """数据落盘后记录新的文件状态，不改变版本号"""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["stat"] = self._stat(path)
+                entry["dirty"] = False
+
+    def invalidate(self, path: str):
+        """使缓存失效"""
+        with self._lock:
+            self._entries.pop(self._key(path), None)
+
+    def version(self, path: str) -> int:
+        """获取当前写入版本号"""
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            return entry["version"] if entry else 0
+
+    def _store(
+        self,
+        key: str,
+        data: Dict[str, Any],
+        stat,
+        dirty: bool = False,
+        reindex: bool = True,
+    ) -> int:
+        entry = self._entries.get(key)
+        version = (entry["version"] if entry else 0) + 1
+        # 尚未落盘的标记只能由 mark_clean 清除
+        dirty = dirty or (entry is not None and entry["dirty"])
+        if reindex or entry is None or entry["data"] is not data:
+            index = FileIndex(data)
+        else:
+            index = entry["index"]
+        search = (
+            entry["search"]
+            if entry
+            else {"titles": TitleIndex(), "suggest": SuggestIndex()}
+        )
+        versions = (
+            entry["versions"] if entry else CatalogVersions(catalog_generation(data))
+        )
+        if reindex:
+            for search_index in search.values():
+                search_index.stale = True
+            versions.reset(catalog_generation(data))
+        self._entries[key] = {
+            "data": data,
+            "stat": stat,
+            "version": version,
+            "dirty": dirty,
+            "index": index,
+            "search": search,
+            "versions": versions,
+        }
+        return version
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": {
+                    key: {
+                        "version": entry["version"],
+                        "indexed_files": len(entry["index"]),
+                        "indexed_titles": len(entry["search"]["titles"]),
+                    }
+                    for key, entry in self._entries.items()
+                },
+            }
+
+
+# 全局目录缓存实例
+catalog_cache = CatalogCache()
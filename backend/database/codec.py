@@ -0,0 +1,135 @@
+"""
+动漫数据库序列化
+"""
+
+import gzip
+import json
+from typing import Any, Dict
+
+from loguru import logger
+
+from config.settings import settings
+from database.records import to_plain
+
+# 可选的高性能 JSON 库，未安装时使用标准库
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class CatalogCodec:
+    """
+    目录文件编解码器
+
+    Args:
+        library: JSON 库，"auto"、"orjson"、"msgspec" 或 "json"
+        compact: 不缩进输出
+        compression: 压缩算法，""、"gzip" 或 "zstd"；读取时按文件头自动识别
+    """
+
+    def __init__(
+        self, library: str = "auto", compact: bool = False, compression: str = ""
+    ):
+        self.library = self._resolve(library)
+        self.compact = compact
+        self.compression = compression or ""
+        if self.compression == "zstd" and zstandard is None:
+            logger.warning("未安装 zstandard，数据库改用 gzip 压缩")
+            self.compression = "gzip"
+
+        self._encode, self._decode = self._build()
+
+    @staticmethod
+    def _resolve(library: str) -> str:
+        available = {"orjson": orjson, "msgspec": msgspec, "json": json}
+        if library == "auto":
+            return "orjson" if orjson else "msgspec" if msgspec else "json"
+        if available.get(library) is None:
+            logger.warning(f"未安装 {library}，数据库使用标准库 json")
+            return "json"
+        return library
+
+    def _build(self):
+        if self.library == "orjson":
+            option = 0 if self.compact else orjson.OPT_INDENT_2
+            return (
+                lambda data: orjson.dumps(data, default=to_plain, option=option)
+            ), orjson.loads
+
+        if self.library == "msgspec":
+            encoder = msgspec.json.Encoder(enc_hook=to_plain)
+            decoder = msgspec.json.Decoder()
+            if self.compact:
+                return encoder.encode, decoder.decode
+            return (
+                lambda data: msgspec.json.format(encoder.encode(data), indent=2)
+            ), decoder.decode
+
+        if self.compact:
+            return (
+                lambda data: json.dumps(
+                    data, ensure_ascii=False, separators=(",", ":"), default=to_plain
+                ).encode("utf-8")
+            ), json.loads
+        return (
+            lambda data: json.dumps(
+                data, ensure_ascii=False, indent=2, default=to_plain
+            ).encode("utf-8")
+        ), json.loads
+
+    @property
+    def name(self) -> str:
+        parts = [self.library, "compact" if self.compact else "indent"]
+        if self.compression:
+            parts.append(self.compression)
+        return "+".join(parts)
+
+    def dumps(self, data: Any) -> bytes:
+        raw = self._encode(data)
+        if self.compression == "gzip":
+            return gzip.compress(raw, compresslevel=6)
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=3).compress(raw)
+        return raw
+
+    def loads(self, raw: bytes) -> Any:
+        if raw[:2] == GZIP_MAGIC:
+            raw = gzip.decompress(raw)
+        elif raw[:4] == ZSTD_MAGIC:
+            if zstandard is None:
+                raise RuntimeError("数据库文件使用 zstd 压缩，需要安装 zstandard")
+            raw = zstandard.ZstdDecompressor().decompress(raw)
+        return self._decode(raw)
+
+    def read(self, path: str) -> Any:
+        with open(path, "rb") as f:
+            return self.loads(f.read())
+
+
+_codecs: Dict[tuple, CatalogCodec] = {}
+
+
+def get_codec() -> CatalogCodec:
+    """按当前配置获取编解码器（配置变化后自动重建）"""
+    key = (
+        settings.DATABASE_CODEC,
+        settings.DATABASE_COMPACT,
+        settings.DATABASE_COMPRESSION,
+    )
+    if key not in _codecs:
+        _codecs[key] = CatalogCodec(*key)
+    return _codecs[key]
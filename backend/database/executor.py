@@ -0,0 +1,51 @@
+"""
+动漫数据库 I/O 线程
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.settings import settings
+
+# 目录的解析、序列化和写盘都在这个专用线程中执行，避免阻塞事件循环
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-io")
+
+# 每个事件循环一个信号量，限制排队中的 I/O 任务数量
+_slots: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+_slots_lock = threading.Lock()
+
+# 统计
+_stats = {"submitted": 0, "completed": 0, "in_flight": 0}
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    loop = asyncio.get_running_loop()
+    with _slots_lock:
+        if _slots is None or _slots[0] is not loop:
+            _slots = (loop, asyncio.Semaphore(settings.DATABASE_IO_QUEUE_SIZE))
+        return _slots[1]
+
+
+async def run_io(fn: Callable[..., Any], *args) -> Any:
+    """
+    在数据库 I/O 线程中执行同步函数
+
+    排队任务超过 DATABASE_IO_QUEUE_SIZE 时，调用方会在这里等待（背压）
+    """
+    async with _get_slots():
+        _stats["submitted"] += 1
+        _stats["in_flight"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_executor, fn, *args)
+        finally:
+            _stats["in_flight"] -= 1
+            _stats["completed"] += 1
+
+
+def io_stats() -> Dict[str, int]:
+    """获取 I/O 线程统计"""
+    return {**_stats, "queue_size": settings.DATABASE_IO_QUEUE_SIZE}
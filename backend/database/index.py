@@ -0,0 +1,59 @@
+"""
+动漫文件索引
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# (container_id, folder_id, position)
+FileLocation = Tuple[str, str, int]
+
+
+class FileIndex:
+    """
+    file_id → (container_id, folder_id, position) 二级索引
+
+    加载目录时整体重建，按文件夹增量维护，避免每次查找文件都遍历整个目录
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        self._locations: Dict[str, FileLocation] = {}
+        self._folders: Dict[Tuple[str, str], Set[str]] = {}
+        if data is not None:
+            self.rebuild(data)
+
+    def rebuild(self, data: Dict[str, Any]):
+        """根据完整目录重建索引"""
+        self._locations.clear()
+        self._folders.clear()
+        for container_id, folders in data.get("animes", {}).items():
+            for folder_id, info in folders.items():
+                self.index_folder(container_id, folder_id, info.get("files", []))
+
+    def index_folder(
+        self, container_id: str, folder_id: str, files: List[Dict[str, Any]]
+    ):
+        """重建单个文件夹的索引"""
+        self.remove_folder(container_id, folder_id)
+        file_ids = set()
+        for position, file in enumerate(files):
+            file_id = file.get("id")
+            if file_id:
+                self._locations[file_id] = (container_id, folder_id, position)
+                file_ids.add(file_id)
+        self._folders[(container_id, folder_id)] = file_ids
+
+    def remove_folder(self, container_id: str, folder_id: str):
+        """移除文件夹的索引"""
+        for file_id in self._folders.pop((container_id, folder_id), ()):
+            if self._locations.get(file_id, (None, None))[:2] == (
+                container_id,
+                folder_id,
+            ):
+                del self._locations[file_id]
+
+    def get(self, file_id: str) -> Optional[FileLocation]:
+        """查找文件位置"""
+        return self._locations.get(file_id)
+
+    def __len__(self) -> int:
+        return len(self._locations)
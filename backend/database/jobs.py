@@ -0,0 +1,265 @@
+"""
+后台任务存储（SQLite）
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    state TEXT NOT NULL DEFAULT '{}',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    error TEXT,
+    next_run_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (status, next_run_at);
+
+CREATE TABLE IF NOT EXISTS job_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id, id);
+"""
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def _event_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "job_id": row["job_id"],
+        "type": row["type"],
+        "data": json.loads(row["data"]),
+        "created_at": row["created_at"],
+    }
+
+
+def _job_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["state"] = json.loads(job["state"])
+    return job
+
+
+class JobStore:
+    """
+    后台任务表
+
+    每个任务记录当前阶段和阶段产生的状态，进程重启后从中断的阶段继续；
+    相同幂等键只会创建一个任务。
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.JOB_DATABASE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        os.chmod(self.db_path, 0o600)
+        self.lock = threading.Lock()
+
+    def create(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+        max_attempts: int = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        创建任务
+
+        Returns:
+            (任务, 是否新建)，幂等键已存在时返回已有的任务
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                """
+                INSERT OR IGNORE INTO jobs (
+                    id, kind, idempotency_key, payload, status, max_attempts,
+                    next_run_at, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id,
+                    kind,
+                    idempotency_key,
+                    json.dumps(payload, ensure_ascii=False),
+                    QUEUED,
+                    max_attempts or settings.JOB_MAX_ATTEMPTS,
+                    now,
+                    now,
+                    now,
+                ),
+            )
+            if cur.rowcount:
+                created = True
+            else:
+                created = False
+                job_id = self.conn.execute(
+                    "SELECT id FROM jobs WHERE idempotency_key = ?",
+                    (idempotency_key,),
+                ).fetchone()["id"]
+        return self.get(job_id), created
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return _job_dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """按创建时间倒序列出任务"""
+        sql = "SELECT * FROM jobs"
+        params: tuple = ()
+        if status:
+            sql += " WHERE status = ?"
+            params = (status,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        with self.lock:
+            rows = self.conn.execute(sql, params + (limit,)).fetchall()
+        return [_job_dict(row) for row in rows]
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """取出一个到期的排队任务并标记为运行中"""
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                """
+                SELECT * FROM jobs WHERE status = ? AND next_run_at <= ?
+                ORDER BY next_run_at, created_at LIMIT 1
+                """,
+                (QUEUED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, now, row["id"]),
+            )
+        job = _job_dict(row)
+        job["status"] = RUNNING
+        return job
+
+    def next_due(self) -> Optional[float]:
+        """最早到期的排队任务时间"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MIN(next_run_at) AS due FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()
+        return row["due"]
+
+    def save_state(self, job_id: str, stage: str, state: Dict[str, Any]):
+        """保存当前阶段和阶段状态"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET stage = ?, state = ?, updated_at = ? WHERE id = ?",
+                (stage, json.dumps(state, ensure_ascii=False), time.time(), job_id),
+            )
+
+    def retry(self, job_id: str, delay: float, error: str):
+        """失败后重新排队，delay 秒后再执行"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                UPDATE jobs SET status = ?, attempts = attempts + 1, error = ?,
+                    next_run_at = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (QUEUED, error, now + delay, now, job_id),
+            )
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        """标记任务结束"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                UPDATE jobs SET status = ?, error = ?, updated_at = ?,
+                    attempts = attempts + CASE WHEN ? = ? THEN 1 ELSE 0 END
+                WHERE id = ?
+                """,
+                (status, error, time.time(), status, FAILED, job_id),
+            )
+
+    def add_event(
+        self, job_id: str, event_type: str, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """记录任务事件，事件ID全局递增，可作为续传位置"""
+        now = time.time()
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO job_events (job_id, type, data, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, event_type, json.dumps(data, ensure_ascii=False), now),
+            )
+        return {
+            "id": cur.lastrowid,
+            "job_id": job_id,
+            "type": event_type,
+            "data": data,
+            "created_at": now,
+        }
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """获取任务在 after 之后的事件"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM job_events WHERE job_id = ? AND id > ? ORDER BY id",
+                (job_id, after),
+            ).fetchall()
+        return [_event_dict(row) for row in rows]
+
+    def purge(self, before: float) -> int:
+        """删除 before 之前结束的任务及其事件，返回删除的任务数"""
+        with self.lock, self.conn:
+            finished = "SELECT id FROM jobs WHERE status IN (?, ?) AND updated_at < ?"
+            params = (SUCCEEDED, FAILED, before)
+            self.conn.execute(
+                f"DELETE FROM job_events WHERE job_id IN ({finished})", params
+            )
+            cur = self.conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", params
+            )
+        return cur.rowcount
+
+    def recover(self) -> int:
+        """把上次退出时仍在运行的任务重新排队，返回数量"""
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "UPDATE jobs SET status = ?, next_run_at = ? WHERE status = ?",
+                (QUEUED, time.time(), RUNNING),
+            )
+        return cur.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,148 @@
+"""
+动漫数据库追加日志
+"""
+
+import json
+import os
+from typing import Any, Dict, List
+
+from loguru import logger
+
+
+def journal_path(path: str) -> str:
+    """数据库文件对应的日志文件路径"""
+    return f"{path}.journal"
+
+
+class CatalogJournal:
+    """
+    追加写入的 JSON Lines 日志
+
+    播放链接刷新、重命名等小修改只追加一条记录，写入开销与修改大小成正比；
+    加载时在快照之上重放日志，压缩时把日志合并进新的快照后清空。
+    """
+
+    def __init__(self, path: str):
+        self.path = journal_path(path)
+
+    def append(self, records: List[Dict[str, Any]]):
+        """追加记录并 fsync"""
+        lines = "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for record in records
+        )
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self) -> List[Dict[str, Any]]:
+        """读取所有完整的记录，忽略崩溃时写了一半的末尾行"""
+        if not os.path.exists(self.path):
+            return []
+
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"跳过损坏的日志记录: {self.path}:{line_no}")
+        return records
+
+    def truncate(self):
+        """清空日志"""
+        if os.path.exists(self.path):
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def size(self) -> int:
+        """日志文件大小（字节）"""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+
+def file_record(
+    container_id: str, folder_id: str, file_id: str, fields: Dict[str, Any]
+) -> Dict[str, Any]:
+    """更新文件字段的日志记录"""
+    return {
+        "op": "file",
+        "container_id": container_id,
+        "folder_id": folder_id,
+        "file_id": file_id,
+        "set": fields,
+    }
+
+
+def folder_record(
+    container_id: str, folder_id: str, fields: Dict[str, Any]
+) -> Dict[str, Any]:
+    """更新文件夹字段的日志记录"""
+    return {
+        "op": "folder",
+        "container_id": container_id,
+        "folder_id": folder_id,
+        "set": fields,
+    }
+
+
+def delete_files_record(
+    container_id: str, folder_id: str, file_ids: List[str]
+) -> Dict[str, Any]:
+    """删除文件的日志记录"""
+    return {
+        "op": "delete_files",
+        "container_id": container_id,
+        "folder_id": folder_id,
+        "file_ids": list(file_ids),
+    }
+
+
+def apply_record(data: Dict[str, Any], record: Dict[str, Any]) -> bool:
+    """
+    把一条日志记录应用到目录数据上
+
+    所有记录都是幂等的，重复重放不会改变结果
+
+    Returns:
+        记录是否生效（目标文件夹或文件不存在时返回 False）
+    """
+    folder = (
+        data.get("animes", {})
+        .get(record.get("container_id"), {})
+        .get(record.get("folder_id"))
+    )
+    if folder is None:
+        return False
+
+    if record.get("ts"):
+        data.setdefault("metadata", {})["last_updated"] = record["ts"]
+
+    op = record.get("op")
+    if op == "folder":
+        folder.update(record["set"])
+        return True
+
+    if op == "file":
+        for file in folder.get("files", []):
+            if file.get("id") == record["file_id"]:
+                file.update(record["set"])
+                return True
+        return False
+
+    if op == "delete_files":
+        removed_ids = set(record["file_ids"])
+        folder["files"] = [
+            f for f in folder.get("files", []) if f.get("id") not in removed_ids
+        ]
+        return True
+
+    logger.warning(f"未知的日志记录类型: {op}")
+    return False
@@ -0,0 +1,76 @@
+"""
+列表分页与字段选择
+"""
+
+from itertools import islice
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from exceptions import ValidationException
+
+# 动漫列表可选的字段
+ANIME_LIST_FIELDS = ("id", "title", "status", "cover_url", "summary")
+
+# 搜索结果可选的字段
+SEARCH_FIELDS = (
+    "group_id",
+    "id",
+    "title",
+    "status",
+    "summary",
+    "cover_url",
+    "updated_at",
+    "files_count",
+)
+
+
+def parse_fields(
+    fields: Optional[str], allowed: Sequence[str]
+) -> Optional[Tuple[str, ...]]:
+    """
+    解析 fields 参数（逗号分隔），id 始终返回
+
+    Returns:
+        字段元组，未指定时返回 None（全部字段）
+    """
+    if not fields:
+        return None
+
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in allowed]
+    if unknown:
+        raise ValidationException(
+            f"不支持的字段: {', '.join(unknown)}，可选: {', '.join(allowed)}"
+        )
+    return tuple(name for name in allowed if name == "id" or name in selected)
+
+
+def select_fields(
+    record: Dict[str, Any], fields: Optional[Tuple[str, ...]]
+) -> Dict[str, Any]:
+    """只保留选中的字段"""
+    if fields is None:
+        return record
+    return {name: record[name] for name in fields if name in record}
+
+
+def page_keys(
+    keys: Iterable[Hashable], after: Hashable = None, limit: Optional[int] = None
+) -> Tuple[List[Hashable], bool]:
+    """
+    从 after 之后取最多 limit 个 key，只遍历到下一页为止
+
+    Returns:
+        (本页的 key, 是否还有下一页)
+    """
+    iterator = iter(keys)
+    if after is not None:
+        for key in iterator:
+            if key == after:
+                break
+        else:
+            raise ValidationException("分页游标无效，请从第一页重新获取")
+
+    if limit is None:
+        return list(iterator), False
+    page = list(islice(iterator, limit + 1))
+    return page[:limit], len(page) > limit
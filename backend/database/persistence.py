@@ -0,0 +1,343 @@
+"""
+动漫数据库持久化
+"""
+
+import asyncio
+import contextlib
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from config.settings import settings
+from database.cache import catalog_cache
+from database.codec import get_codec
+from database.executor import run_io
+from database.journal import CatalogJournal, apply_record
+
+
+class DebouncedFlush(ABC):
+    """
+    防抖落盘
+
+    在事件循环内按防抖窗口合并落盘，落盘在数据库 I/O 线程中执行；
+    设置 runner 后落盘任务会交给单写入者，保证序列化期间没有写操作修改目录。
+    子类实现 flush(cancel_timer)
+    """
+
+    flush_delay: float = 0.0
+    _timer: Optional[asyncio.TimerHandle] = None
+    # 执行异步落盘的方式，默认直接执行
+    runner: Optional[Callable[[Callable[[], Awaitable]], Awaitable]] = None
+
+    def _schedule_flush(self, delay: float = None):
+        """在防抖窗口结束后落盘，没有事件循环时立即落盘"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+
+        delay = self.flush_delay if delay is None else delay
+        if self._timer is not None:
+            if delay > 0:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._flush_due)
+
+    def _flush_due(self):
+        """防抖窗口结束，启动后台落盘"""
+        self._timer = None
+        asyncio.ensure_future(self._run_flush())
+
+    async def _run_flush(self):
+        try:
+            if self.runner is not None:
+                await self.runner(self.aflush)
+            else:
+                await self.aflush()
+        except Exception as e:
+            logger.error(f"后台保存数据库失败: {e}")
+
+    async def aflush(self) -> bool:
+        """在数据库 I/O 线程中落盘"""
+        return await run_io(self.flush, False)
+
+    @abstractmethod
+    def flush(self, cancel_timer: bool = True) -> bool:
+        """把待写入的修改落盘，返回是否成功"""
+
+    def _cancel_timer(self, cancel_timer: bool):
+        """取消等待中的防抖落盘，只能在事件循环线程中取消"""
+        if cancel_timer and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+class CatalogPersistence(DebouncedFlush):
+    """
+    动漫目录持久化引擎
+
+    save_data 只把目录标记为脏数据，由引擎在防抖窗口结束或待写入修改数达到阈值时统一落盘。
+    每次落盘先写临时文件并 fsync，再通过 rename 原子替换，避免进程崩溃留下半截文件。
+
+    启用日志时，小修改只追加到日志文件；日志超过阈值后在后台压缩成新的快照。
+    快照的 metadata.journal_seq 记录已合并的日志序号，加载时只重放其后的记录。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_delay: float = None,
+        max_pending: int = None,
+    ):
+        self.path = path
+        self.flush_delay = (
+            settings.DATABASE_FLUSH_DELAY if flush_delay is None else flush_delay
+        )
+        self.max_pending = (
+            settings.DATABASE_FLUSH_MAX_PENDING if max_pending is None else max_pending
+        )
+
+        self.journal = CatalogJournal(path) if settings.DATABASE_JOURNAL else None
+        self.compact_bytes = settings.DATABASE_JOURNAL_COMPACT_BYTES
+
+        self._lock = threading.RLock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._pending = 0  # 尚未落盘的修改次数
+        self._compact = False  # 是否需要把日志压缩进快照
+        self._seq = 0  # 最新的日志序号
+        self._batch_depth = 0
+        self._batch_records: List[Dict[str, Any]] = []  # 批量写入期间暂存的日志
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.runner = None
+
+        # 统计
+        self.mutations = 0
+        self.flushes = 0
+        self.journal_records = 0
+        self.compactions = 0
+
+    def load(self) -> Dict[str, Any]:
+        """读取快照并重放日志尾部"""
+        data = get_codec().read(self.path)
+
+        with self._lock:
+            self._seq = data.get("metadata", {}).get("journal_seq", 0)
+            if self.journal is None:
+                return data
+
+            replayed = 0
+            for record in self.journal.read():
+                if record.get("seq", 0) <= self._seq:
+                    continue
+                apply_record(data, record)
+                self._seq = record["seq"]
+                replayed += 1
+
+            if replayed:
+                logger.info(f"重放数据库日志 {replayed} 条: {self.journal.path}")
+            return data
+
+    @property
+    def dirty(self) -> bool:
+        return self._pending > 0
+
+    def mark_dirty(self, data: Dict[str, Any]):
+        """
+        标记目录有新的修改
+
+        在事件循环内调用时按防抖窗口合并写入；没有事件循环（脚本、同步调用）时立即落盘
+        """
+        with self._lock:
+            self._data = data
+            self._pending += 1
+            self.mutations += 1
+
+            if self._pending >= self.max_pending:
+                self._schedule_flush(0)
+                return
+
+            self._schedule_flush()
+
+    def append(self, data: Dict[str, Any], records: List[Dict[str, Any]]):
+        """
+        以日志记录的形式保存小修改
+
+        未启用日志时退化为 mark_dirty
+        """
+        if self.journal is None:
+            self.mark_dirty(data)
+            return
+
+        with self._lock:
+            self._data = data
+            for record in records:
+                self._seq += 1
+                record["seq"] = self._seq
+            self.mutations += 1
+
+            if self._batch_depth:
+                self._batch_records.extend(records)
+                return
+
+        # 不在批量写入中（脚本等同步调用），直接写入
+        if self._write_journal(records):
+            self._schedule_flush()
+
+    def _write_journal(self, records: List[Dict[str, Any]]) -> bool:
+        """
+        写入日志并 fsync
+
+        Returns:
+            日志是否已超过阈值、需要压缩进快照
+        """
+        with self._lock:
+            self.journal.append(records)
+            self.journal_records += len(records)
+
+            # 快照没有待写入的修改时，记录日志写入后的文件状态
+            if not self._pending:
+                catalog_cache.mark_clean(self.path)
+
+            if not self._compact and self.journal.size() >= self.compact_bytes:
+                self._compact = True
+                return True
+            return False
+
+    @contextlib.asynccontextmanager
+    async def batch(self):
+        """
+        批量写入：期间产生的日志记录在退出时由数据库 I/O 线程一次性写入
+
+        日志和快照都写入失败时退出抛出异常，单写入者据此让这批写操作返回失败
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                records: List[Dict[str, Any]] = []
+                if not self._batch_depth and self._batch_records:
+                    records, self._batch_records = self._batch_records, []
+            if records:
+                await self._commit_records(records)
+
+    async def _commit_records(self, records: List[Dict[str, Any]]):
+        """在 I/O 线程中写入日志，失败时退化为整体快照落盘"""
+        try:
+            compact = await run_io(self._write_journal, records)
+        except Exception as e:
+            logger.error(f"写入数据库日志失败: {e}")
+            with self._lock:
+                self._compact = True
+            if await run_io(self.flush, False):
+                return
+            raise
+        if compact:
+            self._schedule_flush()
+
+    def flush(self, cancel_timer: bool = True) -> bool:
+        """
+        立即把脏数据写入磁盘，并清空已合并进快照的日志
+
+        Args:
+            cancel_timer: 是否取消等待中的防抖落盘，只能在事件循环线程中取消
+        """
+        with self._lock:
+            self._cancel_timer(cancel_timer)
+
+            if not (self._pending or self._compact) or self._data is None:
+                return True
+
+            try:
+                self._data.setdefault("metadata", {})["journal_seq"] = self._seq
+                self.write_atomic(self.path, self._data)
+                if self.journal is not None:
+                    self.journal.truncate()
+            except Exception as e:
+                logger.error(f"保存数据库失败: {e}")
+                return False
+
+            if self._compact:
+                self.compactions += 1
+            # 快照已包含批量写入期间暂存的修改
+            self._batch_records = []
+            self._pending = 0
+            self._compact = False
+            self.flushes += 1
+            catalog_cache.mark_clean(self.path)
+            return True
+
+    @staticmethod
+    def write_atomic(path: str, data: Dict[str, Any]):
+        """按配置的编解码器写入临时文件、fsync 后原子替换目标文件"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+        )
+        try:
+            # mkstemp 创建的文件权限为 0600，沿用原文件的权限
+            mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+            os.chmod(tmp_path, mode)
+            with os.fdopen(fd, "wb") as f:
+                f.write(get_codec().dumps(data))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # 确保 rename 本身也已落盘
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取持久化统计（不加锁，避免等待后台落盘）"""
+        return {
+            "pending": self._pending,
+            "mutations": self.mutations,
+            "flushes": self.flushes,
+            "journal_enabled": self.journal is not None,
+            "journal_bytes": self.journal.size() if self.journal else 0,
+            "journal_records": self.journal_records,
+            "journal_seq": self._seq,
+            "compactions": self.compactions,
+        }
+
+
+_engines: Dict[str, DebouncedFlush] = {}
+_engines_lock = threading.Lock()
+
+
+def get_persistence(path: str, factory: Callable[[str], Any] = None):
+    """
+    获取数据库文件对应的持久化引擎（进程内唯一）
+
+    Args:
+        path: 数据库文件或目录路径
+        factory: 引擎类型，默认 CatalogPersistence
+    """
+    key = os.path.abspath(path)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = (factory or CatalogPersistence)(path)
+        return _engines[key]
+
+
+def flush_all() -> bool:
+    """强制落盘所有脏数据，应用关闭时调用"""
+    with _engines_lock:
+        engines = list(_engines.values())
+    return all([engine.flush() for engine in engines])
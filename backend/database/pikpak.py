@@ -1,17 +1,29 @@
-import json
 import os
-from typing import Dict, List, Any
+from typing import Dict, List, Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
 from datetime import datetime, timedelta
 from loguru import logger
 
 from exceptions import NotFoundException, SystemException, ValidationException
+from config.settings import settings
+from database.cache import catalog_cache
+from database.executor import io_stats, run_io
+from database.persistence import get_persistence
+from database.paging import page_keys, select_fields
+from database.records import compact_catalog
+from database.versions import LISTING_FIELDS
+from database.journal import delete_files_record, file_record, folder_record
+from database.writer import get_writer, serialized
 
 
 class PikPakDatabase:
     """PikPak 数据库管理"""
 
-    def __init__(self, db_path: str = "data/anime.json"):
-        self.db_path = db_path
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.DATABASE_PATH
+        self.persistence = get_persistence(self.db_path)
+        self.writer = get_writer(self.db_path, self.persistence.batch)
+        # 后台落盘在写入任务的批次之间执行，序列化期间目录不会被修改
+        self.persistence.runner = self.writer.submit
         self.ensure_db_exists()
 
     def ensure_db_exists(self):
@@ -27,17 +39,75 @@ class PikPakDatabase:
                     "last_updated": datetime.now().isoformat(),
                 },
             }
-            self.save_data(initial_data)
+            self.save_data(initial_data, flush=True)
 
     def load_data(self) -> Dict[str, Any]:
-        """加载数据库数据"""
+        """
+        加载数据库数据
+
+        返回进程内共享的缓存数据，所有读取方看到的是同一个对象，调用方必须当作只读使用；
+        需要修改时只能在单写入者内（write 或 @serialized 方法）修改并调用 save_data，
+        否则其他读取方会看到未保存的修改。需要加工返回结果时先复制（参考 get_anime_all）。
+        """
         try:
-            with open(self.db_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return catalog_cache.get(self.db_path, self._read_file)
         except Exception as e:
             print(f"加载数据库失败: {e}")
             return {"animes": {}, "metadata": {}}
 
+    async def aload_data(self) -> Dict[str, Any]:
+        """
+        异步加载数据库数据
+
+        缓存有效时直接返回，否则在数据库 I/O 线程中读取文件，不阻塞事件循环；
+        返回值与 load_data 一样是共享的只读数据
+        """
+        data = catalog_cache.peek(self.db_path)
+        if data is not None:
+            return data
+        return await run_io(self.load_data)
+
+    async def aload_listing(self) -> Dict[str, Any]:
+        """加载列表页使用的数据，分片存储只读取索引"""
+        return await self.aload_data()
+
+    async def folder_version(self, container_id: str, folder_id: str) -> str:
+        """
+        文件夹版本，只有该文件夹修改或目录整体替换后才变化
+
+        用于响应缓存和 ETag，不需要构建响应数据
+        """
+        # 磁盘文件被外部修改时先重新加载
+        await self.aload_data()
+        return catalog_cache.versions(self.db_path).folder((container_id, folder_id))
+
+    async def listing_version(self) -> str:
+        """列表版本，列表字段变化或增删文件夹后才变化"""
+        await self.aload_data()
+        return catalog_cache.versions(self.db_path).listing()
+
+    def _read_file(self) -> Dict[str, Any]:
+        """从磁盘读取数据库快照并重放追加日志，文件列表转为紧凑记录"""
+        return compact_catalog(self.persistence.load())
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取目录缓存、持久化和写入队列统计"""
+        return {
+            **catalog_cache.stats(),
+            "persistence": self.persistence.stats(),
+            "writer": self.writer.stats(),
+            "io": io_stats(),
+        }
+
+    async def write(self, mutation: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        在单写入者内执行自定义的读-改-写操作
+
+        Args:
+            mutation: 返回协程的写操作，执行期间不会有其他写操作插入
+        """
+        return await self.writer.submit(mutation)
+
     def _upgrade_data_structure(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """调整数据结构"""
         upgraded_animes = {}
@@ -69,17 +139,139 @@ class PikPakDatabase:
             },
         }
 
-    def save_data(self, data: Dict[str, Any]) -> bool:
-        """保存数据到数据库"""
+    def save_data(self, data: Dict[str, Any], flush: bool = False) -> bool:
+        """
+        保存数据到数据库
+
+        数据立即对所有读取方可见，由持久化引擎合并写入磁盘；文件索引整体重建
+
+        Args:
+            data: 完整的目录数据
+            flush: 是否立即落盘
+        """
+        return self._commit(data, reindex=True, flush=flush)
+
+    def _commit(
+        self,
+        data: Dict[str, Any],
+        folders: List[Tuple[str, str]] = (),
+        reindex: bool = False,
+        flush: bool = False,
+        records: Optional[List[Dict[str, Any]]] = None,
+    ) -> bool:
+        """
+        提交修改
+
+        Args:
+            data: 完整的目录数据
+            folders: 文件列表发生变化、需要重建索引的 (container_id, folder_id)
+            reindex: 是否整体重建文件索引
+            flush: 是否立即落盘
+            records: 描述本次修改的日志记录，传入时只追加日志而不重写快照
+        """
         try:
-            data["metadata"]["last_updated"] = datetime.now().isoformat()
-            with open(self.db_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            update_time = datetime.now().isoformat()
+            data["metadata"]["last_updated"] = update_time
+            if reindex:
+                # 整体替换的数据来自同步等操作，文件列表还是普通字典
+                compact_catalog(data)
+            catalog_cache.put(
+                self.db_path, data, dirty=records is None, reindex=reindex
+            )
+
+            if not reindex:
+                index = catalog_cache.index(self.db_path)
+                for container_id, folder_id in folders:
+                    folder = data.get("animes", {}).get(container_id, {}).get(folder_id)
+                    if folder is None:
+                        index.remove_folder(container_id, folder_id)
+                    else:
+                        index.index_folder(
+                            container_id, folder_id, folder.get("files", [])
+                        )
+
+            versions = catalog_cache.versions(self.db_path)
+            for container_id, folder_id in folders:
+                deleted = (
+                    data.get("animes", {}).get(container_id, {}).get(folder_id) is None
+                )
+                if not reindex:
+                    versions.bump((container_id, folder_id), listing=deleted)
+                if deleted:
+                    self._index_folder_change(container_id, folder_id, None)
+            for record in records or ():
+                versions.bump(
+                    (record["container_id"], record["folder_id"]),
+                    listing=record.get("op") == "folder"
+                    and bool(LISTING_FIELDS & record["set"].keys()),
+                )
+                if record.get("op") == "folder" and (
+                    {"title", "cover_url"} & record["set"].keys()
+                ):
+                    container_id, folder_id = (
+                        record["container_id"],
+                        record["folder_id"],
+                    )
+                    self._index_folder_change(
+                        container_id, folder_id, data["animes"][container_id][folder_id]
+                    )
+
+            if records is None:
+                self.persistence.mark_dirty(data)
+            else:
+                for record in records:
+                    record["ts"] = update_time
+                self.persistence.append(data, records)
+
+            if flush:
+                return self.persistence.flush()
             return True
         except Exception as e:
             print(f"保存数据库失败: {e}")
             return False
 
+    def locate_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        通过文件索引查找文件
+
+        Returns:
+            container_id、folder_id、position 和文件数据，不存在返回 None
+        """
+        data = self.load_data()
+        index = catalog_cache.index(self.db_path)
+        if index is None:
+            return None
+
+        for attempt in range(2):
+            location = index.get(file_id)
+            if location is None:
+                return None
+
+            container_id, folder_id, position = location
+            files = (
+                data.get("animes", {})
+                .get(container_id, {})
+                .get(folder_id, {})
+                .get("files", [])
+            )
+            if position < len(files) and files[position].get("id") == file_id:
+                return {
+                    "container_id": container_id,
+                    "folder_id": folder_id,
+                    "position": position,
+                    "file": files[position],
+                }
+
+            # 索引与数据不一致（数据被绕过 save_data 修改），重建后再试一次
+            logger.warning(f"文件索引已过期，重建索引: {file_id}")
+            index.rebuild(data)
+
+        return None
+
+    def flush(self) -> bool:
+        """立即把尚未落盘的修改写入磁盘"""
+        return self.persistence.flush()
+
     def get_anime_detail(self, anime_id: str, my_pack_id: str) -> Dict[str, Any]:
         """获取动漫详细信息"""
         data = self.load_data()
@@ -97,6 +289,27 @@ class PikPakDatabase:
             "updated_at": anime_info.get("updated_at", ""),
         }
 
+    async def aget_anime_detail(self, anime_id: str, my_pack_id: str) -> Dict[str, Any]:
+        """异步获取动漫详细信息"""
+        await self.aload_data()
+        return self.get_anime_detail(anime_id, my_pack_id)
+
+    async def aget_folder_files(
+        self, container_id: str, folder_id: str
+    ) -> List[Dict[str, Any]]:
+        """
+        获取一个文件夹的文件列表（只读），文件夹不存在时返回空列表
+
+        返回缓存中的列表本身，需要在发送期间保持不变时由调用方复制
+        """
+        data = await self.aload_data()
+        return (
+            data.get("animes", {})
+            .get(container_id, {})
+            .get(folder_id, {})
+            .get("files", [])
+        )
+
     def get_anime_status(self, anime_id: str) -> str:
         """获取动漫状态"""
         data = self.load_data()
@@ -122,6 +335,7 @@ class PikPakDatabase:
 
         return result
 
+    @serialized
     async def update_anime_info(
         self, anime_id: str, update_data: Dict[str, Any], my_pack_id: str
     ) -> bool:
@@ -131,7 +345,7 @@ class PikPakDatabase:
         try:
             # print("将要更新的动漫信息：", update_data)
             # 加载现有数据
-            db_data = self.load_data()
+            db_data = await self.aload_data()
             anime_info = db_data.get("animes", {}).get(my_pack_id, {})
 
             # 检查动漫是否存在
@@ -146,22 +360,28 @@ class PikPakDatabase:
             # 只更新传入的字段
             updatable_fields = ["title", "status", "summary", "cover_url"]
 
-            for field in updatable_fields:
-                if field in update_data:
-                    info[field] = update_data[field]
+            changes = {
+                field: update_data[field]
+                for field in updatable_fields
+                if field in update_data
+            }
 
             # 更新时间戳
-            info["updated_at"] = datetime.now().isoformat()
+            changes["updated_at"] = datetime.now().isoformat()
+            info.update(changes)
 
             # print("更新后的动漫信息：", anime_info)
 
             # 保存数据
-            return self.save_data(db_data)
+            return self._commit(
+                db_data, records=[folder_record(my_pack_id, anime_id, changes)]
+            )
 
         except Exception as e:
             print(f"更新动漫信息失败: {e}")
             return False
 
+    @serialized
     async def del_anime_files(
         self, folder_id: str, file_ids: List[str], my_pack_id: str
     ) -> bool:
@@ -170,7 +390,7 @@ class PikPakDatabase:
         """
         try:
             # 加载现有数据
-            db_data = self.load_data()
+            db_data = await self.aload_data()
             anime_data = (
                 db_data.get("animes", {}).get(my_pack_id, {}).get(folder_id, {})
             )
@@ -182,15 +402,21 @@ class PikPakDatabase:
             files = anime_data.get("files", [])
 
             # 删除 files_id 对应的文件
-            files["files"] = [f for f in files if f.get("id") not in file_ids]
+            removed_ids = set(file_ids)
+            anime_data["files"] = [f for f in files if f.get("id") not in removed_ids]
 
             # 保存数据
-            return self.save_data(db_data)
+            return self._commit(
+                db_data,
+                folders=[(my_pack_id, folder_id)],
+                records=[delete_files_record(my_pack_id, folder_id, file_ids)],
+            )
 
         except Exception as e:
             print(f"删除动漫文件失败: {e}")
             return False
 
+    @serialized
     async def rename_anime_file(
         self, file_id: str, new_name: str, my_pack_id: str, folder_id: str
     ) -> bool:
@@ -199,7 +425,7 @@ class PikPakDatabase:
         """
         try:
             # 加载现有数据
-            db_data = self.load_data()
+            db_data = await self.aload_data()
             anime_data = (
                 db_data.get("animes", {}).get(my_pack_id, {}).get(folder_id, {})
             )
@@ -208,20 +434,25 @@ class PikPakDatabase:
                 logger.warning(f"数据库不存在该动漫，需要同步数据")
                 raise ValidationException("数据库不存在该动漫，请先同步数据")
 
-            files = anime_data.get("files", [])
             # 找到文件并更新名称
-            for file in files:
-                if file.get("id") == file_id:
-                    file["name"] = new_name
-                    break
+            location = self.locate_file(file_id)
+            if not location or location["folder_id"] != folder_id:
+                return True
+            location["file"]["name"] = new_name
 
             # 保存数据
-            return self.save_data(db_data)
+            return self._commit(
+                db_data,
+                records=[
+                    file_record(my_pack_id, folder_id, file_id, {"name": new_name})
+                ],
+            )
 
         except Exception as e:
             logger.error(f"更新动漫文件名称失败: {e}")
             raise SystemException(message="更新动漫文件名称失败", original_error=e)
 
+    @serialized
     async def update_anime_file_link(
         self, file_id: str, play_url: str, my_pack_id: str, folder_id: str
     ) -> dict:
@@ -230,7 +461,7 @@ class PikPakDatabase:
         """
         try:
             # 加载现有数据
-            db_data = self.load_data()
+            db_data = await self.aload_data()
             anime_data = (
                 db_data.get("animes", {}).get(my_pack_id, {}).get(folder_id, {})
             )
@@ -239,26 +470,27 @@ class PikPakDatabase:
                 print(f"数据库不存在该动漫，需要同步数据")
                 return False
 
-            files = anime_data.get("files", [])
             update_time = datetime.now().isoformat()
-            file_found = False
             # 找到文件并更新播放链接
-            for file in files:
-                if file.get("id") == file_id:
-                    file["play_url"] = play_url
-                    file["update_time"] = update_time
-                    file_found = True
-                    break
-
-            if not file_found:
+            location = self.locate_file(file_id)
+            if (
+                not location
+                or location["container_id"] != my_pack_id
+                or location["folder_id"] != folder_id
+            ):
                 return {
                     "success": False,
                     "message": f"未找到文件ID: {file_id}",
                     "data": {},
                 }
 
+            changes = {"play_url": play_url, "update_time": update_time}
+            location["file"].update(changes)
+
             # 保存数据
-            save_success = self.save_data(db_data)
+            save_success = self._commit(
+                db_data, records=[file_record(my_pack_id, folder_id, file_id, changes)]
+            )
 
             if save_success:
                 return {
@@ -278,43 +510,282 @@ class PikPakDatabase:
             print(f"更新动漫文件播放链接失败: {e}")
             return {"success": False, "message": f"更新失败: {str(e)}", "data": {}}
 
-    async def search_anime_by_title(self, title: str) -> Dict:
+    @serialized
+    async def batch_update_file_links(
+        self,
+        folder_id: str,
+        my_pack_id: str,
+        links: List[Tuple[str, str, Optional[str]]],
+        folder_times: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        批量更新动漫文件播放链接，一次加载、一次保存
+
+        Args:
+            folder_id: 动漫文件夹ID
+            my_pack_id: My Pack ID
+            links: (file_id, play_url, update_time) 列表，update_time 为 None 时取当前时间
+            folder_times: 至少一个链接更新成功时写入文件夹的时间字段，
+                如 {"updated_at": ..., "last_video_update_time": ...}
+
+        Returns:
+            success: 是否有链接更新成功
+            success_count: 成功数量
+            failed_count: 失败数量
+            results: 每个文件的更新结果
+        """
+        try:
+            db_data = await self.aload_data()
+            anime_data = (
+                db_data.get("animes", {}).get(my_pack_id, {}).get(folder_id, {})
+            )
+
+            if not anime_data:
+                print(f"数据库不存在该动漫，需要同步数据")
+                return _batch_result(
+                    [
+                        {"file_id": file_id, "success": False, "message": "动漫不存在"}
+                        for file_id, _, _ in links
+                    ]
+                )
+
+            results = []
+            records = []
+            for file_id, play_url, update_time in links:
+                location = self.locate_file(file_id)
+                if (
+                    not location
+                    or location["container_id"] != my_pack_id
+                    or location["folder_id"] != folder_id
+                ):
+                    results.append(
+                        {
+                            "file_id": file_id,
+                            "success": False,
+                            "message": f"未找到文件ID: {file_id}",
+                        }
+                    )
+                    continue
+
+                update_time = update_time or datetime.now().isoformat()
+                changes = {"play_url": play_url, "update_time": update_time}
+                location["file"].update(changes)
+                records.append(file_record(my_pack_id, folder_id, file_id, changes))
+                results.append(
+                    {
+                        "file_id": file_id,
+                        "success": True,
+                        "play_url": play_url,
+                        "updated_time": update_time,
+                    }
+                )
+
+            result = _batch_result(results)
+            if not result["success_count"]:
+                return result
+
+            if folder_times:
+                anime_data.update(folder_times)
+                records.append(folder_record(my_pack_id, folder_id, folder_times))
+
+            # 保存数据
+            if not self._commit(db_data, records=records):
+                print("保存数据失败")
+                return _batch_result(
+                    [
+                        {
+                            "file_id": r["file_id"],
+                            "success": False,
+                            "message": "保存数据失败",
+                        }
+                        for r in results
+                    ]
+                )
+            return result
+
+        except Exception as e:
+            print(f"批量更新动漫文件播放链接失败: {e}")
+            return _batch_result(
+                [
+                    {
+                        "file_id": file_id,
+                        "success": False,
+                        "message": f"更新失败: {str(e)}",
+                    }
+                    for file_id, _, _ in links
+                ]
+            )
+
+    def _search_index(self, name: str):
+        """搜索索引，name 为 "titles"（标题搜索）或 "suggest"（前缀联想）"""
+        return catalog_cache.search_index(self.db_path, name)
+
+    async def _listing_source(self) -> Dict[str, Any]:
+        """只读的目录数据，搜索索引和分页列表使用"""
+        return await self.aload_data()
+
+    async def _synced_index(self, name: str, data: Dict[str, Any]):
+        """获取与目录数据同步的搜索索引"""
+        index = self._search_index(name)
+        if index.needs_sync(data):
+            # 在写入任务的间隙中同步（I/O 线程），避免遍历时目录被修改
+            await self.write(lambda: run_io(index.ensure, data))
+        return index
+
+    def _index_folder_change(
+        self, container_id: str, folder_id: str, info: Optional[Dict[str, Any]]
+    ):
+        """文件夹标题或封面变化后增量更新搜索索引，info 为 None 表示文件夹已删除"""
+        key = (container_id, folder_id)
+        titles = self._search_index("titles")
+        suggest = self._search_index("suggest")
+        if info is None:
+            titles.remove(key)
+            suggest.remove(key)
+        else:
+            titles.update(key, info.get("title", ""))
+            suggest.update(key, info.get("title", ""), info.get("cover_url", ""))
+
+    async def suggest_titles(self, prefix: str, limit: int = None) -> List[Dict]:
+        """
+        标题前缀联想，包含 Bangumi 的 name/name_cn
+
+        Returns:
+            [{"id": 动漫ID, "title": 标题}]
+        """
+        try:
+            suggest = await self._synced_index("suggest", await self._listing_source())
+            return [
+                {"id": item["key"][1], "title": item["title"]}
+                for item in suggest.suggest(prefix, limit)
+            ]
+        except Exception as e:
+            logger.error(f"获取标题联想失败: {e}")
+            raise SystemException(message="获取标题联想时发生异常", original_error=e)
+
+    async def list_animes(
+        self,
+        container_id: str,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> Dict[str, Any]:
+        """
+        分页获取动漫列表
+
+        按入库顺序从 after 之后取 limit 条，只为本页生成记录
+
+        Args:
+            after: 上一页的 next_cursor（最后一部动漫的 ID）
+            fields: 返回的字段，None 返回全部
+
+        Returns:
+            {"items": [...], "next_cursor": 下一页游标或 None, "total": 总数}
+        """
+        data = await self._listing_source()
+        folders = data.get("animes", {}).get(container_id, {})
+        anime_ids, has_more = page_keys(folders, after, limit)
+        return {
+            "items": [
+                _anime_record(anime_id, folders[anime_id], fields)
+                for anime_id in anime_ids
+            ],
+            "next_cursor": anime_ids[-1] if has_more else None,
+            "total": len(folders),
+        }
+
+    async def iter_animes(
+        self,
+        container_id: str,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐条产出动漫列表，参数同 list_animes
+
+        只取出本页的 ID，记录在发送时才生成；
+        发送期间被删除的动漫直接跳过
+        """
+        data = await self._listing_source()
+        folders = data.get("animes", {}).get(container_id, {})
+        anime_ids, _ = page_keys(folders, after, limit)
+        for anime_id in anime_ids:
+            folder = folders.get(anime_id)
+            if folder is not None:
+                yield _anime_record(anime_id, folder, fields)
+
+    async def search_anime_by_title(
+        self,
+        title: str,
+        limit: int = None,
+        after: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> Dict:
         """
         搜索动漫
+
+        通过标题 n-gram 索引查找，结果按匹配程度排序
+
+        Args:
+            title: 关键词
+            limit: 最多返回的条数，不传返回全部子串匹配
+            after: 上一页的 next_cursor（最后一部动漫的 ID）
+            fields: 返回的字段，None 返回全部
         """
         try:
             # 加载现有数据
-            db_data = self.load_data()
-            anime_list = []
+            db_data = await self._listing_source()
+            titles = await self._synced_index("titles", db_data)
+
+            after_key = None
+            if after is not None:
+                group_id = next(
+                    (g for g, group in db_data["animes"].items() if after in group),
+                    None,
+                )
+                after_key = (group_id, after)
+            try:
+                # 多取一条判断是否还有下一页
+                keys, total = titles.search(
+                    title, None if limit is None else limit + 1, after_key
+                )
+            except KeyError:
+                raise ValidationException("分页游标无效，请从第一页重新获取")
+            has_more = limit is not None and len(keys) > limit
+            keys = keys[:limit]
 
-            # 遍历animes对象下的所有动漫分组
-            for anime_group_id, anime_group in db_data.get("animes", {}).items():
-                # 遍历每个分组下的具体动漫信息
-                for anime_id, anime_info in anime_group.items():
-                    anime_title = anime_info.get("title", "")
-                    # 使用模糊匹配，检查title是否包含在anime_title中
-                    if title.lower() in anime_title.lower():
-                        anime_list.append(
-                            {
-                                "group_id": anime_group_id,  # 分组ID
-                                "id": anime_id,
-                                "title": anime_title,
-                                "status": anime_info.get("status", "连载"),
-                                "summary": anime_info.get("summary", ""),
-                                "cover_url": anime_info.get("cover_url", ""),
-                                "updated_at": anime_info.get("updated_at", ""),
-                                "files_count": len(
-                                    anime_info.get("files", [])
-                                ),  # 文件数量
-                            }
-                        )
+            anime_list = []
+            for anime_group_id, anime_id in keys:
+                anime_info = db_data["animes"][anime_group_id][anime_id]
+                anime_list.append(
+                    select_fields(
+                        {
+                            "group_id": anime_group_id,  # 分组ID
+                            "id": anime_id,
+                            "title": anime_info.get("title", ""),
+                            "status": anime_info.get("status", "连载"),
+                            "summary": anime_info.get("summary", ""),
+                            "cover_url": anime_info.get("cover_url", ""),
+                            "updated_at": anime_info.get("updated_at", ""),
+                            # 文件数量（分片索引中直接记录）
+                            "files_count": anime_info.get(
+                                "files_count", len(anime_info.get("files", []))
+                            ),
+                        },
+                        fields,
+                    )
+                )
 
             return {
                 "anime_list": anime_list,
-                "total": len(anime_list),
+                "total": total,
                 "keyword": title,
+                "next_cursor": keys[-1][1] if has_more else None,
             }
 
+        except ValidationException:
+            raise
         except Exception as e:
             logger.error(f"搜索动漫失败: {e}")
             raise SystemException(message="搜索动漫时发生异常", original_error=e)
@@ -325,7 +796,7 @@ class PikPakDatabase:
         """
         try:
             # 加载现有数据
-            db_data = self.load_data()
+            db_data = await self.aload_data()
             anime_data = (
                 db_data.get("animes", {}).get(my_pack_id, {}).get(folder_id, {})
             )
@@ -334,12 +805,12 @@ class PikPakDatabase:
                 logger.warning("数据库不存在该动漫，需要同步数据")
                 return False
 
-            # 数据处理
-            files = anime_data.get("files", [])
-            for file in files:
-                file_name = file.get("name", "")
-                file_name = file_name.split(".")[0]
-                file["name"] = file_name
+            # 数据处理（复制后再修改，避免污染缓存）
+            anime_data = dict(anime_data)
+            anime_data["files"] = [
+                {**file, "name": file.get("name", "").split(".")[0]}
+                for file in anime_data.get("files", [])
+            ]
 
             return anime_data
 
@@ -349,6 +820,7 @@ class PikPakDatabase:
                 message="获取动漫全部信息时发生异常", original_error=e
             )
 
+    @serialized
     async def update_folder_video_links_time(
         self, folder_id: str, my_pack_id: str, update_time: str = None
     ) -> bool:
@@ -357,7 +829,7 @@ class PikPakDatabase:
         """
         try:
             # 加载现有数据
-            db_data = self.load_data()
+            db_data = await self.aload_data()
             anime_data = (
                 db_data.get("animes", {}).get(my_pack_id, {}).get(folder_id, {})
             )
@@ -370,10 +842,13 @@ class PikPakDatabase:
             if update_time is None:
                 update_time = datetime.now().isoformat()
 
-            anime_data["last_video_update_time"] = update_time
+            changes = {"last_video_update_time": update_time}
+            anime_data.update(changes)
 
             # 保存数据
-            return self.save_data(db_data)
+            return self._commit(
+                db_data, records=[folder_record(my_pack_id, folder_id, changes)]
+            )
 
         except Exception as e:
             print(f"更新动漫文件夹的视频链接的更新时间失败: {e}")
@@ -429,28 +904,51 @@ class PikPakDatabase:
             print(f"获取所有文件夹的调度信息失败: {e}")
             return []
 
+    async def alocate_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """在数据库 I/O 线程中查找文件"""
+        return await run_io(self.locate_file, file_id)
+
+    async def aget_file_play_url(self, file_id: str) -> str:
+        """在数据库 I/O 线程中获取播放链接"""
+        return await run_io(self.get_file_play_url, file_id)
+
     def get_file_play_url(self, file_id: str) -> str:
         """根据文件ID获取播放链接"""
 
         try:
-            # 加载现有数据
-            db_data = self.load_data()
-            animes_data = db_data.get("animes", {})
-
-            # 遍历
-            for container_id, anime_info in animes_data.items():
-                # 遍历所有动漫
-                for folder_id, folder_info in anime_info.items():
-                    # 遍历所有文件夹
-                    files = folder_info.get("files", [])
-
-                    # 查找匹配的文件 ID
-                    for file in files:
-                        if file.get("id") == file_id:
-                            return file.get("play_url", "")
+            location = self.locate_file(file_id)
+            if location:
+                return location["file"].get("play_url", "")
 
             logger.debug(f"数据库中未找到文件ID: {file_id}")
             return None
         except Exception as e:
             logger.error(f"根据文件ID获取播放链接失败: {e}")
             return None
+
+
+def _batch_result(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """汇总批量更新结果"""
+    success_count = sum(1 for r in results if r["success"])
+    return {
+        "success": success_count > 0,
+        "success_count": success_count,
+        "failed_count": len(results) - success_count,
+        "results": results,
+    }
+
+
+def _anime_record(
+    anime_id: str, folder: Dict[str, Any], fields: Optional[Tuple[str, ...]]
+) -> Dict[str, Any]:
+    """动漫列表中的一条记录"""
+    return select_fields(
+        {
+            "id": anime_id,
+            "title": folder.get("title", ""),
+            "status": folder.get("status", "连载"),
+            "cover_url": folder.get("cover_url", ""),
+            "summary": folder.get("summary", ""),
+        },
+        fields,
+    )
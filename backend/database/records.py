@@ -0,0 +1,173 @@
+"""
+紧凑的文件记录
+"""
+
+import sys
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+# 朴素时间（无时区）按 1970-01-01 起的微秒数保存，与 isoformat 可以无损互转
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def iso_to_epoch(value: Any) -> Any:
+    """ISO 时间字符串转为微秒整数，无法无损转换时原样返回"""
+    # 只转换 isoformat() 的两种标准输出，其他写法（带时区、空格分隔等）保留原字符串
+    if (
+        type(value) is not str
+        or len(value) not in (19, 26)
+        or value[10:11] != "T"
+        or value.endswith(".000000")
+    ):
+        return value
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    seconds = (
+        (moment.toordinal() - _EPOCH_ORDINAL) * 86400
+        + moment.hour * 3600
+        + moment.minute * 60
+        + moment.second
+    )
+    return seconds * 1_000_000 + moment.microsecond
+
+
+def epoch_to_iso(value: Any) -> Any:
+    """微秒整数转回 ISO 时间字符串"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return (_EPOCH + value * _MICROSECOND).isoformat()
+    return value
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+# 字段缺失时槽位中的占位值
+_MISSING = object()
+
+# 有独立槽位的字段，update_time 单独处理
+_SLOT_FIELDS = ("id", "name", "play_url")
+_KEYS = _SLOT_FIELDS + ("update_time",)
+
+
+class FileRecord(MutableMapping):
+    """
+    文件记录
+
+    用 __slots__ 保存 id、name、play_url 和 update_time，其余字段放在 extra 中；
+    id 和 name 使用驻留字符串（id 与文件索引共用，"01.mkv" 这类文件名在各部动漫间重复），
+    update_time 以微秒整数保存。
+    对外仍是 {"id", "name", "play_url", "update_time"} 形式的映射，
+    读取 update_time 时转回 ISO 字符串，原有按字典读写的代码无需修改。
+    """
+
+    __slots__ = ("id", "name", "play_url", "update_epoch", "extra")
+
+    def __init__(
+        self,
+        id: Any = _MISSING,
+        name: Any = _MISSING,
+        play_url: Any = _MISSING,
+        update_time: Any = _MISSING,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.id = _intern(id)
+        self.name = _intern(name)
+        self.play_url = play_url
+        self.update_epoch = iso_to_epoch(update_time)
+        self.extra = extra or None
+
+    @classmethod
+    def from_mapping(cls, file: Any) -> "FileRecord":
+        if isinstance(file, cls):
+            return file
+        return cls(
+            file.get("id", _MISSING),
+            file.get("name", _MISSING),
+            file.get("play_url", _MISSING),
+            file.get("update_time", _MISSING),
+            {k: v for k, v in file.items() if k not in _KEYS},
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "update_time":
+            value = epoch_to_iso(self.update_epoch)
+        elif key in _SLOT_FIELDS:
+            value = getattr(self, key)
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        else:
+            raise KeyError(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        if key == "update_time":
+            self.update_epoch = iso_to_epoch(value)
+        elif key in ("id", "name"):
+            setattr(self, key, _intern(value))
+        elif key in _SLOT_FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key: str):
+        self[key]  # 不存在时抛出 KeyError
+        if key == "update_time":
+            self.update_epoch = _MISSING
+        elif key in _SLOT_FIELDS:
+            setattr(self, key, _MISSING)
+        else:
+            del self.extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for key, value in (
+            ("id", self.id),
+            ("name", self.name),
+            ("play_url", self.play_url),
+            ("update_time", self.update_epoch),
+        ):
+            if value is not _MISSING:
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转为公开的字典形式"""
+        return {key: self[key] for key in self}
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.to_dict()!r})"
+
+
+def compact_files(files: List[Any]) -> List[FileRecord]:
+    """把文件列表转为紧凑记录"""
+    return [FileRecord.from_mapping(file) for file in files]
+
+
+def compact_catalog(data: Dict[str, Any]) -> Dict[str, Any]:
+    """原地把目录中所有文件夹的文件列表转为紧凑记录"""
+    for folders in data.get("animes", {}).values():
+        for info in folders.values():
+            files = info.get("files")
+            if files:
+                info["files"] = compact_files(files)
+    return data
+
+
+def to_plain(value: Any) -> Dict[str, Any]:
+    """JSON 编码时把紧凑记录转回字典，其他类型不支持"""
+    if isinstance(value, FileRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
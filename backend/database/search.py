@@ -0,0 +1,364 @@
+"""
+动漫标题 n-gram 搜索索引
+"""
+
+import bisect
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+# 中日韩文字最长切到二元组，拉丁字母和数字最长切到三元组
+CJK_GRAM = 2
+LATIN_GRAM = 3
+
+# 模糊匹配时至少命中的 n-gram 比例
+FUZZY_RATIO = 0.6
+
+# 缓存排好序的查询结果数
+RANKED_CACHE_SIZE = 1024
+
+# 倒排表达到这个长度时按匹配程度预先排序并增量维护，
+# 单个 n-gram 的查询（输入框的第一个字）不需要在查询时排序整个倒排表
+SORTED_POSTING_MIN = 256
+
+
+def normalize(text: str) -> str:
+    """统一全角/半角和大小写"""
+    return unicodedata.normalize("NFKC", text or "").casefold()
+
+
+def _is_cjk(char: str) -> bool:
+    code = ord(char)
+    return (
+        0x3040 <= code <= 0x30FF  # 平假名、片假名
+        or 0x3400 <= code <= 0x4DBF  # 扩展 A
+        or 0x4E00 <= code <= 0x9FFF  # 基本汉字
+        or 0xAC00 <= code <= 0xD7AF  # 韩文
+        or 0xF900 <= code <= 0xFAFF  # 兼容汉字
+    )
+
+
+def _runs(text: str) -> Iterable[Tuple[str, int]]:
+    """把文本切分成连续的中日韩文字段和字母数字段，返回 (片段, gram 长度)"""
+    run, size = "", 0
+    for char in text:
+        if _is_cjk(char):
+            char_size = CJK_GRAM
+        elif char.isalnum():
+            char_size = LATIN_GRAM
+        else:
+            char_size = 0
+
+        if char_size != size and run:
+            yield run, size
+            run = ""
+        size = char_size
+        if char_size:
+            run += char
+    if run:
+        yield run, size
+
+
+def ngrams(text: str) -> Set[str]:
+    """
+    切分标题的 n-gram（长度 1 到 n 的全部子串）
+
+    查询的 n-gram 一定是包含它的标题的 n-gram 子集，
+    因此按查询的 n-gram 求交集得到的候选一定包含所有子串匹配
+    """
+    grams = set()
+    for run, size in _runs(text):
+        for n in range(1, size + 1):
+            for i in range(len(run) - n + 1):
+                grams.add(run[i : i + n])
+    return grams
+
+
+def query_ngrams(text: str) -> Set[str]:
+    """切分查询的 n-gram：只取最长的一级，短于 n 的片段整体作为一个 n-gram"""
+    grams = set()
+    for run, size in _runs(text):
+        if len(run) <= size:
+            grams.add(run)
+            continue
+        for i in range(len(run) - size + 1):
+            grams.add(run[i : i + size])
+    return grams
+
+
+def _rank_key(title: str, needle: str) -> Optional[Tuple[int, int, int, str]]:
+    """
+    匹配程度，越小越靠前；不匹配返回 None
+
+    完全一致 > 前缀匹配 > 词首匹配 > 子串匹配，同级按匹配位置、标题长度排序
+    """
+    position = title.find(needle)
+    if position < 0:
+        return None
+    if title == needle:
+        tier = 0
+    elif position == 0:
+        tier = 1
+    elif not title[position - 1].isalnum():
+        tier = 2
+    else:
+        tier = 3
+    return tier, position, len(title), title
+
+
+class TitleIndex:
+    """
+    标题倒排索引
+
+    n-gram -> 标题 ID 集合。查询时按最稀有的 n-gram 开始求交集得到候选，再用子串匹配校验并排序；
+    查询本身就是一个 n-gram 时（输入框的前几个字），倒排表就是精确结果，不需要校验；
+    较长的倒排表预先按匹配程度排好序，标题变化时按位置插入或删除，查询只需切片。
+    其他查询排好序的结果按查询缓存，标题变化时只丢弃结果受影响的查询，同样的查询只需取前 limit 条。
+    子串匹配不足 limit 条时，补充命中大部分 n-gram 的模糊结果。
+    索引按标题增量维护；数据整体替换后标记为过期，下次查询时按差异同步。
+    同步可以放到 I/O 线程中执行，所有操作由锁保护。
+    """
+
+    def __init__(self):
+        self._ids: Dict[Hashable, int] = {}
+        self._keys: List[Optional[Hashable]] = []
+        self._titles: List[str] = []
+        self._grams: Dict[str, Set[int]] = {}
+        self._sorted: Dict[str, List[int]] = {}  # n-gram -> 按匹配程度排序的倒排表
+        self._free: List[int] = []
+        self._ranked: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.source: Any = None  # 最近一次同步的数据对象
+        self.stale = True
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def update(self, key: Hashable, title: str):
+        """新增或更新标题"""
+        with self._lock:
+            self._update(key, normalize(title))
+
+    def _update(self, key: Hashable, normalized: str):
+        doc_id = self._ids.get(key)
+        previous = ""
+        if doc_id is not None:
+            previous = self._titles[doc_id]
+            if previous == normalized:
+                return
+            self._unlink(doc_id)
+        elif self._free:
+            doc_id = self._free.pop()
+            self._keys[doc_id] = key
+            self._ids[key] = doc_id
+        else:
+            doc_id = len(self._keys)
+            self._keys.append(key)
+            self._titles.append("")
+            self._ids[key] = doc_id
+
+        self._titles[doc_id] = normalized
+        for gram in ngrams(normalized):
+            self._grams.setdefault(gram, set()).add(doc_id)
+            ranked = self._sorted.get(gram)
+            if ranked is not None:
+                bisect.insort(ranked, doc_id, key=self._rank_of(gram))
+        self._invalidate(previous, normalized)
+
+    def remove(self, key: Hashable):
+        """删除标题"""
+        with self._lock:
+            doc_id = self._ids.pop(key, None)
+            if doc_id is None:
+                return
+            self._unlink(doc_id)
+            self._invalidate(self._titles[doc_id])
+            self._keys[doc_id] = None
+            self._titles[doc_id] = ""
+            self._free.append(doc_id)
+
+    def _invalidate(self, *titles: str):
+        """
+        标题变化后只丢弃受影响的查询缓存
+
+        子串匹配结果只包含含有查询的标题，变化前后的标题都不含查询时结果不变；
+        模糊匹配结果全部在下次使用时重新计算
+        """
+        for needle in [n for n in self._ranked if any(n in t for t in titles)]:
+            del self._ranked[needle]
+        for entry in self._ranked.values():
+            entry[1] = None
+
+    def _unlink(self, doc_id: int):
+        """从倒排表中删除，调用时 _titles 中还是原来的标题"""
+        for gram in ngrams(self._titles[doc_id]):
+            postings = self._grams.get(gram)
+            if postings is not None:
+                postings.discard(doc_id)
+                if not postings:
+                    del self._grams[gram]
+
+            ranked = self._sorted.get(gram)
+            if ranked is not None:
+                rank_of = self._rank_of(gram)
+                position = bisect.bisect_left(ranked, rank_of(doc_id), key=rank_of)
+                if position < len(ranked) and ranked[position] == doc_id:
+                    del ranked[position]
+                if not ranked:
+                    del self._sorted[gram]
+
+    def _rank_of(self, gram: str) -> Callable[[int], tuple]:
+        """倒排表的排序键，同级按 doc_id 区分，保证顺序确定"""
+        return lambda doc_id: (*_rank_key(self._titles[doc_id], gram), doc_id)
+
+    def _sorted_posting(self, gram: str) -> Optional[List[int]]:
+        """较长倒排表的排序结果，第一次使用时排序，之后增量维护"""
+        ranked = self._sorted.get(gram)
+        if ranked is None:
+            postings = self._grams.get(gram, ())
+            if len(postings) < SORTED_POSTING_MIN:
+                return None
+            ranked = self._sorted[gram] = sorted(postings, key=self._rank_of(gram))
+        return ranked
+
+    def sync(self, items: Iterable[Tuple[Hashable, str]], source: Any = None):
+        """按差异同步到最新的标题集合"""
+        with self._lock:
+            seen = set()
+            for key, title in items:
+                seen.add(key)
+                self._update(key, normalize(title))
+            for key in [key for key in self._ids if key not in seen]:
+                self.remove(key)
+            # 预先排序较长的倒排表，第一次查询常用字时不需要排序
+            for gram in list(self._grams):
+                self._sorted_posting(gram)
+            self.source = source
+            self.stale = False
+
+    def needs_sync(self, data: Any) -> bool:
+        return self.stale or self.source is not data
+
+    def ensure(self, data: Dict[str, Any]):
+        """索引过期或数据对象已替换时，从目录数据同步"""
+        if self.needs_sync(data):
+            self.sync(
+                (
+                    ((group_id, anime_id), info.get("title", ""))
+                    for group_id, group in data.get("animes", {}).items()
+                    for anime_id, info in group.items()
+                ),
+                source=data,
+            )
+
+    def search(
+        self, query: str, limit: Optional[int] = None, after: Hashable = None
+    ) -> Tuple[List[Hashable], int]:
+        """
+        搜索标题
+
+        排序: 完全一致 > 前缀匹配 > 词首匹配 > 子串匹配 > 模糊匹配，
+        同级按匹配位置、标题长度排序
+
+        Args:
+            after: 上一页最后一个 key，从它之后继续取
+
+        Returns:
+            (按匹配程度排序的 key 列表，截断到 limit；子串匹配总数)
+        """
+        needle = normalize(query).strip()
+        if not needle:
+            return [], 0
+
+        with self._lock:
+            grams = query_ngrams(needle)
+            ranked = self._sorted_posting(needle) if grams == {needle} else None
+            entry = self._ranked.get(needle) if ranked is None else None
+            if ranked is not None:
+                # 预先排序的倒排表随标题变化维护，不经过查询缓存
+                entry = [ranked, None]
+            elif entry is None:
+                # [子串匹配结果, 模糊匹配结果（需要时才计算）]
+                entry = [self._rank(needle, grams), None]
+                self._ranked[needle] = entry
+                if len(self._ranked) > RANKED_CACHE_SIZE:
+                    self._ranked.popitem(last=False)
+            else:
+                self._ranked.move_to_end(needle)
+
+            ranked = entry[0]
+            start = 0 if after is None else self._position(entry, grams, after)
+            if limit is None:
+                doc_ids = ranked[start:]
+            else:
+                doc_ids = ranked[start : start + limit]
+                if len(doc_ids) < limit and len(grams) >= 2:
+                    fuzzy = self._fuzzy_tail(entry, grams)
+                    offset = max(0, start - len(ranked))
+                    doc_ids = doc_ids + fuzzy[offset : offset + limit - len(doc_ids)]
+            return [self._keys[doc_id] for doc_id in doc_ids], len(ranked)
+
+    def _fuzzy_tail(self, entry: list, grams: Set[str]) -> List[int]:
+        if entry[1] is None:
+            entry[1] = self._fuzzy(grams, set(entry[0]))
+        return entry[1]
+
+    def _position(self, entry: list, grams: Set[str], after: Hashable) -> int:
+        """上一页最后一个 key 之后的位置（子串匹配在前，模糊匹配在后）"""
+        doc_id = self._ids.get(after)
+        ranked = entry[0]
+        if doc_id is not None:
+            try:
+                return ranked.index(doc_id) + 1
+            except ValueError:
+                pass
+            if len(grams) >= 2:
+                fuzzy = self._fuzzy_tail(entry, grams)
+                if doc_id in fuzzy:
+                    return len(ranked) + fuzzy.index(doc_id) + 1
+        raise KeyError(after)
+
+    def _rank(self, needle: str, grams: Set[str]) -> List[int]:
+        """找出包含 needle 的全部标题并按匹配程度排序"""
+        if grams == {needle}:
+            # 查询就是一个 n-gram，倒排表即精确结果
+            return sorted(self._grams.get(needle, ()), key=self._rank_of(needle))
+
+        if grams:
+            postings = sorted((self._grams.get(gram, set()) for gram in grams), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates &= posting
+        else:
+            # 查询中没有文字，退化为逐个比较
+            candidates = [i for i, key in enumerate(self._keys) if key is not None]
+
+        # 先用子串判断过滤候选，只为真正匹配的标题计算排序键
+        titles = self._titles
+        matches = [doc_id for doc_id in candidates if needle in titles[doc_id]]
+        return sorted(matches, key=self._rank_of(needle))
+
+    def _fuzzy(self, grams: Set[str], exclude: Set[int]) -> List[int]:
+        """
+        命中大部分 n-gram 的近似结果，按命中数量排序
+
+        命中 threshold 个 n-gram 的标题一定出现在最短的 len(grams) - threshold + 1 个倒排表中，
+        只从这些倒排表取候选，不遍历常用字的长倒排表
+        """
+        threshold = max(2, int(len(grams) * FUZZY_RATIO + 0.999))
+        postings = sorted((self._grams.get(gram, set()) for gram in grams), key=len)
+        candidates = set().union(*postings[: len(grams) - threshold + 1]) - exclude
+        hits = dict.fromkeys(candidates, 0)
+        for posting in postings:
+            for doc_id in candidates & posting:
+                hits[doc_id] += 1
+
+        scored = sorted(
+            (-count, len(self._titles[doc_id]), doc_id)
+            for doc_id, count in hits.items()
+            if count >= threshold
+        )
+        return [doc_id for _, _, doc_id in scored]
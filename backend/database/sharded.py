@@ -0,0 +1,741 @@
+"""
+按文件夹分片的动漫数据库
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from loguru import logger
+
+from config.settings import settings
+from database.codec import get_codec
+from database.executor import io_stats, run_io
+from database.persistence import CatalogPersistence, DebouncedFlush, get_persistence
+from database.pikpak import PikPakDatabase, _batch_result
+from database.records import FileRecord, compact_files
+from database.search import TitleIndex
+from database.suggest import SuggestIndex
+from database.versions import LISTING_FIELDS, CatalogVersions, catalog_generation
+from database.writer import get_writer, serialized
+from exceptions import SystemException, ValidationException
+
+FolderKey = Tuple[str, str]
+
+
+class ShardStore(DebouncedFlush):
+    """
+    分片存储
+
+    目录结构:
+        index.json                      文件夹元数据（标题、状态、封面、集数等）
+        files.json                      文件ID -> (container_id, folder_id)
+        shards/<container>/<folder>.json  单个文件夹的文件列表
+
+    索引常驻内存，分片按需加载并按 LRU 缓存；修改只标记对应的文件，防抖后统一落盘。
+    分片目录归当前进程所有，不检测其他进程的修改。
+    """
+
+    def __init__(self, root: str, flush_delay: float = None):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self.files_path = os.path.join(root, "files.json")
+        self.flush_delay = (
+            settings.DATABASE_FLUSH_DELAY if flush_delay is None else flush_delay
+        )
+        self.cache_size = settings.DATABASE_SHARD_CACHE_SIZE
+
+        self._lock = threading.RLock()
+        self._index: Optional[Dict[str, Any]] = None
+        self._file_map: Optional[Dict[str, List[str]]] = None
+        self._shards: "OrderedDict[FolderKey, List[Dict[str, Any]]]" = OrderedDict()
+        self._dirty: set = set()  # "index"、"files" 或 (container_id, folder_id)
+        self._deleted: set = set()  # 待删除的分片
+        self._timer = None
+        self.runner = None
+        # 搜索索引按索引对象同步，replace 后自动重建
+        self.search = {"titles": TitleIndex(), "suggest": SuggestIndex()}
+        self.versions = CatalogVersions()
+
+        # 统计
+        self.shard_hits = 0
+        self.shard_loads = 0
+        self.evictions = 0
+        self.mutations = 0
+        self.flushes = 0
+        self.shard_writes = 0
+
+    def shard_path(self, container_id: str, folder_id: str) -> str:
+        return os.path.join(self.root, "shards", container_id, f"{folder_id}.json")
+
+    @staticmethod
+    def _read_json(path: str, default: Any) -> Any:
+        if not os.path.exists(path):
+            return default
+        return get_codec().read(path)
+
+    # ---------- 读取 ----------
+
+    @property
+    def index_loaded(self) -> bool:
+        return self._index is not None
+
+    def index(self) -> Dict[str, Any]:
+        """文件夹元数据索引 {"animes": {...}, "metadata": {...}}"""
+        with self._lock:
+            if self._index is None:
+                now = datetime.now().isoformat()
+                self._index = self._read_json(
+                    self.index_path,
+                    {
+                        "animes": {},
+                        "metadata": {"created_at": now, "last_updated": now},
+                    },
+                )
+                self.versions.reset(catalog_generation(self._index))
+            return self._index
+
+    def folder(self, container_id: str, folder_id: str) -> Optional[Dict[str, Any]]:
+        """文件夹元数据（不含文件列表）"""
+        return self.index()["animes"].get(container_id, {}).get(folder_id)
+
+    def file_map(self) -> Dict[str, List[str]]:
+        """文件ID -> [container_id, folder_id]"""
+        with self._lock:
+            if self._file_map is None:
+                self._file_map = self._read_json(self.files_path, {})
+            return self._file_map
+
+    def is_cached(self, container_id: str, folder_id: str) -> bool:
+        return (container_id, folder_id) in self._shards
+
+    def files(self, container_id: str, folder_id: str) -> List[Dict[str, Any]]:
+        """文件夹的文件列表，未缓存时从分片文件加载"""
+        key = (container_id, folder_id)
+        with self._lock:
+            files = self._shards.get(key)
+            if files is not None:
+                self._shards.move_to_end(key)
+                self.shard_hits += 1
+                return files
+
+            files = compact_files(
+                self._read_json(
+                    self.shard_path(container_id, folder_id), {"files": []}
+                )["files"]
+            )
+            self.shard_loads += 1
+            self._shards[key] = files
+            self._evict()
+            return files
+
+    def _evict(self):
+        """淘汰最久未使用且没有待落盘修改的分片"""
+        for key in list(self._shards):
+            if len(self._shards) <= self.cache_size:
+                return
+            if key not in self._dirty:
+                del self._shards[key]
+                self.evictions += 1
+
+    def materialize(self) -> Dict[str, Any]:
+        """还原完整的 JSON 文档结构"""
+        with self._lock:
+            index = self.index()
+            animes = {}
+            for container_id, folders in index["animes"].items():
+                animes[container_id] = {}
+                for folder_id, info in folders.items():
+                    folder = {k: v for k, v in info.items() if k != "files_count"}
+                    key = (container_id, folder_id)
+                    if key in self._shards:
+                        # 复制一份，调用方修改后通过 save_data 写回
+                        folder["files"] = [dict(f) for f in self._shards[key]]
+                    else:
+                        # 整体读取时不进入缓存，避免冲掉常用分片
+                        folder["files"] = self._read_json(
+                            self.shard_path(container_id, folder_id), {"files": []}
+                        )["files"]
+                    animes[container_id][folder_id] = folder
+            return {"animes": animes, "metadata": dict(index["metadata"])}
+
+    # ---------- 修改 ----------
+
+    def touch(
+        self,
+        container_id: str,
+        folder_id: str,
+        files_changed: bool = False,
+        listing: bool = False,
+    ) -> None:
+        """
+        标记文件夹已修改
+
+        Args:
+            files_changed: 文件列表是否增删，是则同步更新集数和文件ID映射
+            listing: 列表页展示的字段是否变化
+        """
+        with self._lock:
+            key = (container_id, folder_id)
+            self.versions.bump(key, listing)
+            self.index()["metadata"]["last_updated"] = datetime.now().isoformat()
+            self._dirty.add("index")
+            if key in self._shards:
+                self._dirty.add(key)
+                if files_changed:
+                    self._reindex_folder(container_id, folder_id, self._shards[key])
+            self.mutations += 1
+            self._schedule_flush()
+
+    def _reindex_folder(
+        self, container_id: str, folder_id: str, files: List[Dict[str, Any]]
+    ):
+        file_map = self.file_map()
+        for file_id, location in list(file_map.items()):
+            if location == [container_id, folder_id]:
+                del file_map[file_id]
+        for file in files:
+            file_map[file["id"]] = [container_id, folder_id]
+
+        folder = self.folder(container_id, folder_id)
+        if folder is not None:
+            folder["files_count"] = len(files)
+        self._dirty.add("files")
+
+    def replace(self, data: Dict[str, Any]):
+        """用完整文档替换存储内容，只重写有变化的分片"""
+        with self._lock:
+            index = self.index()
+            old_keys = {
+                (container_id, folder_id)
+                for container_id, folders in index["animes"].items()
+                for folder_id in folders
+            }
+
+            animes = {}
+            for container_id, folders in data.get("animes", {}).items():
+                animes[container_id] = {}
+                for folder_id, folder in folders.items():
+                    files = folder.get("files", [])
+                    animes[container_id][folder_id] = {
+                        **{k: v for k, v in folder.items() if k != "files"},
+                        "files_count": len(files),
+                    }
+                    key = (container_id, folder_id)
+                    if key not in old_keys or self.files(*key) != files:
+                        self._shards[key] = [
+                            FileRecord.from_mapping(dict(f)) for f in files
+                        ]
+                        self._dirty.add(key)
+                    self._deleted.discard(key)
+
+            new_keys = {
+                (container_id, folder_id)
+                for container_id, folders in animes.items()
+                for folder_id in folders
+            }
+            for key in old_keys - new_keys:
+                self._shards.pop(key, None)
+                self._dirty.discard(key)
+                self._deleted.add(key)
+
+            self._index = {
+                "animes": animes,
+                "metadata": {
+                    **data.get("metadata", {}),
+                    "last_updated": datetime.now().isoformat(),
+                },
+            }
+            self._file_map = {
+                file["id"]: [container_id, folder_id]
+                for container_id, folders in data.get("animes", {}).items()
+                for folder_id, folder in folders.items()
+                for file in folder.get("files", [])
+            }
+            self._dirty.update(("index", "files"))
+            self.versions.reset(catalog_generation(self._index))
+            self.mutations += 1
+            self._evict()
+            self._schedule_flush()
+
+    def flush(self, cancel_timer: bool = True) -> bool:
+        """把修改过的索引和分片写入磁盘"""
+        with self._lock:
+            self._cancel_timer(cancel_timer)
+            if not (self._dirty or self._deleted):
+                return True
+
+            try:
+                for key in [k for k in self._dirty if isinstance(k, tuple)]:
+                    path = self.shard_path(*key)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    CatalogPersistence.write_atomic(path, {"files": self._shards[key]})
+                    self._dirty.discard(key)
+                    self.shard_writes += 1
+                for key in list(self._deleted):
+                    path = self.shard_path(*key)
+                    if os.path.exists(path):
+                        os.remove(path)
+                    self._deleted.discard(key)
+                if "files" in self._dirty:
+                    CatalogPersistence.write_atomic(self.files_path, self._file_map)
+                    self._dirty.discard("files")
+                if "index" in self._dirty:
+                    CatalogPersistence.write_atomic(self.index_path, self._index)
+                    self._dirty.discard("index")
+            except Exception as e:
+                logger.error(f"保存分片数据库失败: {e}")
+                return False
+
+            self.flushes += 1
+            self._evict()
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """获取分片缓存统计"""
+        return {
+            "cached_shards": len(self._shards),
+            "cache_size": self.cache_size,
+            "shard_hits": self.shard_hits,
+            "shard_loads": self.shard_loads,
+            "evictions": self.evictions,
+            "dirty": len(self._dirty),
+            "mutations": self.mutations,
+            "flushes": self.flushes,
+            "shard_writes": self.shard_writes,
+        }
+
+
+class ShardedPikPakDatabase(PikPakDatabase):
+    """
+    分片存储的 PikPak 数据库
+
+    列表和搜索只读取索引，单个动漫的读取和修改只加载对应的分片；
+    load_data/save_data 仍然提供完整的文档视图，供同步等整体操作使用。
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.SHARDED_DATABASE_PATH
+        os.makedirs(self.db_path, exist_ok=True)
+        self.store: ShardStore = get_persistence(self.db_path, ShardStore)
+        self.writer = get_writer(self.db_path)
+        self.store.runner = self.writer.submit
+
+    def load_data(self) -> Dict[str, Any]:
+        """加载完整的数据库文档（会读取所有分片）"""
+        try:
+            return self.store.materialize()
+        except Exception as e:
+            print(f"加载数据库失败: {e}")
+            return {"animes": {}, "metadata": {}}
+
+    async def aload_data(self) -> Dict[str, Any]:
+        return await run_io(self.load_data)
+
+    async def aload_listing(self) -> Dict[str, Any]:
+        """只读取索引，文件夹信息中用 files_count 代替文件列表"""
+        await self._aindex()
+        index = self.store.index()
+        return {
+            "animes": {
+                container_id: dict(folders)
+                for container_id, folders in index["animes"].items()
+            },
+            "metadata": dict(index["metadata"]),
+        }
+
+    async def folder_version(self, container_id: str, folder_id: str) -> str:
+        """分片目录归当前进程所有，不需要检查磁盘；代数在索引加载时确定"""
+        await self._aindex()
+        return self.store.versions.folder((container_id, folder_id))
+
+    async def listing_version(self) -> str:
+        await self._aindex()
+        return self.store.versions.listing()
+
+    def save_data(self, data: Dict[str, Any], flush: bool = False) -> bool:
+        """用完整文档替换数据库内容（同步等整体操作使用）"""
+        try:
+            self.store.replace(data)
+            if flush:
+                return self.store.flush()
+            return True
+        except Exception as e:
+            print(f"保存数据库失败: {e}")
+            return False
+
+    def flush(self) -> bool:
+        return self.store.flush()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取分片缓存、写入队列和 I/O 线程统计"""
+        return {
+            "backend": "sharded",
+            **self.store.stats(),
+            "writer": self.writer.stats(),
+            "io": io_stats(),
+        }
+
+    def _search_index(self, name: str):
+        return self.store.search[name]
+
+    async def _listing_source(self) -> Dict[str, Any]:
+        """搜索和分页列表只需要索引"""
+        await self._aindex()
+        return self.store.index()
+
+    async def _aindex(self):
+        """确保索引已加载（首次加载在 I/O 线程中进行）"""
+        if not self.store.index_loaded:
+            await run_io(self.store.index)
+
+    async def _afolder(
+        self, container_id: str, folder_id: str
+    ) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """获取文件夹元数据和文件列表，分片未缓存时在 I/O 线程中加载"""
+        await self._aindex()
+        info = self.store.folder(container_id, folder_id)
+        if info is None:
+            return None, []
+        if self.store.is_cached(container_id, folder_id):
+            return info, self.store.files(container_id, folder_id)
+        return info, await run_io(self.store.files, container_id, folder_id)
+
+    @staticmethod
+    def _find(files: List[Dict[str, Any]], file_id: str) -> Optional[Dict[str, Any]]:
+        for file in files:
+            if file.get("id") == file_id:
+                return file
+        return None
+
+    def locate_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """通过文件ID映射找到所在分片"""
+        location = self.store.file_map().get(file_id)
+        if location is None:
+            return None
+
+        container_id, folder_id = location
+        files = self.store.files(container_id, folder_id)
+        for position, file in enumerate(files):
+            if file.get("id") == file_id:
+                return {
+                    "container_id": container_id,
+                    "folder_id": folder_id,
+                    "position": position,
+                    "file": file,
+                }
+        return None
+
+    def get_anime_detail(self, anime_id: str, my_pack_id: str) -> Dict[str, Any]:
+        """获取动漫详细信息（只读索引）"""
+        info = self.store.folder(my_pack_id, anime_id)
+        if not info:
+            return {}
+
+        return {
+            "id": anime_id,
+            "title": info.get("title", ""),
+            "status": info.get("status", "连载"),
+            "summary": info.get("summary", ""),
+            "cover_url": info.get("cover_url", ""),
+            "updated_at": info.get("updated_at", ""),
+        }
+
+    async def aget_anime_detail(self, anime_id: str, my_pack_id: str) -> Dict[str, Any]:
+        await self._aindex()
+        return self.get_anime_detail(anime_id, my_pack_id)
+
+    async def aget_folder_files(
+        self, container_id: str, folder_id: str
+    ) -> List[Dict[str, Any]]:
+        """只加载这个文件夹的分片"""
+        _, files = await self._afolder(container_id, folder_id)
+        return files
+
+    @serialized
+    async def update_anime_info(
+        self, anime_id: str, update_data: Dict[str, Any], my_pack_id: str
+    ) -> bool:
+        """更新动漫信息"""
+        try:
+            await self._aindex()
+            info = self.store.folder(my_pack_id, anime_id)
+            if info is None:
+                print(f"动漫 {anime_id} 不存在")
+                return False
+
+            updatable_fields = ["title", "status", "summary", "cover_url"]
+            info.update(
+                {
+                    field: update_data[field]
+                    for field in updatable_fields
+                    if field in update_data
+                }
+            )
+            info["updated_at"] = datetime.now().isoformat()
+            if {"title", "cover_url"} & update_data.keys():
+                self._index_folder_change(my_pack_id, anime_id, info)
+            self.store.touch(
+                my_pack_id,
+                anime_id,
+                listing=bool(LISTING_FIELDS & update_data.keys()),
+            )
+            return True
+
+        except Exception as e:
+            print(f"更新动漫信息失败: {e}")
+            return False
+
+    @serialized
+    async def del_anime_files(
+        self, folder_id: str, file_ids: List[str], my_pack_id: str
+    ) -> bool:
+        """删除动漫文件"""
+        try:
+            info, files = await self._afolder(my_pack_id, folder_id)
+            if info is None:
+                print(f"数据库不存在该动漫，需要同步数据")
+                return False
+
+            removed_ids = set(file_ids)
+            files[:] = [f for f in files if f.get("id") not in removed_ids]
+            self.store.touch(my_pack_id, folder_id, files_changed=True)
+            return True
+
+        except Exception as e:
+            print(f"删除动漫文件失败: {e}")
+            return False
+
+    @serialized
+    async def rename_anime_file(
+        self, file_id: str, new_name: str, my_pack_id: str, folder_id: str
+    ) -> bool:
+        """更新动漫文件名称"""
+        try:
+            info, files = await self._afolder(my_pack_id, folder_id)
+            if info is None:
+                logger.warning(f"数据库不存在该动漫，需要同步数据")
+                raise ValidationException("数据库不存在该动漫，请先同步数据")
+
+            file = self._find(files, file_id)
+            if file is None:
+                return True
+
+            file["name"] = new_name
+            self.store.touch(my_pack_id, folder_id)
+            return True
+
+        except Exception as e:
+            logger.error(f"更新动漫文件名称失败: {e}")
+            raise SystemException(message="更新动漫文件名称失败", original_error=e)
+
+    @serialized
+    async def update_anime_file_link(
+        self, file_id: str, play_url: str, my_pack_id: str, folder_id: str
+    ) -> dict:
+        """更新动漫文件播放链接"""
+        result = await self.batch_update_file_links(
+            folder_id, my_pack_id, [(file_id, play_url, None)]
+        )
+        item = result["results"][0] if result["results"] else {}
+        if not item.get("success"):
+            return {
+                "success": False,
+                "message": item.get("message", "更新失败"),
+                "data": {},
+            }
+        return {
+            "success": True,
+            "message": "更新成功",
+            "data": {
+                "file_id": file_id,
+                "play_url": play_url,
+                "updated_time": item["updated_time"],
+            },
+        }
+
+    @serialized
+    async def batch_update_file_links(
+        self,
+        folder_id: str,
+        my_pack_id: str,
+        links: List[Tuple[str, str, Optional[str]]],
+        folder_times: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """批量更新动漫文件播放链接，只修改一个分片"""
+        try:
+            info, files = await self._afolder(my_pack_id, folder_id)
+            if info is None:
+                print(f"数据库不存在该动漫，需要同步数据")
+                return _batch_result(
+                    [
+                        {"file_id": file_id, "success": False, "message": "动漫不存在"}
+                        for file_id, _, _ in links
+                    ]
+                )
+
+            by_id = {file.get("id"): file for file in files}
+            results = []
+            for file_id, play_url, update_time in links:
+                file = by_id.get(file_id)
+                if file is None:
+                    results.append(
+                        {
+                            "file_id": file_id,
+                            "success": False,
+                            "message": f"未找到文件ID: {file_id}",
+                        }
+                    )
+                    continue
+
+                update_time = update_time or datetime.now().isoformat()
+                file.update({"play_url": play_url, "update_time": update_time})
+                results.append(
+                    {
+                        "file_id": file_id,
+                        "success": True,
+                        "play_url": play_url,
+                        "updated_time": update_time,
+                    }
+                )
+
+            result = _batch_result(results)
+            if not result["success_count"]:
+                return result
+
+            if folder_times:
+                info.update(folder_times)
+            self.store.touch(my_pack_id, folder_id)
+            return result
+
+        except Exception as e:
+            print(f"批量更新动漫文件播放链接失败: {e}")
+            return _batch_result(
+                [
+                    {
+                        "file_id": file_id,
+                        "success": False,
+                        "message": f"更新失败: {str(e)}",
+                    }
+                    for file_id, _, _ in links
+                ]
+            )
+
+    async def get_anime_all(self, folder_id, my_pack_id):
+        """获取动漫全部信息（只加载一个分片）"""
+        try:
+            info, files = await self._afolder(my_pack_id, folder_id)
+            if info is None:
+                logger.warning("数据库不存在该动漫，需要同步数据")
+                return False
+
+            anime_data = {k: v for k, v in info.items() if k != "files_count"}
+            anime_data["files"] = [
+                {**file, "name": file.get("name", "").split(".")[0]} for file in files
+            ]
+            return anime_data
+
+        except Exception as e:
+            logger.error(f"获取动漫全部信息失败: {e}")
+            raise SystemException(
+                message="获取动漫全部信息时发生异常", original_error=e
+            )
+
+    @serialized
+    async def update_folder_video_links_time(
+        self, folder_id: str, my_pack_id: str, update_time: str = None
+    ) -> bool:
+        """更新动漫文件夹的视频链接的更新时间"""
+        try:
+            await self._aindex()
+            info = self.store.folder(my_pack_id, folder_id)
+            if info is None:
+                print(f"数据库不存在该动漫，需要同步数据")
+                return False
+
+            info["last_video_update_time"] = update_time or datetime.now().isoformat()
+            self.store.touch(my_pack_id, folder_id)
+            return True
+
+        except Exception as e:
+            print(f"更新动漫文件夹的视频链接的更新时间失败: {e}")
+            return False
+
+    def get_all_anime_schedule_info(self, my_pack_id: str) -> List[Dict]:
+        """获取所有动漫的调度信息（读取索引和文件ID映射，不加载分片）"""
+        try:
+            file_ids: Dict[str, List[str]] = {}
+            for file_id, (container_id, folder_id) in self.store.file_map().items():
+                if container_id == my_pack_id:
+                    file_ids.setdefault(folder_id, []).append(file_id)
+
+            folders_info = []
+            current_time = datetime.now()
+            for folder_id, info in (
+                self.store.index()["animes"].get(my_pack_id, {}).items()
+            ):
+                if not info.get("files_count"):
+                    continue
+
+                last_update_time = None
+                if info.get("last_video_update_time"):
+                    try:
+                        last_update_time = datetime.fromisoformat(
+                            info["last_video_update_time"]
+                        )
+                    except ValueError:
+                        pass
+
+                if last_update_time:
+                    next_update_time = last_update_time + timedelta(hours=20)
+                else:
+                    next_update_time = current_time + timedelta(minutes=1)
+
+                folders_info.append(
+                    {
+                        "folder_id": folder_id,
+                        "title": info.get("title", ""),
+                        "file_count": info["files_count"],
+                        "last_update_time": last_update_time,
+                        "next_update_time": next_update_time,
+                        "file_ids": file_ids.get(folder_id, []),
+                    }
+                )
+
+            return folders_info
+
+        except Exception as e:
+            print(f"获取所有文件夹的调度信息失败: {e}")
+            return []
+
+
+def migrate_from_json(json_path: str, shard_root: str) -> Dict[str, int]:
+    """
+    把 JSON 数据库迁移为分片存储
+
+    Returns:
+        迁移的文件夹数和文件数
+    """
+    # 按配置的编解码器读取快照，并重放尚未压缩进快照的日志
+    data = CatalogPersistence(json_path).load()
+
+    store = ShardStore(shard_root)
+    store.replace(data)
+    store.flush()
+
+    folders = [
+        folder for group in data.get("animes", {}).values() for folder in group.values()
+    ]
+    return {
+        "folders": len(folders),
+        "files": sum(len(folder.get("files", [])) for folder in folders),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else settings.DATABASE_PATH
+    target = sys.argv[2] if len(sys.argv) > 2 else settings.SHARDED_DATABASE_PATH
+    print(f"迁移 {source} -> {target}: {migrate_from_json(source, target)}")
@@ -0,0 +1,921 @@
+"""
+SQLite 动漫数据库
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
+from loguru import logger
+
+from config.settings import settings
+from database.executor import io_stats, run_io
+from database.persistence import CatalogPersistence
+from database.pikpak import PikPakDatabase, _batch_result
+from database.paging import ANIME_LIST_FIELDS
+from database.search import TitleIndex
+from database.suggest import SuggestIndex
+from database.versions import CatalogVersions
+from database.writer import get_writer, serialized
+from exceptions import SystemException, ValidationException
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS containers (
+    id TEXT PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS folders (
+    container_id TEXT NOT NULL REFERENCES containers(id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '连载',
+    summary TEXT NOT NULL DEFAULT '',
+    cover_url TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL DEFAULT '',
+    last_video_update_time TEXT,
+    extra TEXT,
+    PRIMARY KEY (container_id, id)
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    container_id TEXT NOT NULL,
+    folder_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    play_url TEXT,
+    update_time TEXT,
+    extra TEXT,
+    FOREIGN KEY (container_id, folder_id)
+        REFERENCES folders(container_id, id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_files_folder
+    ON files (container_id, folder_id, position);
+"""
+
+# 有独立列的字段，其余字段存入 extra
+FOLDER_COLUMNS = (
+    "title",
+    "status",
+    "summary",
+    "cover_url",
+    "updated_at",
+    "last_video_update_time",
+)
+FILE_COLUMNS = ("id", "name", "play_url", "update_time")
+
+# 流式列表每次读取的行数
+ITER_BATCH_SIZE = 500
+
+_connections: Dict[str, sqlite3.Connection] = {}
+_connection_locks: Dict[str, threading.RLock] = {}
+_cache: Dict[str, Dict[str, Any]] = {}
+_registry_lock = threading.Lock()
+
+
+def _connect(path: str):
+    """获取数据库连接（进程内每个文件共用一个连接）"""
+    key = os.path.abspath(path)
+    with _registry_lock:
+        if key not in _connections:
+            os.makedirs(os.path.dirname(key), exist_ok=True)
+            conn = sqlite3.connect(key, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(SCHEMA)
+            _connections[key] = conn
+            _connection_locks[key] = threading.RLock()
+            _cache[key] = {
+                "data": None,
+                "version": 0,
+                "data_version": None,
+                "versions": CatalogVersions(),
+                "versions_data_version": None,
+            }
+        return _connections[key], _connection_locks[key], _cache[key]
+
+
+def _folder_row(container_id: str, folder_id: str, info: Dict[str, Any]) -> tuple:
+    extra = {k: v for k, v in info.items() if k not in FOLDER_COLUMNS and k != "files"}
+    return (
+        container_id,
+        folder_id,
+        info.get("title", ""),
+        info.get("status", "连载"),
+        info.get("summary", ""),
+        info.get("cover_url", ""),
+        info.get("updated_at", ""),
+        info.get("last_video_update_time"),
+        json.dumps(extra, ensure_ascii=False) if extra else None,
+    )
+
+
+def _file_row(
+    container_id: str, folder_id: str, position: int, file: Dict[str, Any]
+) -> tuple:
+    extra = {k: v for k, v in file.items() if k not in FILE_COLUMNS}
+    return (
+        file.get("id"),
+        container_id,
+        folder_id,
+        position,
+        file.get("name", ""),
+        file.get("play_url"),
+        file.get("update_time"),
+        json.dumps(extra, ensure_ascii=False) if extra else None,
+    )
+
+
+def _folder_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    info = {
+        "title": row["title"],
+        "status": row["status"],
+        "files": [],
+        "updated_at": row["updated_at"],
+        "summary": row["summary"],
+        "cover_url": row["cover_url"],
+    }
+    if row["last_video_update_time"] is not None:
+        info["last_video_update_time"] = row["last_video_update_time"]
+    if row["extra"]:
+        info.update(json.loads(row["extra"]))
+    return info
+
+
+def _file_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    file = {
+        "id": row["id"],
+        "name": row["name"],
+        "play_url": row["play_url"],
+        "update_time": row["update_time"],
+    }
+    if row["extra"]:
+        file.update(json.loads(row["extra"]))
+    return file
+
+
+class SQLitePikPakDatabase(PikPakDatabase):
+    """
+    PikPak 数据库管理（SQLite 存储）
+
+    与 PikPakDatabase 接口一致；链接更新、重命名和播放链接查询都是单行索引操作。
+    load_data/save_data 仍然提供完整的文档视图，供同步等整体操作使用。
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.SQLITE_DATABASE_PATH
+        self.conn, self.lock, self._cache = _connect(self.db_path)
+        self.writer = get_writer(self.db_path)
+        self.ensure_db_exists()
+
+    def ensure_db_exists(self):
+        """确保数据库存在，首次创建时从 JSON 数据库迁移"""
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM metadata LIMIT 1").fetchone():
+                return
+
+            if os.path.exists(settings.DATABASE_PATH):
+                migrate_from_json(settings.DATABASE_PATH, self.db_path)
+                return
+
+            now = datetime.now().isoformat()
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+                    [("created_at", now), ("last_updated", now)],
+                )
+
+    def _touch(
+        self,
+        cur: sqlite3.Cursor,
+        folder: Optional[Tuple[str, str]] = None,
+        listing: bool = False,
+    ):
+        """
+        更新最后修改时间，并更新文档缓存中修改的文件夹
+
+        Args:
+            folder: 修改的 (container_id, folder_id)，None 表示整体替换
+            listing: 列表页展示的字段是否变化
+        """
+        now = datetime.now().isoformat()
+        cur.execute(
+            "INSERT OR REPLACE INTO metadata (key, value) VALUES ('last_updated', ?)",
+            (now,),
+        )
+        self._cache["version"] += 1
+        if folder is None:
+            self._cache["data"] = None
+            self._cache["versions"].reset(now)
+            return
+
+        self._cache["versions"].bump(folder, listing)
+        data = self._cache["data"]
+        if data is None:
+            return
+
+        # 只从数据表重新读取这个文件夹，文档的其余部分继续复用
+        container_id, folder_id = folder
+        group = data["animes"].setdefault(container_id, {})
+        row = self._folder(container_id, folder_id)
+        if row is None:
+            group.pop(folder_id, None)
+        else:
+            info = _folder_dict(row)
+            info["files"] = self._folder_files(container_id, folder_id)
+            group[folder_id] = info
+        data["metadata"]["last_updated"] = now
+        if listing:
+            self._index_folder_change(container_id, folder_id, group.get(folder_id))
+
+    def load_data(self) -> Dict[str, Any]:
+        """
+        加载完整的数据库文档
+
+        结果按写入版本和 SQLite data_version 缓存，其他连接的写入会使缓存失效
+        """
+        try:
+            with self.lock:
+                data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+                if (
+                    self._cache["data"] is not None
+                    and self._cache["data_version"] == data_version
+                ):
+                    return self._cache["data"]
+
+                data = self._materialize()
+                self._cache["data"] = data
+                self._cache["data_version"] = data_version
+                return data
+        except Exception as e:
+            print(f"加载数据库失败: {e}")
+            return {"animes": {}, "metadata": {}}
+
+    async def aload_data(self) -> Dict[str, Any]:
+        """在数据库 I/O 线程中加载完整文档"""
+        return await run_io(self.load_data)
+
+    def _versions(self) -> CatalogVersions:
+        """
+        文件夹版本，首次使用或其他连接写入后（data_version 变化）整体失效
+
+        代数取数据库中记录的最后修改时间
+        """
+        with self.lock:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._cache["versions_data_version"] != data_version:
+                row = self.conn.execute(
+                    "SELECT value FROM metadata WHERE key = 'last_updated'"
+                ).fetchone()
+                self._cache["versions"].reset(row[0] if row else "")
+                self._cache["versions_data_version"] = data_version
+            return self._cache["versions"]
+
+    async def folder_version(self, container_id: str, folder_id: str) -> str:
+        return self._versions().folder((container_id, folder_id))
+
+    async def listing_version(self) -> str:
+        return self._versions().listing()
+
+    def _search_index(self, name: str):
+        """搜索索引与连接共用，文档重新生成后按差异同步"""
+        if name not in self._cache:
+            self._cache[name] = TitleIndex() if name == "titles" else SuggestIndex()
+        return self._cache[name]
+
+    def _materialize(self) -> Dict[str, Any]:
+        """从数据表还原 JSON 文档结构"""
+        metadata = {
+            row["key"]: row["value"]
+            for row in self.conn.execute("SELECT key, value FROM metadata")
+        }
+        animes: Dict[str, Dict[str, Any]] = {
+            row["id"]: {} for row in self.conn.execute("SELECT id FROM containers")
+        }
+        for row in self.conn.execute("SELECT * FROM folders ORDER BY rowid"):
+            animes.setdefault(row["container_id"], {})[row["id"]] = _folder_dict(row)
+        for row in self.conn.execute(
+            "SELECT * FROM files ORDER BY container_id, folder_id, position"
+        ):
+            folder = animes.get(row["container_id"], {}).get(row["folder_id"])
+            if folder is not None:
+                folder["files"].append(_file_dict(row))
+        return {"animes": animes, "metadata": metadata}
+
+    def save_data(self, data: Dict[str, Any], flush: bool = False) -> bool:
+        """用完整文档替换数据库内容（同步等整体操作使用）"""
+        try:
+            with self.lock, self.conn:
+                cur = self.conn.cursor()
+                _write_document(cur, data)
+                self._touch(cur)
+            return True
+        except Exception as e:
+            print(f"保存数据库失败: {e}")
+            return False
+
+    def flush(self) -> bool:
+        """SQLite 每次写入都已提交"""
+        return True
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取数据库状态"""
+        with self.lock:
+            counts = {
+                table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("containers", "folders", "files")
+            }
+        return {
+            "backend": "sqlite",
+            "version": self._cache["version"],
+            **counts,
+            "writer": self.writer.stats(),
+            "io": io_stats(),
+        }
+
+    def _folder(self, container_id: str, folder_id: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute(
+            "SELECT * FROM folders WHERE container_id = ? AND id = ?",
+            (container_id, folder_id),
+        ).fetchone()
+
+    def _folder_files(self, container_id: str, folder_id: str) -> List[Dict[str, Any]]:
+        return [
+            _file_dict(row)
+            for row in self.conn.execute(
+                "SELECT * FROM files WHERE container_id = ? AND folder_id = ? "
+                "ORDER BY position",
+                (container_id, folder_id),
+            )
+        ]
+
+    def _cursor_rowid(self, container_id: str, after: Optional[str]) -> int:
+        """分页游标（动漫ID）对应的 rowid，不传时从头开始"""
+        if after is None:
+            return 0
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT rowid FROM folders WHERE container_id = ? AND id = ?",
+                (container_id, after),
+            ).fetchone()
+        if row is None:
+            raise ValidationException("分页游标无效，请从第一页重新获取")
+        return row[0]
+
+    def _list_rows(
+        self,
+        container_id: str,
+        after_rowid: int,
+        limit: Optional[int],
+        columns: List[str],
+    ) -> List[sqlite3.Row]:
+        """按 rowid 顺序读取 after_rowid 之后最多 limit 行"""
+        sql = (
+            f"SELECT rowid, {', '.join(['id'] + columns)} FROM folders "
+            "WHERE container_id = ? AND rowid > ? ORDER BY rowid"
+        )
+        params: List[Any] = [container_id, after_rowid]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    def _list_page(
+        self,
+        container_id: str,
+        limit: Optional[int],
+        after: Optional[str],
+        fields: Optional[Tuple[str, ...]],
+    ) -> Dict[str, Any]:
+        """按 rowid 做键集分页，只读取本页的行"""
+        columns = [f for f in fields or ANIME_LIST_FIELDS if f != "id"]
+        with self.lock:
+            # 多取一条判断是否还有下一页
+            rows = self._list_rows(
+                container_id,
+                self._cursor_rowid(container_id, after),
+                None if limit is None else limit + 1,
+                columns,
+            )
+            total = self.conn.execute(
+                "SELECT COUNT(*) FROM folders WHERE container_id = ?", (container_id,)
+            ).fetchone()[0]
+
+        has_more = limit is not None and len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "items": [{name: row[name] for name in ["id"] + columns} for row in rows],
+            "next_cursor": rows[-1]["id"] if has_more else None,
+            "total": total,
+        }
+
+    def _list_batch(
+        self,
+        container_id: str,
+        after_rowid: int,
+        limit: int,
+        columns: List[str],
+    ) -> List[sqlite3.Row]:
+        with self.lock:
+            return self._list_rows(container_id, after_rowid, limit, columns)
+
+    async def list_animes(
+        self,
+        container_id: str,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> Dict[str, Any]:
+        """分页获取动漫列表，不需要加载完整文档"""
+        return await run_io(self._list_page, container_id, limit, after, fields)
+
+    async def iter_animes(
+        self,
+        container_id: str,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """按 rowid 分批读取并逐条产出，内存中只保留当前批"""
+        columns = [f for f in fields or ANIME_LIST_FIELDS if f != "id"]
+        rowid = await run_io(self._cursor_rowid, container_id, after)
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = (
+                ITER_BATCH_SIZE
+                if remaining is None
+                else min(remaining, ITER_BATCH_SIZE)
+            )
+            rows = await run_io(self._list_batch, container_id, rowid, size, columns)
+            for row in rows:
+                yield {name: row[name] for name in ["id"] + columns}
+            if len(rows) < size:
+                break
+            rowid = rows[-1]["rowid"]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def get_anime_detail(self, anime_id: str, my_pack_id: str) -> Dict[str, Any]:
+        """获取动漫详细信息"""
+        with self.lock:
+            row = self._folder(my_pack_id, anime_id)
+
+        if not row:
+            return {}
+
+        return {
+            "id": anime_id,
+            "title": row["title"],
+            "status": row["status"],
+            "summary": row["summary"],
+            "cover_url": row["cover_url"],
+            "updated_at": row["updated_at"],
+        }
+
+    async def aget_anime_detail(self, anime_id: str, my_pack_id: str) -> Dict[str, Any]:
+        """按主键查询单行，不需要加载完整文档"""
+        return await run_io(self.get_anime_detail, anime_id, my_pack_id)
+
+    def _locked_folder_files(
+        self, container_id: str, folder_id: str
+    ) -> List[Dict[str, Any]]:
+        with self.lock:
+            return self._folder_files(container_id, folder_id)
+
+    async def aget_folder_files(
+        self, container_id: str, folder_id: str
+    ) -> List[Dict[str, Any]]:
+        """只查询这个文件夹的文件，不需要加载完整文档"""
+        return await run_io(self._locked_folder_files, container_id, folder_id)
+
+    @serialized
+    async def update_anime_info(
+        self, anime_id: str, update_data: Dict[str, Any], my_pack_id: str
+    ) -> bool:
+        """
+        更新动漫信息
+        """
+        return await run_io(self._update_anime_info, anime_id, update_data, my_pack_id)
+
+    def _update_anime_info(
+        self, anime_id: str, update_data: Dict[str, Any], my_pack_id: str
+    ) -> bool:
+        try:
+            updatable_fields = ["title", "status", "summary", "cover_url"]
+            fields = [f for f in updatable_fields if f in update_data]
+            values = [update_data[f] for f in fields]
+
+            assignments = ", ".join([f"{f} = ?" for f in fields] + ["updated_at = ?"])
+            with self.lock, self.conn:
+                cur = self.conn.execute(
+                    f"UPDATE folders SET {assignments} WHERE container_id = ? AND id = ?",
+                    (*values, datetime.now().isoformat(), my_pack_id, anime_id),
+                )
+                if cur.rowcount == 0:
+                    print(f"动漫 {anime_id} 不存在")
+                    return False
+                self._touch(cur, (my_pack_id, anime_id), listing=bool(fields))
+            return True
+
+        except Exception as e:
+            print(f"更新动漫信息失败: {e}")
+            return False
+
+    @serialized
+    async def del_anime_files(
+        self, folder_id: str, file_ids: List[str], my_pack_id: str
+    ) -> bool:
+        """
+        删除动漫文件
+        """
+        return await run_io(self._del_anime_files, folder_id, file_ids, my_pack_id)
+
+    def _del_anime_files(
+        self, folder_id: str, file_ids: List[str], my_pack_id: str
+    ) -> bool:
+        try:
+            with self.lock, self.conn:
+                if not self._folder(my_pack_id, folder_id):
+                    print(f"数据库不存在该动漫，需要同步数据")
+                    return False
+
+                cur = self.conn.cursor()
+                cur.executemany(
+                    "DELETE FROM files WHERE id = ? AND container_id = ? AND folder_id = ?",
+                    [(file_id, my_pack_id, folder_id) for file_id in file_ids],
+                )
+                self._touch(cur, (my_pack_id, folder_id))
+            return True
+
+        except Exception as e:
+            print(f"删除动漫文件失败: {e}")
+            return False
+
+    @serialized
+    async def rename_anime_file(
+        self, file_id: str, new_name: str, my_pack_id: str, folder_id: str
+    ) -> bool:
+        """
+        更新动漫文件名称
+        """
+        return await run_io(
+            self._rename_anime_file, file_id, new_name, my_pack_id, folder_id
+        )
+
+    def _rename_anime_file(
+        self, file_id: str, new_name: str, my_pack_id: str, folder_id: str
+    ) -> bool:
+        try:
+            with self.lock, self.conn:
+                if not self._folder(my_pack_id, folder_id):
+                    logger.warning(f"数据库不存在该动漫，需要同步数据")
+                    raise ValidationException("数据库不存在该动漫，请先同步数据")
+
+                cur = self.conn.execute(
+                    "UPDATE files SET name = ? "
+                    "WHERE id = ? AND container_id = ? AND folder_id = ?",
+                    (new_name, file_id, my_pack_id, folder_id),
+                )
+                # 与 JSON 存储一致：文件不在该文件夹中时不做修改
+                if cur.rowcount == 0:
+                    logger.warning(
+                        f"动漫 {folder_id} 中不存在文件 {file_id}，跳过重命名"
+                    )
+                    return True
+                self._touch(cur, (my_pack_id, folder_id))
+            return True
+
+        except Exception as e:
+            logger.error(f"更新动漫文件名称失败: {e}")
+            raise SystemException(message="更新动漫文件名称失败", original_error=e)
+
+    @serialized
+    async def update_anime_file_link(
+        self, file_id: str, play_url: str, my_pack_id: str, folder_id: str
+    ) -> dict:
+        """
+        更新动漫文件播放链接
+        """
+        return await run_io(
+            self._update_anime_file_link, file_id, play_url, my_pack_id, folder_id
+        )
+
+    def _update_anime_file_link(
+        self, file_id: str, play_url: str, my_pack_id: str, folder_id: str
+    ) -> dict:
+        try:
+            update_time = datetime.now().isoformat()
+            with self.lock, self.conn:
+                if not self._folder(my_pack_id, folder_id):
+                    print(f"数据库不存在该动漫，需要同步数据")
+                    return False
+
+                cur = self.conn.execute(
+                    "UPDATE files SET play_url = ?, update_time = ? "
+                    "WHERE id = ? AND container_id = ? AND folder_id = ?",
+                    (play_url, update_time, file_id, my_pack_id, folder_id),
+                )
+                if cur.rowcount == 0:
+                    return {
+                        "success": False,
+                        "message": f"未找到文件ID: {file_id}",
+                        "data": {},
+                    }
+                self._touch(cur, (my_pack_id, folder_id))
+
+            return {
+                "success": True,
+                "message": "更新成功",
+                "data": {
+                    "file_id": file_id,
+                    "play_url": play_url,
+                    "updated_time": update_time,
+                },
+            }
+
+        except Exception as e:
+            print(f"更新动漫文件播放链接失败: {e}")
+            return {"success": False, "message": f"更新失败: {str(e)}", "data": {}}
+
+    @serialized
+    async def batch_update_file_links(
+        self,
+        folder_id: str,
+        my_pack_id: str,
+        links: List[Tuple[str, str, Optional[str]]],
+        folder_times: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        批量更新动漫文件播放链接，在一个事务内完成
+        """
+        return await run_io(
+            self._batch_update_file_links, folder_id, my_pack_id, links, folder_times
+        )
+
+    def _batch_update_file_links(
+        self,
+        folder_id: str,
+        my_pack_id: str,
+        links: List[Tuple[str, str, Optional[str]]],
+        folder_times: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        try:
+            results = []
+            with self.lock, self.conn:
+                if not self._folder(my_pack_id, folder_id):
+                    print(f"数据库不存在该动漫，需要同步数据")
+                    return _batch_result(
+                        [
+                            {
+                                "file_id": file_id,
+                                "success": False,
+                                "message": "动漫不存在",
+                            }
+                            for file_id, _, _ in links
+                        ]
+                    )
+
+                cur = self.conn.cursor()
+                for file_id, play_url, update_time in links:
+                    update_time = update_time or datetime.now().isoformat()
+                    cur.execute(
+                        "UPDATE files SET play_url = ?, update_time = ? "
+                        "WHERE id = ? AND container_id = ? AND folder_id = ?",
+                        (play_url, update_time, file_id, my_pack_id, folder_id),
+                    )
+                    if cur.rowcount:
+                        results.append(
+                            {
+                                "file_id": file_id,
+                                "success": True,
+                                "play_url": play_url,
+                                "updated_time": update_time,
+                            }
+                        )
+                    else:
+                        results.append(
+                            {
+                                "file_id": file_id,
+                                "success": False,
+                                "message": f"未找到文件ID: {file_id}",
+                            }
+                        )
+
+                result = _batch_result(results)
+                fields = [
+                    f
+                    for f in ("updated_at", "last_video_update_time")
+                    if f in (folder_times or {})
+                ]
+                if result["success_count"] and fields:
+                    cur.execute(
+                        "UPDATE folders SET "
+                        + ", ".join(f"{f} = ?" for f in fields)
+                        + " WHERE container_id = ? AND id = ?",
+                        (*[folder_times[f] for f in fields], my_pack_id, folder_id),
+                    )
+                if result["success_count"]:
+                    self._touch(cur, (my_pack_id, folder_id))
+
+            return result
+
+        except Exception as e:
+            print(f"批量更新动漫文件播放链接失败: {e}")
+            return _batch_result(
+                [
+                    {
+                        "file_id": file_id,
+                        "success": False,
+                        "message": f"更新失败: {str(e)}",
+                    }
+                    for file_id, _, _ in links
+                ]
+            )
+
+    def _anime_all(self, folder_id: str, my_pack_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self._folder(my_pack_id, folder_id)
+            if not row:
+                return None
+            anime_data = _folder_dict(row)
+            anime_data["files"] = self._folder_files(my_pack_id, folder_id)
+            return anime_data
+
+    async def get_anime_all(self, folder_id, my_pack_id):
+        """
+        获取动漫全部信息
+        """
+        try:
+            anime_data = await run_io(self._anime_all, folder_id, my_pack_id)
+            if not anime_data:
+                logger.warning("数据库不存在该动漫，需要同步数据")
+                return False
+
+            for file in anime_data["files"]:
+                file["name"] = file.get("name", "").split(".")[0]
+
+            return anime_data
+
+        except Exception as e:
+            logger.error(f"获取动漫全部信息失败: {e}")
+            raise SystemException(
+                message="获取动漫全部信息时发生异常", original_error=e
+            )
+
+    @serialized
+    async def update_folder_video_links_time(
+        self, folder_id: str, my_pack_id: str, update_time: str = None
+    ) -> bool:
+        """
+        更新动漫文件夹的视频链接的更新时间
+        """
+        return await run_io(
+            self._update_folder_video_links_time, folder_id, my_pack_id, update_time
+        )
+
+    def _update_folder_video_links_time(
+        self, folder_id: str, my_pack_id: str, update_time: str = None
+    ) -> bool:
+        try:
+            if update_time is None:
+                update_time = datetime.now().isoformat()
+
+            with self.lock, self.conn:
+                cur = self.conn.execute(
+                    "UPDATE folders SET last_video_update_time = ? "
+                    "WHERE container_id = ? AND id = ?",
+                    (update_time, my_pack_id, folder_id),
+                )
+                if cur.rowcount == 0:
+                    print(f"数据库不存在该动漫，需要同步数据")
+                    return False
+                self._touch(cur, (my_pack_id, folder_id))
+            return True
+
+        except Exception as e:
+            print(f"更新动漫文件夹的视频链接的更新时间失败: {e}")
+            return False
+
+    def locate_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """通过文件主键查找文件"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM files WHERE id = ?", (file_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {
+            "container_id": row["container_id"],
+            "folder_id": row["folder_id"],
+            "position": row["position"],
+            "file": _file_dict(row),
+        }
+
+    def get_file_play_url(self, file_id: str) -> str:
+        """根据文件ID获取播放链接"""
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT play_url FROM files WHERE id = ?", (file_id,)
+                ).fetchone()
+
+            if row is None:
+                logger.debug(f"数据库中未找到文件ID: {file_id}")
+                return None
+            return row["play_url"] or ""
+        except Exception as e:
+            logger.error(f"根据文件ID获取播放链接失败: {e}")
+            return None
+
+
+def _write_document(cur: sqlite3.Cursor, data: Dict[str, Any]):
+    """把 JSON 文档结构写入数据表（替换原有内容）"""
+    cur.execute("DELETE FROM files")
+    cur.execute("DELETE FROM folders")
+    cur.execute("DELETE FROM containers")
+
+    animes = data.get("animes", {})
+    cur.executemany(
+        "INSERT INTO containers (id) VALUES (?)", [(cid,) for cid in animes]
+    )
+    cur.executemany(
+        "INSERT INTO folders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            _folder_row(container_id, folder_id, info)
+            for container_id, folders in animes.items()
+            for folder_id, info in folders.items()
+        ],
+    )
+    cur.executemany(
+        "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            _file_row(container_id, folder_id, position, file)
+            for container_id, folders in animes.items()
+            for folder_id, info in folders.items()
+            for position, file in enumerate(info.get("files", []))
+            if file.get("id")
+        ],
+    )
+    cur.executemany(
+        "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+        [(k, str(v)) for k, v in data.get("metadata", {}).items()],
+    )
+
+
+def migrate_from_json(json_path: str, sqlite_path: str) -> Dict[str, int]:
+    """
+    把 JSON 数据库一次性迁移到 SQLite
+
+    Args:
+        json_path: anime.json 路径
+        sqlite_path: SQLite 数据库路径
+
+    Returns:
+        迁移的容器、文件夹、文件数量
+    """
+    # 按配置的编解码器读取快照（可能是 gzip/zstd），并重放尚未压缩进快照的日志
+    data = CatalogPersistence(json_path).load()
+
+    data.setdefault("metadata", {}).setdefault("created_at", datetime.now().isoformat())
+    data["metadata"].setdefault("last_updated", datetime.now().isoformat())
+
+    conn, lock, cache = _connect(sqlite_path)
+    with lock, conn:
+        _write_document(conn.cursor(), data)
+        cache["version"] += 1
+        cache["data"] = None
+
+    animes = data.get("animes", {})
+    result = {
+        "containers": len(animes),
+        "folders": sum(len(folders) for folders in animes.values()),
+        "files": sum(
+            len(info.get("files", []))
+            for folders in animes.values()
+            for info in folders.values()
+        ),
+    }
+    logger.info(f"JSON 数据库迁移到 SQLite 完成: {result}")
+    return result
+
+
+if __name__ == "__main__":
+    # 用法: python -m database.sqlite [json_path] [sqlite_path]
+    import sys
+
+    args = sys.argv[1:]
+    migrate_from_json(
+        args[0] if len(args) > 0 else settings.DATABASE_PATH,
+        args[1] if len(args) > 1 else settings.SQLITE_DATABASE_PATH,
+    )
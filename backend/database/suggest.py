@@ -0,0 +1,276 @@
+"""
+动漫标题前缀联想
+"""
+
+import bisect
+import heapq
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from config.settings import settings
+from database.search import normalize
+
+# 预先计算 top-k 的前缀长度（输入框的前两个字）
+PRECOMPUTED_PREFIX = 2
+
+# Bangumi 封面地址中包含条目 ID，如 /pic/cover/l/48/ae/288_HvHm5.jpg
+_COVER_SUBJECT = re.compile(r"/pic/cover/\w+/[0-9a-f]{2}/[0-9a-f]{2}/(\d+)_")
+
+
+def subject_id_from_cover(cover_url: str) -> Optional[int]:
+    """从 Bangumi 封面地址中解析条目 ID"""
+    match = _COVER_SUBJECT.search(cover_url or "")
+    return int(match.group(1)) if match else None
+
+
+class BangumiAliases:
+    """
+    Bangumi 条目名称
+
+    从每日放送表（data/news.json）读取 name 和 name_cn，文件更新后自动重新加载
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.BANGUMI_NEWS_PATH
+        self._names: Dict[int, List[str]] = {}
+        self._stat = None
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def refresh(self) -> int:
+        """文件变化时重新加载，返回当前版本"""
+        try:
+            st = os.stat(self.path)
+            stat = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat = None
+
+        with self._lock:
+            if stat == self._stat:
+                return self.version
+
+            names = {}
+            if stat is not None:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        days = json.load(f)
+                    for day in days:
+                        for item in (
+                            day.get("items", []) if isinstance(day, dict) else []
+                        ):
+                            names[item["id"]] = [
+                                name
+                                for name in (item.get("name"), item.get("name_cn"))
+                                if name
+                            ]
+                except Exception as e:
+                    logger.warning(f"加载 Bangumi 名称失败: {e}")
+
+            self._names = names
+            self._stat = stat
+            self.version += 1
+            return self.version
+
+    def get(self, cover_url: str) -> List[str]:
+        subject_id = subject_id_from_cover(cover_url)
+        return self._names.get(subject_id, []) if subject_id else []
+
+
+# 全局 Bangumi 名称实例
+bangumi_aliases = BangumiAliases()
+
+
+class SuggestIndex:
+    """
+    前缀联想索引
+
+    所有标题和 Bangumi 名称规范化后放在一个有序数组中，按前缀二分查找；
+    一到两个字的前缀范围很大，它们的 top-k 在构建时预先算好，标题变化时只重算受影响的前缀。
+    排序: 名称与输入一致 > 名称更短 > 本地标题优先于 Bangumi 名称
+    """
+
+    def __init__(self, top_k: int = None, aliases: BangumiAliases = None):
+        self.top_k = top_k or settings.SUGGEST_TOP_K
+        self.aliases = aliases or bangumi_aliases
+        # (名称, 0 标题/1 别名, key)
+        self._entries: List[Tuple[str, int, Hashable]] = []
+        self._names: Dict[Hashable, List[Tuple[str, int]]] = {}
+        self._docs: Dict[Hashable, Tuple[str, str]] = {}  # key -> (标题, 封面)
+        self._top: Dict[str, List[Hashable]] = {}
+        self._lock = threading.RLock()
+        self._aliases_version = None
+        self.source: Any = None
+        self.stale = True
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ---------- 维护 ----------
+
+    def update(self, key: Hashable, title: str, cover_url: str = ""):
+        """新增或更新一部动漫，只重算受影响前缀的 top-k"""
+        with self._lock:
+            old, new = self._update(key, title, cover_url or "")
+            for name, kind in old:
+                i = bisect.bisect_left(self._entries, (name, kind, key))
+                if i < len(self._entries) and self._entries[i] == (name, kind, key):
+                    del self._entries[i]
+            for name, kind in new:
+                bisect.insort(self._entries, (name, kind, key))
+            self._recompute({p for name, _ in old + new for p in _prefixes(name)})
+
+    def remove(self, key: Hashable):
+        """删除一部动漫"""
+        self.update(key, None)
+
+    def _update(self, key: Hashable, title: Optional[str], cover_url: str = ""):
+        """
+        更新 key 的名称，title 为 None 表示删除
+
+        Returns:
+            (旧名称列表, 新名称列表)，没有变化时都为空
+        """
+        doc = None if title is None else (title, cover_url)
+        if self._docs.get(key) == doc:
+            return [], []
+
+        old = self._names.pop(key, [])
+        if doc is None:
+            self._docs.pop(key, None)
+            return old, []
+
+        self._docs[key] = doc
+        names = {(normalize(title).strip(), 0)}
+        names.update(
+            (normalize(alias).strip(), 1) for alias in self.aliases.get(cover_url)
+        )
+        new = [(name, kind) for name, kind in names if name]
+        self._names[key] = new
+        return old, new
+
+    def _recompute(self, prefixes: Iterable[str]):
+        """重算受影响前缀的 top-k"""
+        for prefix in prefixes:
+            top = self._scan(prefix, self.top_k)
+            if top:
+                self._top[prefix] = top
+            else:
+                self._top.pop(prefix, None)
+
+    def _rebuild_top(self):
+        """一次遍历有序数组，算出所有短前缀的 top-k"""
+        groups: Dict[str, List[Tuple]] = {}
+        for name, kind, key in self._entries:
+            rank = (len(name), kind, name)
+            for prefix in _prefixes(name):
+                groups.setdefault(prefix, []).append((prefix == name, rank, key))
+        self._top = {
+            prefix: _top_keys(candidates, self.top_k)
+            for prefix, candidates in groups.items()
+        }
+
+    def sync(self, items: Iterable[Tuple[Hashable, str, str]], source: Any = None):
+        """按差异同步到最新的动漫集合，items 为 (key, 标题, 封面)"""
+        with self._lock:
+            aliases_version = self.aliases.refresh()
+            if aliases_version != self._aliases_version:
+                # Bangumi 名称变化，所有别名都要重新匹配
+                self._docs.clear()
+                self._names.clear()
+                self._entries.clear()
+                self._aliases_version = aliases_version
+
+            seen = set()
+            for key, title, cover_url in items:
+                seen.add(key)
+                self._update(key, title or "", cover_url or "")
+            for key in [key for key in self._docs if key not in seen]:
+                self._update(key, None)
+
+            # 整体重建有序数组和短前缀的 top-k
+            self._entries = sorted(
+                (name, kind, key)
+                for key, names in self._names.items()
+                for name, kind in names
+            )
+            self._rebuild_top()
+            self.source = source
+            self.stale = False
+
+    def needs_sync(self, data: Any) -> bool:
+        return (
+            self.stale
+            or self.source is not data
+            or self.aliases.refresh() != self._aliases_version
+        )
+
+    def ensure(self, data: Dict[str, Any]):
+        """索引过期、数据对象已替换或 Bangumi 名称更新时，从目录数据同步"""
+        if self.needs_sync(data):
+            self.sync(
+                (
+                    (
+                        (group_id, anime_id),
+                        info.get("title", ""),
+                        info.get("cover_url", ""),
+                    )
+                    for group_id, group in data.get("animes", {}).items()
+                    for anime_id, info in group.items()
+                ),
+                source=data,
+            )
+
+    # ---------- 查询 ----------
+
+    def suggest(self, prefix: str, limit: int = None) -> List[Dict[str, Any]]:
+        """
+        获取前缀联想
+
+        Returns:
+            [{"key": key, "title": 标题}]，最多 limit 条
+        """
+        limit = min(limit or self.top_k, self.top_k)
+        needle = normalize(prefix).strip()
+        if not needle:
+            return []
+
+        with self._lock:
+            if len(needle) <= PRECOMPUTED_PREFIX:
+                keys = self._top.get(needle, [])[:limit]
+            else:
+                keys = self._scan(needle, limit)
+            return [{"key": key, "title": self._docs[key][0]} for key in keys]
+
+    def _scan(self, prefix: str, limit: int) -> List[Hashable]:
+        """在有序数组中取出所有以 prefix 开头的名称并排序"""
+        candidates = []
+        i = bisect.bisect_left(self._entries, (prefix,))
+        while i < len(self._entries) and self._entries[i][0].startswith(prefix):
+            name, kind, key = self._entries[i]
+            candidates.append((name == prefix, (len(name), kind, name), key))
+            i += 1
+        return _top_keys(candidates, limit)
+
+
+def _prefixes(name: str) -> List[str]:
+    return [name[:n] for n in range(1, min(len(name), PRECOMPUTED_PREFIX) + 1)]
+
+
+def _top_keys(candidates: List[Tuple], limit: int) -> List[Hashable]:
+    """按匹配程度取前 limit 个不重复的 key"""
+    # 每个 key 最多三个名称（标题、name、name_cn），取 3 倍即可保证去重后仍有 limit 个
+    ordered = heapq.nsmallest(limit * 3, candidates, key=lambda c: (not c[0], c[1]))
+    keys = []
+    seen = set()
+    for _, _, key in ordered:
+        if key not in seen:
+            seen.add(key)
+            keys.append(key)
+            if len(keys) == limit:
+                break
+    return keys
@@ -0,0 +1,56 @@
+"""
+按文件夹记录的目录版本
+"""
+
+import threading
+from typing import Any, Dict, Hashable
+
+# 列表页展示的文件夹字段，变化时列表版本递增
+LISTING_FIELDS = frozenset({"title", "status", "cover_url", "summary"})
+
+
+def catalog_generation(data: Dict[str, Any]) -> str:
+    """
+    目录的代数，取持久化的最后修改时间
+
+    每次写入都会更新最后修改时间，多个进程或重启后加载同一份数据得到相同的代数
+    """
+    return str(data.get("metadata", {}).get("last_updated", ""))
+
+
+class CatalogVersions:
+    """
+    目录版本
+
+    修改文件夹时只递增该文件夹的版本；列表字段变化或增删文件夹时递增列表版本；
+    整体替换或从磁盘重新加载后进入新的一代，所有版本一起失效。
+    代数由数据本身决定（见 catalog_generation），版本号在各进程间可以比较。
+    """
+
+    def __init__(self, generation: str = ""):
+        self._lock = threading.Lock()
+        self._folders: Dict[Hashable, int] = {}
+        self._listing = 0
+        self.generation = generation
+
+    def reset(self, generation: str):
+        """整体失效，进入新的一代"""
+        with self._lock:
+            self._folders.clear()
+            self._listing = 0
+            self.generation = generation
+
+    def bump(self, key: Hashable, listing: bool = False):
+        """文件夹已修改，listing 表示列表页的内容也变了"""
+        with self._lock:
+            self._folders[key] = self._folders.get(key, 0) + 1
+            if listing:
+                self._listing += 1
+
+    def folder(self, key: Hashable) -> str:
+        with self._lock:
+            return f"{self.generation}.{self._folders.get(key, 0)}"
+
+    def listing(self) -> str:
+        with self._lock:
+            return f"{self.generation}.{self._listing}"
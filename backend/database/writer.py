@@ -0,0 +1,204 @@
+"""
+动漫数据库单写入者
+"""
+
+import asyncio
+import contextlib
+import functools
+import os
+import threading
+import time
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+
+class CatalogWriter:
+    """
+    动漫目录的单写入者任务
+
+    调度器、同步任务和管理接口的所有写操作都提交到同一个队列，由写入任务按顺序执行，
+    避免读-改-写互相覆盖。同时排队的写操作合并为一批，只落盘一次。
+    每批写操作在落盘完成后才返回结果，落盘失败时这批写操作都返回失败。
+    """
+
+    def __init__(
+        self, path: str, batch: Optional[Callable[[], AsyncContextManager]] = None
+    ):
+        """
+        Args:
+            path: 数据库文件路径
+            batch: 包裹每批写操作的异步上下文，退出时落盘，落盘失败时抛出异常
+        """
+        self.path = path
+        self._batch = batch or _no_batch
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # 统计
+        self.mutations = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _ensure_started(self):
+        """
+        在当前事件循环上启动写入任务
+
+        写入任务意外退出时只重启任务，沿用原队列，排队中的写操作继续执行；
+        事件循环变化时旧队列不能再使用，其中的写操作全部返回失败。
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._fail_pending(RuntimeError("数据库写入任务所在的事件循环已结束"))
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = None
+
+        if self._task is None or self._task.done():
+            if self._task is not None and not self._task.cancelled():
+                logger.error(
+                    f"数据库写入任务异常退出，重新启动: {self._task.exception()}"
+                )
+            self._task = loop.create_task(self._run())
+
+    def _fail_pending(self, error: Exception):
+        """让旧队列中等待的写操作返回失败"""
+        if self._queue is None:
+            return
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if future.done():
+                continue
+            try:
+                future.get_loop().call_soon_threadsafe(future.set_exception, error)
+            except RuntimeError:
+                # 旧事件循环已关闭，没有等待者
+                pass
+
+    async def submit(self, mutation: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        提交写操作并等待结果
+
+        Args:
+            mutation: 返回协程的写操作，在写入任务内按顺序执行
+
+        Returns:
+            写操作的返回值
+        """
+        if self._task is not None and asyncio.current_task() is self._task:
+            # 已在写入任务内（写操作内部调用其他写操作），直接执行，避免死锁
+            return await mutation()
+
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((mutation, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        """写入任务主循环"""
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            started = time.perf_counter()
+            # (future, 返回值或异常, 是否成功)，这批写操作落盘后再设置结果
+            outcomes = []
+            try:
+                async with self._batch():
+                    for mutation, future, enqueued_at in batch:
+                        wait = started - enqueued_at
+                        self.total_wait += wait
+                        self.max_wait = max(self.max_wait, wait)
+                        try:
+                            outcomes.append((future, await mutation(), True))
+                        except Exception as e:
+                            outcomes.append((future, e, False))
+            except Exception as e:
+                logger.error(f"数据库写入未能落盘: {e}")
+                outcomes = [
+                    (future, value if not ok else e, False)
+                    for future, value, ok in outcomes
+                ]
+
+            for future, value, ok in outcomes:
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+            self.mutations += len(batch)
+            self.batches += 1
+            self.max_batch_size = max(self.max_batch_size, len(batch))
+            for _ in batch:
+                self._queue.task_done()
+
+    async def close(self):
+        """等待队列中的写操作完成后停止写入任务"""
+        if self._task is None or self._task.done():
+            return
+        if self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+        self._task.cancel()
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """获取写入队列统计"""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "mutations": self.mutations,
+            "batches": self.batches,
+            "max_batch_size": self.max_batch_size,
+            "avg_wait_ms": (
+                round(self.total_wait / self.mutations * 1000, 3)
+                if self.mutations
+                else 0.0
+            ),
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+@contextlib.asynccontextmanager
+async def _no_batch():
+    yield
+
+
+def serialized(method):
+    """把数据库的异步写方法交给单写入者执行"""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await self.writer.submit(lambda: method(self, *args, **kwargs))
+
+    return wrapper
+
+
+_writers: Dict[str, CatalogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(
+    path: str, batch: Optional[Callable[[], AsyncContextManager]] = None
+) -> CatalogWriter:
+    """获取数据库文件对应的写入者（进程内唯一）"""
+    key = os.path.abspath(path)
+    with _writers_lock:
+        if key not in _writers:
+            _writers[key] = CatalogWriter(path, batch)
+        return _writers[key]
+
+
+async def close_writers():
+    """停止所有写入任务，应用关闭时调用"""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        try:
+            await writer.close()
+        except Exception as e:
+            logger.error(f"停止数据库写入任务失败: {e}")
@@ -4,6 +4,11 @@ from loguru import logger
 
 from scheduler import LinksScheduler
 from config.settings import settings
+from database.persistence import flush_all
+from database.writer import close_writers
+from services.clients import pikpak_clients
+from services.offline_tasks import offline_task_tracker
+from services.jobs import job_queue
 from utils.logs import setup_logging as setup_log_config
 
 # 全局调度器实例
@@ -23,6 +28,12 @@ async def lifespan(app: FastAPI):
     # 启动时执行
     global video_scheduler
 
+    # 后台刷新 PikPak 登录令牌
+    pikpak_clients.start()
+
+    # 启动后台任务队列，继续上次未完成的任务
+    await job_queue.start()
+
     # # 初始化调度器
     # if settings.PIKPAK_USERNAME and settings.PIKPAK_PASSWORD:
     #     try:
@@ -45,6 +56,17 @@ async def lifespan(app: FastAPI):
         await video_scheduler.stop()
         logger.info("生命周期--------视频链接调度器已停止")
 
+    await job_queue.stop()
+    await pikpak_clients.stop()
+    await offline_task_tracker.stop()
+
+    # 等待排队的数据库写操作完成，再强制落盘
+    await close_writers()
+    if flush_all():
+        logger.info("生命周期--------数据库已落盘")
+    else:
+        logger.error("生命周期--------数据库落盘失败")
+
 
 def setup_lifespan(app: FastAPI):
     """为应用设置生命周期"""
@@ -11,7 +11,7 @@ from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.executors.asyncio import AsyncIOExecutor
 from loguru import logger
 
-from database.pikpak import PikPakDatabase
+from database import get_anime_db
 from api.pikpak import PikPakService
 from config.settings import settings
 
@@ -50,20 +50,16 @@ async def update_anime_task(
     async with lock:
         logger.debug(f"获取到 API 锁，开始更新动漫的 ID 是: {folder_id}")
         try:
-            anime_db = PikPakDatabase()
+            anime_db = get_anime_db()
             pikpak_service = PikPakService()
 
             # 获取动漫信息
-            anime_detail = anime_db.get_anime_detail(folder_id, container_id)
+            anime_detail = await anime_db.aget_anime_detail(folder_id, container_id)
             if not anime_detail:
                 return
 
-            # 获取动漫列表
-            db_data = anime_db.load_data()
-            anime_data = (
-                db_data.get("animes", {}).get(container_id, {}).get(folder_id, {})
-            )
-            files = anime_data.get("files", [])
+            # 获取动漫的文件列表
+            files = await anime_db.aget_folder_files(container_id, folder_id)
 
             if not files:
                 return
@@ -71,38 +67,34 @@ async def update_anime_task(
             # 获取 PikPak 客户端
             client = await pikpak_service.get_client(username, password)
 
-            success_count = 0
+            links = []
             failed_count = 0
 
-            # 更新所有视频链接
-            for file_info in files:
-                try:
-                    file_id = file_info["id"]
-                    play_url = await pikpak_service.get_video_play_url(file_id, client)
-
-                    if play_url:
-                        # 更新数据库
-                        res = await anime_db.update_anime_file_link(
-                            file_id, play_url, container_id, folder_id
-                        )
-
-                        if res["success"]:
-                            success_count += 1
-                        else:
-                            failed_count += 1
-                    else:
-                        failed_count += 1
-
-                    # API 限流
-                    await asyncio.sleep(8)
-
-                except Exception as e:
+            # 并发获取所有视频链接
+            play_urls = await pikpak_service.get_video_play_urls(
+                client, [file_info["id"] for file_info in files]
+            )
+            for file_id, play_url in play_urls.items():
+                if play_url:
+                    links.append((file_id, play_url, None))
+                else:
                     failed_count += 1
 
-            # 更新时间记录
-            if success_count > 0:
-                await anime_db.update_folder_video_links_time(folder_id, container_id)
-                await anime_db.update_anime_info(folder_id, {}, container_id)
+            # 一次性更新数据库和时间记录
+            success_count = 0
+            if links:
+                update_time = datetime.now().isoformat()
+                res = await anime_db.batch_update_file_links(
+                    folder_id,
+                    container_id,
+                    links,
+                    folder_times={
+                        "updated_at": update_time,
+                        "last_video_update_time": update_time,
+                    },
+                )
+                success_count = res["success_count"]
+                failed_count += res["failed_count"]
 
             logger.info(
                 f"更新完成: {anime_detail.get('title', '未知')} 成功 {success_count}, 失败 {failed_count}"
@@ -122,7 +114,7 @@ class LinksScheduler:
     def __init__(self, pikpak_username: str, pikpak_password: str):
         self.pikpak_username = pikpak_username
         self.pikpak_password = pikpak_password
-        self.anime_db = PikPakDatabase()
+        self.anime_db = get_anime_db()
         self.scheduler = None  # 调度器
 
         # 配置常量
@@ -1,5 +1,9 @@
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, Field
 
 
 class SearchRequest(BaseModel):
     name: str
+    limit: Optional[int] = Field(None, ge=1)
+    after: Optional[str] = None  # 上一页的 next_cursor
+    fields: Optional[str] = None  # 返回的字段，逗号分隔
@@ -1,5 +1,5 @@
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AnimeItem(BaseModel):
@@ -37,3 +37,8 @@ class VideoUrlUpdateRequest(PikPakCredentials):
 
 class DeleteAnimeRequest(PikPakCredentials):
     folder_id: str
+
+
+class RateLimitRequest(BaseModel):
+    rate_per_minute: Optional[float] = Field(None, gt=0)
+    burst: Optional[int] = Field(None, ge=1)
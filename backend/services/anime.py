@@ -1,5 +1,5 @@
 import httpx
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List
 from loguru import logger
 
 from exceptions import NotFoundException, SystemException
@@ -23,12 +23,24 @@ class AnimeSearch:
         Returns:
             动漫搜索结果列表
         """
+        return [row async for row in self.iter_anime(name, max_results)]
+
+    async def iter_anime(
+        self, name: str, max_results: int = None
+    ) -> AsyncIterator[Dict]:
+        """
+        逐页搜索动漫，每获取一页就产出该页的结果
+
+        Args:
+            name: 动漫名
+            max_results: 最大结果数，默认不限制
+        """
         try:
             url = f"{self.base_url}/resources"
             query = {"search": [name]}
             logger.info(f" 搜索 {name}...")
 
-            all_results = []
+            count = 0
             page = 1
             page_size = 100
 
@@ -51,20 +63,22 @@ class AnimeSearch:
                 if not resources:
                     break  # 没有更多数据了
 
+                # 检查是否达到最大结果数限制
+                if max_results:
+                    resources = resources[: max_results - count]
+
                 # 处理当前页数据
                 for resource in resources:
-                    row_data = {
+                    yield {
                         "id": resource.get("id"),
                         "title": resource.get("title", ""),
                         "magnet": resource.get("magnet", ""),
                     }
-                    all_results.append(row_data)
+                count += len(resources)
 
                 logger.debug(f" 第{page}页获取到 {len(resources)} 个结果")
 
-                # 检查是否达到最大结果数限制
-                if max_results and len(all_results) >= max_results:
-                    all_results = all_results[:max_results]
+                if max_results and count >= max_results:
                     break
 
                 # 如果当前页结果少于页面大小，说明是最后一页
@@ -73,8 +87,7 @@ class AnimeSearch:
 
                 page += 1
 
-            logger.debug(f" 总共获取到 {len(all_results)} 个结果")
-            return all_results
+            logger.debug(f" 总共获取到 {count} 个结果")
 
         except httpx.HTTPStatusError as e:
             raise SystemException(
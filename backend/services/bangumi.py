@@ -1,5 +1,6 @@
 import httpx
 import json
+import os
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from loguru import logger
@@ -55,6 +56,14 @@ class BangumiApi:
             print(f" 番剧每日放送表数据保存失败：{e}")
             return False
 
+    def calendar_version(self) -> Optional[str]:
+        """番剧表文件的修改时间和大小，文件不存在返回 None"""
+        try:
+            st = os.stat(self.news_data)
+        except OSError:
+            return None
+        return f"{st.st_mtime_ns}-{st.st_size}"
+
     async def load_calendar_data(self) -> Optional[List[Dict[str, Any]]]:
         """加载番剧每日放送表数据"""
         try:
@@ -0,0 +1,313 @@
+"""
+PikPak 客户端注册表
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from pikpakapi import PikPakApi
+
+from config.settings import settings
+from exceptions import SystemException
+
+
+def _digest(username: str, password: str) -> str:
+    """账号密码摘要，密码变化后不再复用旧的令牌"""
+    return hashlib.sha256(f"{username}\0{password}".encode("utf-8")).hexdigest()
+
+
+class PikPakClientRegistry:
+    """
+    进程级 PikPak 客户端注册表
+
+    每个账号只保留一个已登录的客户端，所有 PikPakService 共用；
+    access/refresh token 持久化到磁盘，重启后直接恢复，不需要重新登录；
+    后台任务在 access token 过期前主动刷新；同一账号的并发登录合并为一次。
+    """
+
+    def __init__(self, token_path: str = None):
+        self.token_path = token_path or settings.PIKPAK_TOKEN_PATH
+        self._clients: Dict[str, PikPakApi] = {}
+        self._digests: Dict[str, str] = {}
+        self._issued_at: Dict[str, float] = {}  # 账号 -> 当前 access token 的获取时间
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._tokens: Optional[Dict[str, Dict[str, Any]]] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+        # 统计
+        self.hits = 0
+        self.coalesced = 0
+        self.restored = 0
+        self.logins = 0
+        self.login_failures = 0
+        self.login_seconds = 0.0
+        self.login_max_seconds = 0.0
+        self.last_login_seconds = 0.0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    # ---------- 获取客户端 ----------
+
+    async def get(self, username: str, password: str) -> PikPakApi:
+        """获取已登录的客户端，必要时恢复令牌或登录"""
+        digest = _digest(username, password)
+        client = self._clients.get(username)
+        if client is not None and self._digests.get(username) == digest:
+            self.hits += 1
+            # 按用户名恢复的客户端没有密码，补上以便令牌失效时重新登录
+            client.password = password
+            return client
+
+        lock = self._locks.setdefault(username, asyncio.Lock())
+        if lock.locked():
+            self.coalesced += 1
+        async with lock:
+            # 等待期间其他请求可能已经完成登录
+            client = self._clients.get(username)
+            if client is not None and self._digests.get(username) == digest:
+                return client
+
+            client = await self._restore(username, password, digest)
+            if client is None:
+                client = self._new_client(username, password)
+                await self._login(client)
+
+            self._clients[username] = client
+            self._digests[username] = digest
+            return client
+
+    async def get_logged_in(self, username: str) -> PikPakApi:
+        """
+        按用户名获取已登录的客户端，不需要密码
+
+        供后台任务使用：任务中不保存密码，客户端来自内存或磁盘上保存的令牌。
+        """
+        client = self._clients.get(username)
+        if client is not None:
+            self.hits += 1
+            return client
+
+        async with self._locks.setdefault(username, asyncio.Lock()):
+            client = self._clients.get(username)
+            if client is not None:
+                return client
+
+            client = await self._restore(username, None, None)
+            if client is None:
+                raise SystemException(
+                    message=f"PikPak 账号 {username} 的登录状态已失效，请重新登录"
+                )
+            self._clients[username] = client
+            self._digests[username] = self._load_tokens()[username]["digest"]
+            return client
+
+    def _new_client(
+        self, username: str, password: Optional[str], **kwargs
+    ) -> PikPakApi:
+        return PikPakApi(
+            username=username,
+            password=password,
+            token_refresh_callback=self._on_token_refresh,
+            **kwargs,
+        )
+
+    async def _restore(
+        self, username: str, password: Optional[str], digest: Optional[str]
+    ) -> Optional[PikPakApi]:
+        """
+        用磁盘上保存的令牌恢复客户端，令牌即将过期时先刷新
+
+        digest 为 None 时不校验密码（按用户名恢复）
+        """
+        saved = self._load_tokens().get(username)
+        if not saved or (digest is not None and saved.get("digest") != digest):
+            return None
+
+        if not saved.get("access_token") or not saved.get("refresh_token"):
+            return None
+        encoded_token = base64.b64encode(
+            json.dumps(
+                {
+                    "access_token": saved["access_token"],
+                    "refresh_token": saved["refresh_token"],
+                }
+            ).encode()
+        ).decode()
+        # 没有密码时设备ID不能由账号密码推导，使用保存的设备ID
+        client = self._new_client(
+            username,
+            password,
+            encoded_token=encoded_token,
+            device_id=saved.get("device_id"),
+        )
+        client.user_id = saved.get("user_id")
+        self._issued_at[username] = saved.get("issued_at", 0)
+
+        if self._expiring(username):
+            if not await self._refresh(client):
+                return None
+        self.restored += 1
+        logger.info(f"已恢复 PikPak 账号 {username} 的登录状态")
+        return client
+
+    async def _login(self, client: PikPakApi):
+        start = time.perf_counter()
+        try:
+            await client.login()
+        except Exception:
+            self.login_failures += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.login_seconds += elapsed
+            self.login_max_seconds = max(self.login_max_seconds, elapsed)
+            self.last_login_seconds = elapsed
+
+        self.logins += 1
+        logger.info(f"PikPak 账号 {client.username} 登录成功，耗时 {elapsed:.2f} 秒")
+        self._save(client)
+
+    # ---------- 令牌刷新 ----------
+
+    def _expiring(self, username: str) -> bool:
+        age = time.time() - self._issued_at.get(username, 0)
+        return age >= settings.PIKPAK_TOKEN_REFRESH_AFTER
+
+    async def _refresh(self, client: PikPakApi) -> bool:
+        """刷新 access token，成功后由回调保存"""
+        try:
+            await client.refresh_access_token()
+            return True
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.warning(f"刷新 PikPak 账号 {client.username} 的令牌失败: {e}")
+            return False
+
+    async def _on_token_refresh(self, client: PikPakApi, **kwargs):
+        """令牌刷新回调（包括客户端遇到令牌过期时的自动刷新）"""
+        self.refreshes += 1
+        self._save(client)
+
+    async def refresh_expiring(self):
+        """刷新所有即将过期的令牌，刷新失败时重新登录"""
+        for username, client in list(self._clients.items()):
+            if not self._expiring(username):
+                continue
+            async with self._locks.setdefault(username, asyncio.Lock()):
+                if not self._expiring(username) or await self._refresh(client):
+                    continue
+                try:
+                    await self._login(client)
+                except Exception as e:
+                    logger.error(f"PikPak 账号 {username} 重新登录失败: {e}")
+                    # 下次使用时重新登录
+                    self._clients.pop(username, None)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(settings.PIKPAK_TOKEN_CHECK_INTERVAL)
+            try:
+                await self.refresh_expiring()
+            except Exception as e:
+                logger.error(f"PikPak 令牌后台刷新失败: {e}")
+
+    def start(self):
+        """启动后台刷新任务"""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """停止后台刷新任务"""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    # ---------- 持久化 ----------
+
+    def _load_tokens(self) -> Dict[str, Dict[str, Any]]:
+        if self._tokens is None:
+            try:
+                with open(self.token_path, "r", encoding="utf-8") as f:
+                    self._tokens = json.load(f)
+            except FileNotFoundError:
+                self._tokens = {}
+            except Exception as e:
+                logger.warning(f"读取 PikPak 令牌失败: {e}")
+                self._tokens = {}
+        return self._tokens
+
+    def _save(self, client: PikPakApi):
+        """保存账号的令牌（原子写入，仅当前用户可读）"""
+        username = client.username
+        now = time.time()
+        self._issued_at[username] = now
+        tokens = self._load_tokens()
+        # 按用户名恢复的客户端没有密码，沿用原来的摘要
+        if client.password is not None:
+            digest = _digest(username, client.password)
+        else:
+            digest = self._digests.get(username) or tokens.get(username, {}).get(
+                "digest"
+            )
+        tokens[username] = {
+            "digest": digest,
+            "access_token": client.access_token,
+            "refresh_token": client.refresh_token,
+            "user_id": client.user_id,
+            "device_id": client.device_id,
+            "issued_at": now,
+        }
+
+        try:
+            os.makedirs(os.path.dirname(self.token_path) or ".", exist_ok=True)
+            tmp_path = f"{self.token_path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(tokens, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.token_path)
+        except Exception as e:
+            logger.error(f"保存 PikPak 令牌失败: {e}")
+
+    # ---------- 统计 ----------
+
+    def stats(self) -> Dict[str, Any]:
+        """获取登录次数、耗时和令牌状态"""
+        now = time.time()
+        return {
+            "accounts": {
+                username: {
+                    "token_age_seconds": round(
+                        now - self._issued_at.get(username, 0), 1
+                    ),
+                }
+                for username in self._clients
+            },
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "restored": self.restored,
+            "logins": self.logins,
+            "login_failures": self.login_failures,
+            "login_avg_seconds": (
+                round(self.login_seconds / self.logins, 3) if self.logins else 0.0
+            ),
+            "login_max_seconds": round(self.login_max_seconds, 3),
+            "last_login_seconds": round(self.last_login_seconds, 3),
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "background_refresh": self._refresher is not None
+            and not self._refresher.done(),
+        }
+
+
+# 全局客户端注册表实例
+pikpak_clients = PikPakClientRegistry()
@@ -0,0 +1,317 @@
+"""
+后台任务队列
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from loguru import logger
+
+from config.settings import settings
+from database.jobs import FAILED, SUCCEEDED, JobStore
+from exceptions import (
+    DuplicateException,
+    NotFoundException,
+    ValidationException,
+)
+
+# 这些异常重试也不会成功，直接标记失败
+PERMANENT_ERRORS = (ValidationException, DuplicateException, NotFoundException)
+
+# 任务结束事件，收到后事件流结束
+TERMINAL_EVENTS = ("job_succeeded", "job_failed")
+
+# 任务表的读写都在这个专用线程中执行，避免阻塞事件循环；
+# 单线程保证同一任务的事件按发布顺序写入
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-io")
+
+
+class JobContext:
+    """传给阶段函数的任务上下文，state 在阶段之间和重试之间保留"""
+
+    def __init__(self, queue: "JobQueue", job: Dict[str, Any]):
+        self.queue = queue
+        self.id: str = job["id"]
+        self.kind: str = job["kind"]
+        self.payload: Dict[str, Any] = job["payload"]
+        self.state: Dict[str, Any] = job["state"]
+        self.stage: Optional[str] = job["stage"]
+        self.attempts: int = job["attempts"]
+
+    async def save(self):
+        """保存阶段内的进度，重试时从这里继续"""
+        await self.queue.io(
+            self.queue.store.save_state, self.id, self.stage, self.state
+        )
+
+    async def emit(self, event_type: str, **data):
+        """发布进度事件（submitted、downloaded、renamed、link_resolved、failed 等）"""
+        await self.queue.publish(self.id, event_type, {"stage": self.stage, **data})
+
+
+Stage = Tuple[str, Callable[[JobContext], Awaitable[None]]]
+
+
+class JobQueue:
+    """
+    持久化的后台任务队列
+
+    任务按类型注册为有序的阶段列表，固定数量的工作协程从 SQLite 中取出到期任务，
+    依次执行剩余阶段；每个阶段开始前保存当前阶段，进程重启后从中断的阶段继续。
+    阶段失败时按指数退避重新排队，超过最大次数后标记失败。
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path
+        self._store: Optional[JobStore] = None
+        self._pipelines: Dict[str, List[Stage]] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._purged_at = 0.0
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore(self.db_path)
+        return self._store
+
+    async def io(self, fn: Callable[..., Any], *args) -> Any:
+        """在任务表线程中执行 JobStore 的同步方法"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, fn, *args)
+
+    def register(self, kind: str, stages: List[Stage]):
+        """注册任务类型及其阶段"""
+        self._pipelines[kind] = stages
+
+    async def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        提交任务
+
+        Returns:
+            (任务信息, 是否新建)，相同幂等键重复提交时返回已有的任务
+        """
+        if kind not in self._pipelines:
+            raise ValidationException(f"未知的任务类型: {kind}")
+
+        job, created, event = await self.io(
+            self._create, kind, payload, idempotency_key
+        )
+        if created:
+            logger.info(f"已提交后台任务 {kind}: {job['id']}")
+            self._deliver(event)
+            if self._wakeup is not None:
+                self._wakeup.set()
+        return job, created
+
+    def _create(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str],
+    ) -> Tuple[Dict[str, Any], bool, Optional[Dict[str, Any]]]:
+        """创建任务并记录 queued 事件，保证它先于工作协程的事件写入"""
+        job, created = self.store.create(kind, payload, idempotency_key)
+        event = self.store.add_event(job["id"], "queued", {}) if created else None
+        return job, created, event
+
+    async def get(self, job_id: str) -> Dict[str, Any]:
+        job = await self.io(self.store.get, job_id)
+        if job is None:
+            raise NotFoundException("Job", job_id)
+        return job
+
+    async def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        return await self.io(self.store.list, status, limit)
+
+    # ---------- 进度事件 ----------
+
+    async def publish(self, job_id: str, event_type: str, data: Dict[str, Any]):
+        """保存事件并推送给正在订阅该任务的连接"""
+        self._deliver(await self.io(self.store.add_event, job_id, event_type, data))
+
+    def _deliver(self, event: Dict[str, Any]):
+        for queue in self._subscribers.get(event["job_id"], ()):
+            queue.put_nowait(event)
+
+    async def finished(self, job_id: str) -> bool:
+        """任务是否已结束（成功或失败）"""
+        job = await self.io(self.store.get, job_id)
+        return job is not None and job["status"] in (SUCCEEDED, FAILED)
+
+    async def drained(self, job_id: str, after: int) -> bool:
+        """任务已结束，且 after 之后没有未发送的事件"""
+        return await self.finished(job_id) and not await self.io(
+            self.store.events, job_id, after
+        )
+
+    async def events(
+        self, job_id: str, after: int = 0
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        订阅任务事件
+
+        先补发 after 之后已记录的事件，再实时推送，任务结束后停止；
+        任务已结束且 after 之后没有事件（客户端已收到结束事件后重连）时直接结束；
+        超过 JOB_EVENTS_KEEPALIVE 秒没有事件时产出 None，供连接发送心跳。
+        """
+        await self.get(job_id)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        # 先订阅再读取历史事件，两者之间发布的事件按ID去重
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            last = after
+            for event in await self.io(self.store.events, job_id, after):
+                yield event
+                last = event["id"]
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+
+            if await self.finished(job_id):
+                return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), settings.JOB_EVENTS_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] <= last:
+                    continue
+                yield event
+                last = event["id"]
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    # ---------- 工作协程 ----------
+
+    async def start(self):
+        """恢复中断的任务并启动工作协程"""
+        if self._workers:
+            return
+        recovered = await self.io(self.store.recover)
+        if recovered:
+            logger.info(f"恢复 {recovered} 个中断的后台任务")
+        await self._purge()
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(settings.JOB_WORKERS)
+        ]
+
+    async def stop(self):
+        """停止工作协程，运行中的任务下次启动时继续"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _purge(self):
+        """删除超过保留时间的已结束任务，最多每小时一次"""
+        now = time.time()
+        if now - self._purged_at < 3600:
+            return
+        self._purged_at = now
+        purged = await self.io(
+            self.store.purge, now - settings.JOB_RETENTION_DAYS * 86400
+        )
+        if purged:
+            logger.info(f"已清理 {purged} 个过期的后台任务")
+
+    async def _wait_for_job(self):
+        """等待新任务提交或下一个任务到期"""
+        due = await self.io(self.store.next_due)
+        timeout = settings.JOB_POLL_INTERVAL
+        if due is not None:
+            timeout = min(timeout, max(0.0, due - time.time()))
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self):
+        while True:
+            job = await self.io(self.store.claim)
+            if job is None:
+                await self._purge()
+                await self._wait_for_job()
+                continue
+            # 取到任务后唤醒其他工作协程，看是否还有更多任务
+            self._wakeup.set()
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        stages = self._pipelines.get(job["kind"])
+        if stages is None:
+            error = f"未知的任务类型: {job['kind']}"
+            await self.io(self.store.finish, job["id"], FAILED, error)
+            await self.publish(job["id"], "job_failed", {"message": error})
+            return
+
+        ctx = JobContext(self, job)
+        names = [name for name, _ in stages]
+        start = names.index(ctx.stage) if ctx.stage in names else 0
+        try:
+            for name, run_stage in stages[start:]:
+                ctx.stage = name
+                await ctx.save()
+                logger.debug(f"后台任务 {ctx.id} 进入阶段 {name}")
+                await ctx.emit("stage", attempt=ctx.attempts + 1)
+                await run_stage(ctx)
+        except asyncio.CancelledError:
+            # 进程退出，任务保持运行中状态，重启后恢复
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if (
+                isinstance(e, PERMANENT_ERRORS)
+                or ctx.attempts + 1 >= job["max_attempts"]
+            ):
+                logger.error(f"后台任务 {ctx.id} 在阶段 {ctx.stage} 失败: {error}")
+                await self.io(self.store.finish, ctx.id, FAILED, error)
+                await ctx.emit("job_failed", message=error)
+            else:
+                delay = settings.JOB_RETRY_DELAY * (2**ctx.attempts)
+                logger.warning(
+                    f"后台任务 {ctx.id} 在阶段 {ctx.stage} 出错，{delay:.0f} 秒后重试: {error}"
+                )
+                await self.io(self.store.retry, ctx.id, delay, error)
+                await ctx.emit("retry", message=error, delay=delay)
+            return
+
+        await self.io(self.store.save_state, ctx.id, "done", ctx.state)
+        await self.io(self.store.finish, ctx.id, SUCCEEDED)
+        ctx.stage = "done"
+        await ctx.emit("job_succeeded")
+        logger.info(f"后台任务 {ctx.id} 已完成")
+
+
+# 全局任务队列实例
+job_queue = JobQueue()
@@ -0,0 +1,101 @@
+"""
+PikPak 文件夹列表缓存
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+
+class FolderListingCache:
+    """
+    按账号和父文件夹缓存子文件夹列表
+
+    读取时按调用方允许的最长时间判断是否新鲜；本服务自己创建、重命名、删除文件夹后
+    直接修改缓存（写穿），离线下载到该目录后整体失效，因为新文件夹出现的时间未知。
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = settings.MYPACK_LISTING_TTL if ttl is None else ttl
+        # (账号, 父文件夹ID) -> (获取时间, 文件夹列表, 获取时请求的页数)
+        self._entries: Dict[Tuple[str, str], Tuple[float, List[Dict], int]] = {}
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.saved_requests = 0
+        self.write_through = 0
+
+    def get(
+        self, account: str, parent_id: str, max_age: Optional[float] = None
+    ) -> Optional[List[Dict]]:
+        """获取不超过 max_age 秒（默认 TTL）的列表副本，没有或过期时返回 None"""
+        max_age = self.ttl if max_age is None else max_age
+        entry = self._entries.get((account, parent_id))
+        if entry is None or time.monotonic() - entry[0] > max_age:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.saved_requests += entry[2]
+        return [dict(folder) for folder in entry[1]]
+
+    def put(self, account: str, parent_id: str, folders: List[Dict], pages: int = 1):
+        """保存刚从 PikPak 获取的列表"""
+        self._entries[(account, parent_id)] = (
+            time.monotonic(),
+            [dict(folder) for folder in folders],
+            pages,
+        )
+
+    def add(self, account: str, parent_id: str, folder: Dict):
+        """新建文件夹后加入缓存"""
+        entry = self._entries.get((account, parent_id))
+        if entry is not None:
+            entry[1].append(dict(folder))
+            self.write_through += 1
+
+    def rename(self, account: str, folder_id: str, new_name: str):
+        """重命名后更新缓存中的名称"""
+        for (owner, _), (_, folders, _) in self._entries.items():
+            if owner != account:
+                continue
+            for folder in folders:
+                if folder["id"] == folder_id:
+                    folder["name"] = new_name
+                    self.write_through += 1
+
+    def remove(self, account: str, folder_id: str):
+        """删除后从缓存移除"""
+        for (owner, _), (_, folders, _) in self._entries.items():
+            if owner != account:
+                continue
+            for i, folder in enumerate(folders):
+                if folder["id"] == folder_id:
+                    del folders[i]
+                    self.write_through += 1
+                    break
+
+    def invalidate(self, account: str, parent_id: Optional[str] = None):
+        """使缓存失效，parent_id 为空时清除该账号的所有列表"""
+        for key in list(self._entries):
+            if key[0] == account and (parent_id is None or key[1] == parent_id):
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """获取命中率和节省的请求数"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_requests": self.saved_requests,
+            "write_through": self.write_through,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# 全局文件夹列表缓存实例
+folder_listing_cache = FolderListingCache()
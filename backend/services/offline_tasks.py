@@ -0,0 +1,173 @@
+"""
+PikPak 离线下载任务跟踪
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from pikpakapi import PikPakApi
+
+from config.settings import settings
+from services.rate_limit import pikpak_limiter
+
+PHASE_COMPLETE = "PHASE_TYPE_COMPLETE"
+PHASE_ERROR = "PHASE_TYPE_ERROR"
+# 查询时包含所有状态，已完成和失败的任务也要能找到
+ALL_PHASES = [
+    "PHASE_TYPE_PENDING",
+    "PHASE_TYPE_RUNNING",
+    PHASE_ERROR,
+    PHASE_COMPLETE,
+]
+
+
+class OfflineTaskTracker:
+    """
+    离线下载任务跟踪器
+
+    offline_download 返回的任务登记后得到一个 Future；每个账号一个后台协程，
+    定期用一次 offline_list 查询该账号所有进行中的任务，任务完成或失败时
+    把任务信息（file_id 即生成的文件或文件夹ID）设置为 Future 的结果。
+    没有进行中的任务时后台协程自动退出。
+    """
+
+    def __init__(self):
+        # 账号 -> {任务ID: Future}
+        self._pending: Dict[str, Dict[str, asyncio.Future]] = {}
+        self._clients: Dict[str, PikPakApi] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+
+        # 统计
+        self.tracked = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.polls = 0
+
+    def track(self, client: PikPakApi, task: Dict[str, Any]) -> asyncio.Future:
+        """登记 offline_download 返回的任务，返回完成时得到任务信息的 Future"""
+        account = client.username
+        pending = self._pending.setdefault(account, {})
+        future = pending.get(task["id"])
+        if future is not None:
+            return future
+
+        future = asyncio.get_running_loop().create_future()
+        self.tracked += 1
+        # 资源已缓存的任务提交时就已完成
+        if task.get("phase") in (PHASE_COMPLETE, PHASE_ERROR):
+            self._resolve(future, task)
+            return future
+
+        pending[task["id"]] = future
+        self._clients[account] = client
+        poller = self._pollers.get(account)
+        if poller is None or poller.done():
+            self._pollers[account] = asyncio.create_task(self._poll(account))
+        return future
+
+    async def wait(
+        self, client: PikPakApi, task: Dict[str, Any], timeout: float = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        等待任务结束
+
+        Returns:
+            任务信息（phase 为完成或失败），超时返回 None
+        """
+        future = self.track(client, task)
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(future), timeout or settings.OFFLINE_TASK_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._pending.get(client.username, {}).pop(task["id"], None)
+            logger.warning(f"离线下载任务 {task['id']} 超时未完成")
+            return None
+
+    async def wait_all(
+        self, client: PikPakApi, tasks: List[Dict[str, Any]], timeout: float = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """等待一批任务结束，结果顺序与 tasks 一致"""
+        return await asyncio.gather(
+            *(self.wait(client, task, timeout) for task in tasks)
+        )
+
+    def _resolve(self, future: asyncio.Future, task: Dict[str, Any]):
+        if future.done():
+            return
+        if task.get("phase") == PHASE_ERROR:
+            self.failed += 1
+            logger.warning(
+                f"离线下载任务失败: {task.get('name')} {task.get('message', '')}"
+            )
+        else:
+            self.completed += 1
+        future.set_result(task)
+
+    async def _poll(self, account: str):
+        """定期批量查询账号的所有进行中任务"""
+        pending = self._pending[account]
+        while pending:
+            await asyncio.sleep(settings.OFFLINE_TASK_POLL_INTERVAL)
+            # 去掉已被取消或超时的等待
+            for task_id in [t for t, f in pending.items() if f.done()]:
+                del pending[task_id]
+            if not pending:
+                break
+
+            try:
+                await self._check(account, pending)
+            except Exception as e:
+                logger.warning(f"查询离线下载任务状态失败: {e}")
+
+    async def _check(self, account: str, pending: Dict[str, asyncio.Future]):
+        client = self._clients[account]
+        page_token = None
+        for _ in range(settings.OFFLINE_TASK_MAX_PAGES):
+            await pikpak_limiter.acquire(account)
+            result = await client.offline_list(
+                size=settings.OFFLINE_TASK_PAGE_SIZE,
+                next_page_token=page_token,
+                phase=ALL_PHASES,
+            )
+            self.polls += 1
+
+            for task in result.get("tasks") or []:
+                if task.get("phase") not in (PHASE_COMPLETE, PHASE_ERROR):
+                    continue
+                future = pending.pop(task.get("id"), None)
+                if future is not None:
+                    self._resolve(future, task)
+
+            # 任务按创建时间倒序，进行中的任务通常都在第一页
+            page_token = result.get("next_page_token")
+            if not pending or not page_token:
+                return
+
+    async def stop(self):
+        """停止所有后台查询，未完成的等待者收到取消"""
+        for poller in self._pollers.values():
+            poller.cancel()
+        await asyncio.gather(*self._pollers.values(), return_exceptions=True)
+        self._pollers.clear()
+        for pending in self._pending.values():
+            for future in pending.values():
+                future.cancel()
+            pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": {account: len(p) for account, p in self._pending.items() if p},
+            "tracked": self.tracked,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "polls": self.polls,
+        }
+
+
+# 全局离线任务跟踪器实例
+offline_task_tracker = OfflineTaskTracker()
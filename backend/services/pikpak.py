@@ -1,31 +1,37 @@
 import asyncio
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Any, Optional
+
+import httpx
 from pikpakapi import PikPakApi
-import time
+from pikpakapi.PikpakException import PikpakException
 from loguru import logger
 
-from database.pikpak import PikPakDatabase
+from database import get_anime_db
 from datetime import datetime
 from config import settings
-from utils import (
-    is_collection,
-    get_anime_episodes,
-)
+from utils import get_anime_episodes
+from services.clients import pikpak_clients
+from services.rate_limit import pikpak_limiter
+from services.resolver import Overloaded, play_url_resolver
+from services.listing_cache import folder_listing_cache
 from exceptions import (
     NotFoundException,
     SystemException,
     DuplicateException,
-    ValidationException,
 )
 
+# PikPakApi 内部重试用尽后的错误信息前缀
+RETRIES_EXHAUSTED = "Max retries reached"
+# 限流错误描述中的关键词
+THROTTLE_MARKERS = ("too many", "too_many", "rate limit", "频繁", "429")
+
 
 class PikPakService:
     """PikPakAPI"""
 
     def __init__(self):
-        self.clients = {}  # 客户端连接
         self.my_pack_id = settings.ANIME_CONTAINER_ID
-        self.anime_db = PikPakDatabase()
+        self.anime_db = get_anime_db()
         self.links_scheduler = None
 
     async def _get_links_scheduler(self):
@@ -45,19 +51,15 @@ class PikPakService:
         return self.links_scheduler
 
     async def get_client(self, username: str, password: str) -> PikPakApi:
-        """获取或创建PikPak客户端"""
-        client_key = f"{username}:{password}"
-
-        if client_key not in self.clients:
-            client = PikPakApi(username=username, password=password)
-            await client.login()
-            self.clients[client_key] = client
+        """获取已登录的PikPak客户端（进程内按账号共用）"""
+        return await pikpak_clients.get(username, password)
 
-        return self.clients[client_key]
+    async def _call(self, client: PikPakApi, method: str, *args, **kwargs) -> Any:
+        """经账号限流后调用 PikPak API"""
+        await pikpak_limiter.acquire(client.username)
+        return await getattr(client, method)(*args, **kwargs)
 
-    async def create_anime_folder(
-        self, client: PikPakApi, folder_name: str
-    ) -> Optional[str]:
+    async def create_anime_folder(self, client: PikPakApi, folder_name: str) -> str:
         """
         创建动漫文件夹
 
@@ -66,33 +68,46 @@ class PikPakService:
             folder_name: 文件夹名称
 
         Returns:
-            文件夹ID，创建失败返回None
-        """
-        try:
-            # 检查 My Pack 内是否已存在同名文件夹
-            existing_folders = await self.get_mypack_folder_list(client)
-
-            for folder in existing_folders:
-                if folder.get("name") == folder_name:
-                    logger.warning(
-                        f"动漫 '{folder_name}' 已存在，如需更改内容请前往'更新'功能"
-                    )
-                    return None
+            文件夹ID
 
-            # 在 My Pack 内创建新文件夹
-            result = await client.create_folder(folder_name, parent_id=self.my_pack_id)
-            logger.debug("创建文件夹响应信息：", result["file"]["id"])
+        Raises:
+            DuplicateException: My Pack 内已存在同名文件夹
+            SystemException: 获取文件夹列表或创建文件夹失败，可以重试
+        """
+        # 检查 My Pack 内是否已存在同名文件夹
+        existing_folders = await self.get_mypack_folder_list(client)
 
-            if result and "file" in result and "id" in result["file"]:
-                logger.debug(f"成功在 My Pack 内创建文件夹: {folder_name}")
-                return result["file"]["id"]  # 创建文件夹成功，返回文件夹 ID
-            else:
-                logger.error(f"创建文件夹失败: {folder_name}")
-                return None
+        for folder in existing_folders:
+            if folder.get("name") == folder_name:
+                logger.warning(
+                    f"动漫 '{folder_name}' 已存在，如需更改内容请前往'更新'功能"
+                )
+                raise DuplicateException(
+                    resource="My Pack", field="folder_id", value=folder_name
+                )
 
+        # 在 My Pack 内创建新文件夹
+        try:
+            result = await self._call(
+                client, "create_folder", folder_name, parent_id=self.my_pack_id
+            )
         except Exception as e:
             logger.critical(f"创建文件夹异常: {e}")
-            return None
+            raise SystemException(
+                message=f"创建文件夹失败: {folder_name}", original_error=e
+            )
+
+        if not (result and "file" in result and "id" in result["file"]):
+            logger.error(f"创建文件夹失败: {folder_name}")
+            raise SystemException(message=f"创建文件夹失败: {folder_name}")
+
+        logger.debug(f"成功在 My Pack 内创建文件夹: {folder_name}")
+        folder_listing_cache.add(
+            client.username,
+            self.my_pack_id,
+            {"name": folder_name, "id": result["file"]["id"]},
+        )
+        return result["file"]["id"]
 
     async def download_to_root(
         self, client: PikPakApi, magnet: str, title: str
@@ -101,7 +116,9 @@ class PikPakService:
         下载磁力链接到 My Pack
         """
         try:
-            result = await client.offline_download(magnet)
+            result = await self._call(client, "offline_download", magnet)
+            # 新文件夹出现的时间未知，My Pack 列表缓存失效
+            folder_listing_cache.invalidate(client.username, self.my_pack_id)
             logger.info("=" * 60)
             logger.debug("离线下载响应信息：", result)
             logger.info("=" * 60)
@@ -111,6 +128,7 @@ class PikPakService:
                     "success": True,
                     "message": f"成功添加下载任务: {title}",
                     "task_id": result["task"]["id"],
+                    "task": result["task"],
                 }
             else:
                 return {"success": False, "message": f"添加下载任务失败: {title}"}
@@ -118,69 +136,6 @@ class PikPakService:
         except Exception as e:
             return {"success": False, "message": f"下载异常: {str(e)}"}
 
-    async def find_new_folder(
-        self, client: PikPakApi, before_folders: List[str], max_retries: int = 30
-    ) -> Optional[Dict]:
-        """
-        在 My Pack 内查找新文件夹
-
-        Args:
-            client: PikPak客户端
-            before_folders: 下载前的文件夹名称列表
-            max_retries: 最大重试次数
-
-        Returns:
-            新文件夹信息，如果没找到返回None
-
-        Raises:
-            SystemException: 当网络异常或系统错误时抛出
-        """
-        check_interval = 2  # 检查间隔，单位秒
-
-        for attempt in range(max_retries):
-            try:
-                # 获取 My Pack 内当前文件夹列表
-                current_folder_list = await self.get_mypack_folder_list(client)
-                current_folder_names = [f["name"] for f in current_folder_list]
-                logger.debug(f"My Pack 内当前文件夹名称列表: {current_folder_names}")
-
-                # 找出新增的文件夹
-                new_folders = [
-                    f for f in current_folder_names if f not in before_folders
-                ]
-
-                if new_folders:
-                    # 找到新文件夹，返回第一个（通常合集只生成一个文件夹）
-                    new_folder_name = new_folders[0]
-                    for folder in current_folder_list:
-                        if folder["name"] == new_folder_name:
-                            logger.debug(
-                                f"在 My Pack 内找到新文件夹: {folder['name']} (ID: {folder['id']})"
-                            )
-                            return folder
-
-                if attempt < max_retries - 1:  # 不是最后一次尝试
-                    await asyncio.sleep(check_interval)
-
-            except SystemException:
-                # 获取文件夹列表的系统异常
-                if attempt == max_retries - 1:  # 最后一次尝试
-                    raise
-                logger.warning(
-                    f"获取文件夹列表失败，{check_interval}秒后重试 (尝试 {attempt + 1}/{max_retries})"
-                )
-                await asyncio.sleep(check_interval)
-            except Exception as e:
-                logger.error(f"查找新文件夹时出错: {e}")
-                if attempt == max_retries - 1:  # 最后一次尝试
-                    raise SystemException(
-                        message="查找新文件夹时发生未知错误", original_error=e
-                    )
-                await asyncio.sleep(check_interval)
-
-        logger.warning("超时未找到新生成的文件夹，可能是下载失败")
-        return None
-
     async def rename_folder(
         self, client: PikPakApi, folder_id: str, new_name: str
     ) -> bool:
@@ -196,10 +151,11 @@ class PikPakService:
             是否成功
         """
         try:
-            result = await client.file_rename(folder_id, new_name)
+            result = await self._call(client, "file_rename", folder_id, new_name)
 
             if result and isinstance(result, dict) and "id" in result:
                 logger.info(f"成功重命名动漫: {new_name}")
+                folder_listing_cache.rename(client.username, folder_id, new_name)
                 return True
             else:
                 logger.warning(f"重命名文件夹动漫: {new_name}")
@@ -227,13 +183,16 @@ class PikPakService:
         """
         try:
             # 添加离线下载任务到指定文件夹
-            result = await client.offline_download(magnet, parent_id=folder_id)
+            result = await self._call(
+                client, "offline_download", magnet, parent_id=folder_id
+            )
 
-            if result:
+            if result and result.get("task"):
                 return {
                     "success": True,
                     "message": f"成功添加下载任务: {title}",
-                    "task_id": result.get("id"),
+                    "task_id": result["task"]["id"],
+                    "task": result["task"],
                     "folder_id": folder_id,
                 }
             else:
@@ -242,227 +201,6 @@ class PikPakService:
         except Exception as e:
             return {"success": False, "message": f"下载异常: {str(e)}"}
 
-    async def batch_download_collection(
-        self, client: PikPakApi, anime_list: List[Dict], target_folder_name: str
-    ) -> Dict:
-        """
-        批量下载合集
-
-        Args:
-            client: PikPak客户端
-            anime_list: 动漫列表,每个对象包含 {id, title, magnet}
-            target_folder_name: 目标文件夹名称
-
-        Returns:
-            success: 是否成功
-            message: 返回信息
-            task_id_list: 下载任务ID列表
-            renamed_folders: 重命名的文件夹列表
-        """
-        try:
-            # 检查 My Pack 内目标文件夹是否已存在
-            logger.debug(f"你当前要下载的动漫数据: {anime_list}")
-            existing_folders = await self.get_mypack_folder_list(client)
-            for folder in existing_folders:
-                if folder["name"] == target_folder_name:
-                    logger.warning(
-                        f"动漫 '{target_folder_name}' 已存在，如需更改内容请前往'更新'功能"
-                    )
-                    return {
-                        "success": False,
-                        "message": f"文件夹 '{target_folder_name}' 已存在",
-                    }
-
-            # 获取下载前的文件夹列表
-            before_folders = [f["name"] for f in existing_folders]
-            logger.debug(f"My Pack 内下载前的文件夹名称列表: {before_folders}")
-            renamed_folders = []
-
-            for anime in anime_list:
-                title = anime.get("title")
-                magnet = anime.get("magnet")
-
-                # 下载到 My Pack
-                logger.info(f"开始下载 {title}")
-                result = await self.download_to_root(client, magnet, title)
-                if result["success"]:
-                    # 等待并查找新生成的文件夹
-                    new_folder = await self.find_new_folder(client, before_folders)
-                    if new_folder:
-                        # 重命名文件夹
-                        rename_success = await self.rename_folder(
-                            client, new_folder["id"], target_folder_name
-                        )
-
-                        if rename_success:
-                            renamed_folders.append(
-                                {
-                                    "old_name": new_folder["name"],
-                                    "new_name": target_folder_name,
-                                    "folder_id": new_folder["id"],
-                                }
-                            )
-
-                            asyncio.create_task(
-                                self.delayed_rename_task(
-                                    client, new_folder["id"], delay_seconds=8
-                                )
-                            )
-
-                            logger.debug(
-                                f" 已为文件夹 {target_folder_name} 安排8秒后重命名任务"
-                            )
-
-                        # 更新before_folders，避免重复检测
-                        before_folders.append(target_folder_name)
-
-            return {
-                "success": True,
-                "message": f"成功处理{len(renamed_folders)}个合集",
-                "renamed_folders": renamed_folders,
-            }
-
-        except Exception as e:
-            return {"success": False, "message": f"合集下载异常: {str(e)}"}
-
-    async def batch_download(
-        self, client: PikPakApi, anime_list: List[Dict], folder_id: str
-    ) -> Dict:
-        """
-        批量下载磁力链接到指定文件夹
-
-        Args:
-            client: PikPak客户端
-            anime_list: 动漫列表,每个对象包含 {id, title, magnet}
-            folder_id: 目标文件夹ID
-
-        Returns:
-            task_id_list: 下载任务ID列表
-            folder_id: 目标文件夹ID
-        """
-        try:
-            task_id_list = []
-            for anime in anime_list:
-                title = anime.get("title")
-                magnet = anime.get("magnet")
-                result = await self.download_to_folder(client, magnet, folder_id, title)
-                if result["success"]:
-                    task_id_list.append(result["task_id"])
-
-            asyncio.create_task(
-                self.delayed_rename_task(client, folder_id, delay_seconds=8)
-            )
-
-            return {
-                "success": True,
-                "message": f"成功添加{len(task_id_list)}个下载任务",
-                "task_id_list": task_id_list,
-                "folder_id": folder_id,
-            }
-        except Exception as e:
-            return {"success": False, "message": f"下载异常: {str(e)}"}
-
-    async def batch_download_selected(
-        self, client: PikPakApi, anime_list: List[Any], target_folder_name: str
-    ) -> Dict:
-        """
-        批量下载选择
-
-        Args:
-            client: PikPak客户端
-            anime_list: 动漫列表,每个对象包含 {id, title, magnet}
-            target_folder_name: 目标文件夹名称
-
-        Returns:
-            success: 是否成功
-            message: 返回信息
-            collection_count: 合集数量
-            single_count: 单集数量
-            results: 下载结果列表
-        """
-        try:
-            # 合集和单集处理
-            collection_items = []
-            single_items = []
-            folder_id = None
-            for anime in anime_list:
-                if is_collection(anime.title):
-                    collection_items.append(anime)
-                else:
-                    single_items.append(anime)
-
-            # 获取下载前的文件夹列表（检测合集下载的新文件夹）
-            before_folders = []
-            if collection_items:
-                try:
-                    mypack_folders = await self.get_mypack_folder_list(client)
-                    before_folders = [f["name"] for f in mypack_folders]
-                    logger.info(f"下载前动漫列表：{before_folders}")
-                except SystemException as e:
-                    logger.critical(f"获取 My Pack 文件夹列表失败: {e}")
-                    raise SystemException(
-                        message="获取 My Pack 文件夹列表失败，下载中止",
-                        original_error=e.original_error,
-                    )
-
-            # 处理合集
-            collection_result = None
-            if collection_items:
-                # 转换AnimeItem对象为字典格式
-                collection_items_dict = []
-                for item in collection_items:
-                    if hasattr(item, "dict"):
-                        collection_items_dict.append(item.dict())
-                    else:
-                        collection_items_dict.append(item)
-
-                # 下载合集
-                collection_result = await self.batch_download_collection(
-                    client, collection_items_dict, target_folder_name
-                )
-                if not collection_result["success"]:
-                    raise SystemException(
-                        message="下载合集失败",
-                        original_error=collection_result["message"],
-                    )
-
-            # 处理单集
-            single_result = None
-            if single_items:
-                folder_id = await self.create_anime_folder(client, target_folder_name)
-                if not folder_id:
-                    raise DuplicateException(
-                        resource="My Pack", field="folder_id", value=target_folder_name
-                    )
-
-                # 转换AnimeItem对象为字典格式
-                single_items_dict = []
-                for item in single_items:
-                    if hasattr(item, "dict"):
-                        single_items_dict.append(item.dict())
-                    else:
-                        single_items_dict.append(item)
-
-                single_result = await self.batch_download(
-                    client, single_items_dict, folder_id
-                )
-                if not single_result["success"]:
-                    raise SystemException(
-                        message="下载单集失败",
-                        original_error=single_result["message"],
-                    )
-
-            return {
-                "collection_count": len(collection_items),
-                "single_count": len(single_items),
-            }
-
-        except (SystemException, DuplicateException):
-            raise
-        except Exception as e:
-            logger.critical(f"批量下载异常: {e}")
-            raise SystemException(message="批量下载选择异常", original_error=e)
-
     async def rename_single_file(
         self, client: PikPakApi, file_id: str, new_name: str
     ) -> bool:
@@ -481,7 +219,7 @@ class PikPakService:
             # 调用PikPak重命名API
             logger.debug("将要重命名的文件 id：", file_id)
             print("将要重命名的文件 id：", file_id)
-            result = await client.file_rename(file_id, new_name)
+            result = await self._call(client, "file_rename", file_id, new_name)
             logger.debug("rename_result:", result)
             print("rename_result:", result)
 
@@ -509,23 +247,19 @@ class PikPakService:
             failed_files: 失败的文件列表
         """
         try:
-            file_list = await client.file_list(parent_id=folder_id)
-            if not file_list or "files" not in file_list:
+            # 先遍历完所有分页再重命名，避免改名影响后续分页
+            files = [
+                file
+                async for file in self.iter_files(client, folder_id)
+                if file.get("kind") != "drive#folder"
+            ]
+            if not files:
                 return {"success": False, "message": "文件列表为空或不存在"}
 
-            files = file_list["files"]
             renamed_files = []
             failed_files = []
 
-            # API限流配置
-            api_call_count = 0
-            api_batch_size = 3  # 每3次API调用后休息
-            api_delay = 8  # 休息8秒
-
             for file in files:
-                # 跳过文件夹
-                if file.get("kind") == "drive#folder":
-                    continue
 
                 file_id = file.get("id")
                 original_name = file.get("name")
@@ -545,7 +279,6 @@ class PikPakService:
                 rename_result = await self.rename_single_file(
                     client, file_id, episode_num
                 )
-                api_call_count += 1
 
                 if rename_result:
                     renamed_files.append(file)
@@ -554,13 +287,6 @@ class PikPakService:
                     failed_files.append(file)
                     logger.warning(f"重命名失败: {original_name}")
 
-                # 检查是否需要延时以避免触发API限流
-                if api_call_count % api_batch_size == 0:
-                    logger.info(
-                        f"已调用 {api_call_count} 次重命名API，延时 {api_delay} 秒避免限流..."
-                    )
-                    await asyncio.sleep(api_delay)
-
             logger.info(
                 f"重命名 {len(renamed_files)} 个文件，失败 {len(failed_files)} 个文件"
             )
@@ -574,65 +300,43 @@ class PikPakService:
         except Exception as e:
             return {"success": False, "message": f"重命名异常: {str(e)}"}
 
-    async def delayed_rename_task(
-        self, client: PikPakApi, folder_id: str, delay_seconds: int = 8
-    ):
+    async def iter_files(
+        self,
+        client: PikPakApi,
+        parent_id: Optional[str] = None,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[Dict]:
         """
-        延时重命名任务
+        逐页遍历文件夹内容
 
         Args:
             client: PikPak客户端
-            folder_id: 文件夹ID
-            delay_seconds: 延时秒数，默认8秒
-        """
-        try:
-            logger.debug(
-                f"将在 {delay_seconds} 秒后开始重命名文件夹 {folder_id} 中的文件..."
+            parent_id: 父文件夹ID，默认根目录
+            page_size: 每页数量，默认 PIKPAK_PAGE_SIZE
+
+        Yields:
+            PikPak 返回的文件/文件夹项，按页跟随 next_page_token 直到最后一页
+        """
+        page_size = page_size or settings.PIKPAK_PAGE_SIZE
+        page_token = None
+        while True:
+            result = await self._call(
+                client,
+                "file_list",
+                size=page_size,
+                parent_id=parent_id,
+                next_page_token=page_token,
             )
-            await asyncio.sleep(delay_seconds)
-
-            logger.debug(f"开始重命名文件夹 {folder_id} 中的文件...")
-            rename_result = await self.batch_rename_file(client, folder_id)
-
-            if rename_result["success"]:
-                logger.debug(
-                    f" 文件夹 {folder_id} 重命名完成: {rename_result['message']}"
-                )
-                # 重命名完成后，启动延时同步数据任务
-                asyncio.create_task(
-                    self.delayed_sync_data_task(client, delay_seconds=8)
-                )
-                logger.info(f"已安排8秒后同步数据任务")
-            else:
-                logger.debug(
-                    f"文件夹 {folder_id} 重命名失败: {rename_result['message']}"
-                )
-
-        except Exception as e:
-            logger.error(f"延时重命名任务异常: {e}")
-
-    async def delayed_sync_data_task(self, client: PikPakApi, delay_seconds: int = 8):
-        """
-        延时同步数据任务
-
-        Args:
-            client: PikPak客户端
-            delay_seconds: 延时秒数，默认8秒
-        """
-        try:
-            print(f"将在 {delay_seconds} 秒后开始同步数据...")
-            await asyncio.sleep(delay_seconds)
-
-            print(f"开始同步数据...")
-            sync_result = await self.sync_data(client)
+            # 任何一页失败都抛出异常，避免把不完整的列表当成完整结果
+            if not result or "files" not in result:
+                raise SystemException(message=f"获取文件列表失败: {parent_id}")
 
-            if sync_result:
-                print(f"数据同步完成")
-            else:
-                print(f"数据同步失败")
+            for file in result["files"]:
+                yield file
 
-        except Exception as e:
-            print(f"延时同步数据任务异常: {e}")
+            page_token = result.get("next_page_token")
+            if not page_token:
+                return
 
     async def get_folder_list(self, client: PikPakApi) -> List[Dict]:
         """
@@ -645,16 +349,10 @@ class PikPakService:
             包含文件夹信息的列表，每个元素是包含name和id的字典
         """
         try:
-            # 获取根目录文件列表
-            file_list = await client.file_list()
-
-            if not file_list or "files" not in file_list:
-                return []
-
-            # 筛选出文件夹
+            # 遍历根目录，筛选出文件夹
             folders = [
                 {"name": f["name"], "id": f["id"]}
-                for f in file_list["files"]
+                async for f in self.iter_files(client)
                 if f.get("kind") == "drive#folder"
             ]
 
@@ -664,30 +362,34 @@ class PikPakService:
             print(f"获取文件夹列表异常: {e}")
             return []
 
-    async def get_mypack_folder_list(self, client: PikPakApi) -> List[Dict]:
+    async def get_mypack_folder_list(
+        self, client: PikPakApi, max_age: Optional[float] = None
+    ) -> List[Dict]:
         """
         获取 My Pack 内的文件夹列表
 
         Args:
             client: PikPak客户端
+            max_age: 可复用的缓存最长时间(秒)，默认 MYPACK_LISTING_TTL，0 表示重新获取
 
         Returns:
             包含文件夹信息的列表，每个元素是包含name和id的字典
         """
-        try:
-            # 获取 My Pack 内的文件列表
-            file_list = await client.file_list(parent_id=self.my_pack_id)
-
-            if not file_list or "files" not in file_list:
-                return []
-
-            # 筛选出文件夹
-            folders = [
-                {"name": f["name"], "id": f["id"]}
-                for f in file_list["files"]
-                if f.get("kind") == "drive#folder"
-            ]
+        folders = folder_listing_cache.get(client.username, self.my_pack_id, max_age)
+        if folders is not None:
+            return folders
 
+        try:
+            # 遍历 My Pack，筛选出文件夹
+            folders = []
+            item_count = 0
+            async for f in self.iter_files(client, self.my_pack_id):
+                item_count += 1
+                if f.get("kind") == "drive#folder":
+                    folders.append({"name": f["name"], "id": f["id"]})
+
+            pages = max(1, -(-item_count // settings.PIKPAK_PAGE_SIZE))
+            folder_listing_cache.put(client.username, self.my_pack_id, folders, pages)
             return folders
 
         except Exception as e:
@@ -710,16 +412,9 @@ class PikPakService:
         try:
             logger.debug(f" 获取文件夹 {folder_id} 内的文件列表...")
 
-            # 获取文件夹内容
-            result = await client.file_list(parent_id=folder_id)
-
-            if not result or "files" not in result:
-                return {"success": False, "files": [], "message": "无法获取文件夹内容"}
-
-            files = result["files"]
-
             # 过滤出文件（排除文件夹）
             file_list = []
+            total_items = 0
             video_extensions = [
                 ".mp4",
                 ".mkv",
@@ -732,7 +427,8 @@ class PikPakService:
                 ".wmv",
             ]
 
-            for file in files:
+            async for file in self.iter_files(client, folder_id):
+                total_items += 1
                 file_kind = file.get("kind", "")
                 file_type = file.get("type", "")
                 file_name = file.get("name", "")
@@ -759,7 +455,7 @@ class PikPakService:
                     }
                     file_list.append(formatted_file)
 
-            logger.debug(f" 获取到 {len(file_list)} 个文件（共 {len(files)} 个项目）")
+            logger.debug(f" 获取到 {len(file_list)} 个文件（共 {total_items} 个项目）")
 
             # 按文件名排序
             file_list.sort(key=lambda x: x.get("name", ""))
@@ -768,7 +464,7 @@ class PikPakService:
                 "success": True,
                 "files": file_list,
                 "total_files": len(file_list),
-                "total_items": len(files),
+                "total_items": total_items,
                 "message": f"获取到 {len(file_list)} 个文件",
             }
 
@@ -795,10 +491,11 @@ class PikPakService:
         """
         try:
             # 调用PikPak删除文件API
-            result = await client.delete_to_trash(ids=[file_id])
+            result = await self._call(client, "delete_to_trash", ids=[file_id])
 
             if result:
                 logger.debug(f" 文件删除成功")
+                folder_listing_cache.remove(client.username, file_id)
                 return {"success": True, "message": "文件删除成功"}
             else:
                 logger.error(f" 文件删除失败")
@@ -864,16 +561,130 @@ class PikPakService:
     ) -> Optional[str]:
         """获取视频播放连接"""
         try:
-            # 调用PikPak获取视频播放连接API
-            result = await client.get_download_url(file_id)
-            if result and "web_content_link" in result:
-                return result["web_content_link"]
-            else:
-                return None
+            return await self._fetch_play_url(client, file_id)
         except Exception as e:
             logger.warning(f"获取视频播放连接异常: {e}")
             return None
 
+    async def _fetch_play_url(self, client: PikPakApi, file_id: str) -> Optional[str]:
+        """
+        调用PikPak获取视频播放连接API
+
+        限流或超时抛出 Overloaded（降低并发），其他失败抛出原异常
+        """
+        try:
+            result = await self._call(client, "get_download_url", file_id)
+        except PikpakException as e:
+            message = str(e)
+            if message.startswith(RETRIES_EXHAUSTED):
+                # 超时、连接错误，PikPakApi 已经按退避重试过
+                raise Overloaded(message, retryable=False) from e
+            if any(marker in message.lower() for marker in THROTTLE_MARKERS):
+                raise Overloaded(message) from e
+            raise
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            raise Overloaded(str(e) or "请求超时") from e
+        if result and "web_content_link" in result:
+            return result["web_content_link"]
+        return None
+
+    async def get_video_play_urls(
+        self,
+        client: PikPakApi,
+        file_ids: List[str],
+        on_result: Optional[Callable[[str, Optional[str]], Awaitable[None]]] = None,
+    ) -> Dict[str, Optional[str]]:
+        """
+        并发获取一批视频的播放连接
+
+        Args:
+            client: PikPak客户端
+            file_ids: 文件ID列表
+            on_result: 每个文件获取结束后等待 on_result(文件ID, 播放连接)
+
+        Returns:
+            {文件ID: 播放连接}，获取失败的为 None
+        """
+        return await play_url_resolver.resolve(
+            client.username,
+            file_ids,
+            lambda file_id: self._fetch_play_url(client, file_id),
+            on_result,
+        )
+
+    async def update_file_links(
+        self,
+        client: PikPakApi,
+        folder_id: str,
+        file_ids: List[str],
+        on_result: Optional[Callable[[str, Optional[str]], Awaitable[None]]] = None,
+    ) -> Dict:
+        """
+        获取视频播放连接并一次性写入数据库
+
+        Args:
+            client: PikPak客户端
+            folder_id: 动漫文件夹ID
+            file_ids: 文件ID列表
+            on_result: 每个文件获取结束后等待 on_result(文件ID, 播放连接)
+
+        Returns:
+            success_count: 成功数量
+            failed_count: 失败数量
+            results: 按 file_ids 顺序的结果 {file_id, success, message?}
+        """
+        play_urls = await self.get_video_play_urls(client, file_ids, on_result)
+
+        links = []
+        results = []
+        for file_id, play_url in play_urls.items():
+            if play_url:
+                links.append((file_id, play_url, None))
+            else:
+                results.append(
+                    {
+                        "file_id": file_id,
+                        "success": False,
+                        "message": "获取视频链接失败",
+                    }
+                )
+
+        # 一次性写入数据库，同时更新动漫文件夹和视频链接的更新时间
+        if links:
+            try:
+                update_time = datetime.now().isoformat()
+                res = await self.anime_db.batch_update_file_links(
+                    folder_id,
+                    settings.ANIME_CONTAINER_ID,
+                    links,
+                    folder_times={
+                        "updated_at": update_time,
+                        "last_video_update_time": update_time,
+                    },
+                )
+            except SystemException:
+                raise
+            except Exception as e:
+                raise SystemException(
+                    message="更新动漫文件链接数据库异常", original_error=e
+                )
+
+            for item in res["results"]:
+                if not item["success"]:
+                    item["message"] = "获取链接成功，但更新数据库失败"
+                results.append(item)
+
+        # 按请求顺序返回结果
+        order = {file_id: i for i, file_id in enumerate(file_ids)}
+        results.sort(key=lambda item: order.get(item["file_id"], len(order)))
+
+        success_count = sum(1 for item in results if item["success"])
+        return {
+            "success_count": success_count,
+            "failed_count": len(results) - success_count,
+            "results": results,
+        }
+
     async def get_mypack_folder_id(self, client: PikPakApi) -> Optional[str]:
         """
         获取 My Pack 文件夹 ID
@@ -905,13 +716,22 @@ class PikPakService:
             logger.critical(f" 获取 My Pack 文件夹ID异常: {e}")
             return None
 
-    async def sync_data(self, client: PikPakApi, blocking_wait: bool = False) -> bool:
+    async def sync_data(
+        self,
+        client: PikPakApi,
+        on_result: Optional[Callable[[str, Optional[str]], Awaitable[None]]] = None,
+    ) -> bool:
         """
         同步数据
+
+        on_result: 新文件获取播放连接后等待 on_result(文件ID, 播放连接)
+
+        先读取云端数据计算差异，最后在单写入者内合并到最新的本地数据，
+        避免覆盖同步期间其他任务写入的修改
         """
         try:
-            # 加载数据
-            data = self.anime_db.load_data()
+            # 加载数据（只读，写入统一在 apply_sync 中完成）
+            data = await self.anime_db.aload_data()
             if "animes" not in data:
                 logger.debug("数据格式错误，缺少animes字段")
                 return
@@ -920,16 +740,11 @@ class PikPakService:
             mypack_id = list(data["animes"].keys())[0]
             anime_folders = data["animes"][mypack_id]
 
-            # api 调用计数
-            api_call_count = 0
-            api_batch_size = 3
-            api_delay = 8
-
             logger.info(f"开始同步数据")
 
             # 获取云端 mypack的所有文件夹 id
             # { id:id_value,name:name_value }
-            cloud_folders = await self.get_mypack_folder_list(client)
+            cloud_folders = await self.get_mypack_folder_list(client, max_age=0)
             # 建立云端文件夹映射
             cloud_folder_map = {folder["id"]: folder for folder in cloud_folders}
             cloud_folder_ids = set(cloud_folder_map.keys())
@@ -945,17 +760,17 @@ class PikPakService:
             for folder_id in del_folder_ids:
                 folder_name = anime_folders[folder_id].get("title", "未知")
                 logger.debug(f"  删除本地多余的 {folder_name} 文件夹")
-                del anime_folders[folder_id]
                 links_scheduler = await self._get_links_scheduler()
                 if links_scheduler:
                     # 如果有链接调度器，删除对应的调度任务
                     links_scheduler.remove_anime_schedule(folder_id)
 
             # 处理新增的文件夹
+            new_folders = {}
             for folder_id in new_folder_ids:
                 folder_name = cloud_folder_map[folder_id]["name"]
                 logger.debug(f"  新增 {folder_name} 文件夹")
-                anime_folders[folder_id] = {
+                new_folders[folder_id] = {
                     "title": folder_name,
                     "status": "连载",
                     "files": [],
@@ -965,7 +780,15 @@ class PikPakService:
                 }
 
             # 处理相同的文件夹
-            for folder_id, anime_info in anime_folders.items():
+            synced_files = {}
+            missing_files = []  # 需要获取播放连接的文件
+            sync_folder_ids = [
+                folder_id
+                for folder_id in anime_folders
+                if folder_id in cloud_folder_ids
+            ] + list(new_folders)
+            for folder_id in sync_folder_ids:
+                anime_info = anime_folders.get(folder_id) or new_folders[folder_id]
 
                 # 获取本地已有的文件列表，建立ID到播放链接的映射
                 existing_files = anime_info.get("files", [])
@@ -992,45 +815,64 @@ class PikPakService:
                 logger.debug(f"  找到 {len(files)} 个文件")
                 result = []
 
-                # 为每个文件夹获取播放连接
+                # 已有播放连接的直接沿用，其余在所有文件夹遍历完后一起获取
                 for file in files:
-                    if file["id"] in existing_file_map:
-                        original_file = existing_file_map[file["id"]]
-                        file_data = {
-                            "id": file["id"],
-                            "name": file["name"],
-                            "play_url": original_file["play_url"],
-                            "update_time": datetime.now().isoformat(),
-                        }
-                    else:
-                        # 获取播放连接
-                        play_url = await self.get_video_play_url(file["id"], client)
-                        api_call_count += 1
-
-                        # 检查是否需要延时
-                        if api_call_count % api_batch_size == 0:
-                            logger.info(
-                                f"      已调用 {api_call_count} 次API，延时 {api_delay} 秒..."
-                            )
-                            if blocking_wait:
-                                time.sleep(api_delay)
-                            else:
-                                await asyncio.sleep(api_delay)
-
-                        file_data = {
-                            "id": file["id"],
-                            "name": file["name"],
-                            "play_url": play_url,
-                            "update_time": datetime.now().isoformat(),
-                        }
+                    original_file = existing_file_map.get(file["id"])
+                    file_data = {
+                        "id": file["id"],
+                        "name": file["name"],
+                        "play_url": (
+                            original_file["play_url"] if original_file else None
+                        ),
+                        "update_time": datetime.now().isoformat(),
+                    }
+                    if original_file is None:
+                        missing_files.append(file_data)
                     result.append(file_data)
 
-                # 更新数据
-                anime_info["files"] = result
+                synced_files[folder_id] = result
+
+            # 并发获取新文件的播放连接
+            if missing_files:
+                logger.debug(f"  获取 {len(missing_files)} 个新文件的播放连接")
+                play_urls = await self.get_video_play_urls(
+                    client, [file["id"] for file in missing_files], on_result
+                )
+                for file_data in missing_files:
+                    file_data["play_url"] = play_urls.get(file_data["id"])
+
+            async def apply_sync():
+                """把同步结果合并到最新的本地数据"""
+                current = await self.anime_db.aload_data()
+                folders = current["animes"].setdefault(mypack_id, {})
 
-            # 保存数据
-            data["metadata"]["last_updated"] = datetime.now().isoformat()
-            self.anime_db.save_data(data)
+                for folder_id in del_folder_ids:
+                    folders.pop(folder_id, None)
+
+                for folder_id, folder_info in new_folders.items():
+                    folders.setdefault(folder_id, folder_info)
+
+                for folder_id, files in synced_files.items():
+                    anime_info = folders.get(folder_id)
+                    if anime_info is None:
+                        continue
+
+                    # 保留同步期间其他任务刷新过的播放链接
+                    current_files = {
+                        f.get("id"): f for f in anime_info.get("files", [])
+                    }
+                    for file in files:
+                        current_file = current_files.get(file["id"])
+                        if current_file and current_file.get("play_url"):
+                            file["play_url"] = current_file["play_url"]
+
+                    # 更新数据
+                    anime_info["files"] = files
+
+                # 保存数据
+                return self.anime_db.save_data(current)
+
+            await self.anime_db.write(apply_sync)
             logger.info("同步成功")
 
             # 启动并初始化调度器
@@ -1042,58 +884,3 @@ class PikPakService:
         except Exception as e:
             logger.critical(f"同步数据失败: {e}")
             return False
-
-    async def update_anime_episodes(
-        self, client: PikPakApi, anime_list: List[Dict], folder_id: str
-    ) -> Dict:
-        """
-        更新动漫集数
-
-        Args:
-            client: PikPak客户端
-            anime_list: 动漫列表,每个对象包含 {id, title, magnet}
-            folder_id: 目标文件夹ID
-
-        Returns:
-            success: 是否成功
-            message: 信息
-            added_count: 成功添加的集数
-            failed_count: 失败的集数
-        """
-        try:
-            # 分类处理：合集和单集
-            single_items = []
-
-            for anime in anime_list:
-                title = anime.get("title", "")
-                if is_collection(title):
-                    # 更新禁止使用合集
-                    raise ValidationException(
-                        message="更新动漫集数不支持合集，请使用单集更新"
-                    )
-                single_items.append(anime)
-
-            # 处理单集
-            # 转换 AnimeItem 对象为字典格式
-            items = []
-            for anime in single_items:
-                if hasattr(anime, "dict"):
-                    items.append(anime.dict())
-                else:
-                    items.append(anime)
-
-            # 下载
-            result = await self.batch_download(client, items, folder_id)
-            if not result["success"]:
-                raise SystemException(
-                    message="更新单集失败",
-                    original_error=result["message"],
-                )
-
-            return {
-                "single_count": len(single_items),
-            }
-
-        except Exception as e:
-            logger.critical(f"更新动漫异常: {e}")
-            raise SystemException(message="更新动漫失败", original_error=e)
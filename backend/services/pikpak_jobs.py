@@ -0,0 +1,275 @@
+"""
+PikPak 后台任务
+
+- 批量下载：提交下载 → 等待完成 → 重命名 → 同步
+- 同步数据
+- 更新播放链接
+
+各阶段按条目发布进度事件：submitted、downloaded、renamed、link_resolved、failed。
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from pikpakapi import PikPakApi
+
+from exceptions import DuplicateException, SystemException
+from services.clients import pikpak_clients
+from services.jobs import JobContext, job_queue
+from services.offline_tasks import PHASE_COMPLETE, offline_task_tracker
+from services.pikpak import PikPakService
+from utils import is_collection
+
+BATCH_DOWNLOAD = "batch_download"
+SYNC = "sync"
+UPDATE_LINKS = "update_links"
+
+
+async def _client(ctx: JobContext) -> Tuple[PikPakService, PikPakApi]:
+    """任务中只保存用户名，客户端从注册表按已保存的登录状态获取"""
+    client = await pikpak_clients.get_logged_in(ctx.payload["username"])
+    return PikPakService(), client
+
+
+def _link_events(ctx: JobContext) -> Callable[[str, Optional[str]], Awaitable[None]]:
+    """播放链接获取结果转为进度事件"""
+
+    async def on_result(file_id: str, play_url: Optional[str]):
+        if play_url:
+            await ctx.emit("link_resolved", file_id=file_id)
+        else:
+            await ctx.emit("failed", file_id=file_id, message="获取视频链接失败")
+
+    return on_result
+
+
+def _group_states(ctx: JobContext) -> List[Dict[str, Any]]:
+    """每个分组（季）的进度，第一次使用时初始化"""
+    groups = ctx.state.setdefault("groups", [])
+    for group in ctx.payload["groups"][len(groups) :]:
+        groups.append(
+            {"title": group["title"], "folder_id": group.get("folder_id"), "items": []}
+        )
+    return groups
+
+
+async def submit_stage(ctx: JobContext):
+    """检查重名、为单集创建文件夹并提交离线下载，每提交一个就保存进度"""
+    service, client = await _client(ctx)
+
+    for group, state in zip(ctx.payload["groups"], _group_states(ctx)):
+        title = group["title"]
+        collections = [a for a in group["anime_list"] if is_collection(a["title"])]
+        singles = [a for a in group["anime_list"] if not is_collection(a["title"])]
+
+        # 更新已有动漫时直接下载到该文件夹，不检查重名
+        if not state.get("checked") and not group.get("folder_id"):
+            folders = await service.get_mypack_folder_list(client)
+            if any(folder["name"] == title for folder in folders):
+                raise DuplicateException(
+                    resource="My Pack", field="folder_id", value=title
+                )
+            state["checked"] = True
+            await ctx.save()
+
+        if singles and not state["folder_id"]:
+            if state.get("creating"):
+                # 上次创建时出错，请求可能已经生效，存在同名文件夹时直接使用
+                folders = await service.get_mypack_folder_list(client, max_age=0)
+                state["folder_id"] = next(
+                    (f["id"] for f in folders if f["name"] == title), None
+                )
+            if not state["folder_id"]:
+                state["creating"] = True
+                await ctx.save()
+                # 同名文件夹已存在时抛出 DuplicateException，其他失败可以重试
+                state["folder_id"] = await service.create_anime_folder(client, title)
+            await ctx.save()
+
+        submitted = {item["magnet"] for item in state["items"]}
+        for anime in collections + singles:
+            if anime["magnet"] in submitted:
+                continue
+
+            collection = anime in collections
+            if collection:
+                result = await service.download_to_root(
+                    client, anime["magnet"], anime["title"]
+                )
+            else:
+                result = await service.download_to_folder(
+                    client, anime["magnet"], state["folder_id"], anime["title"]
+                )
+
+            state["items"].append(
+                {
+                    "title": anime["title"],
+                    "magnet": anime["magnet"],
+                    "collection": collection,
+                    "task": result.get("task"),
+                    "error": None if result["success"] else result["message"],
+                }
+            )
+            await ctx.save()
+
+            if result["success"]:
+                await ctx.emit(
+                    "submitted", title=anime["title"], task_id=result["task_id"]
+                )
+            else:
+                # 提交失败不会因为重试而成功的情况居多，记录后继续处理其余条目
+                logger.warning(result["message"])
+                await ctx.emit(
+                    "failed", title=anime["title"], message=result["message"]
+                )
+
+
+async def await_stage(ctx: JobContext):
+    """等待所有离线下载任务结束，每个任务结束时发布事件"""
+    _, client = await _client(ctx)
+
+    async def wait_one(item: Dict[str, Any]):
+        task = await offline_task_tracker.wait(client, item["task"])
+        if task is None:
+            item["result"] = {"phase": "TIMEOUT"}
+        else:
+            item["result"] = {
+                "phase": task.get("phase"),
+                "file_id": task.get("file_id"),
+                "file_name": task.get("file_name"),
+            }
+
+        if item["result"]["phase"] == PHASE_COMPLETE:
+            await ctx.emit(
+                "downloaded", title=item["title"], file_id=item["result"]["file_id"]
+            )
+        else:
+            await ctx.emit(
+                "failed",
+                title=item["title"],
+                message=f"下载未完成: {item['result']['phase']}",
+            )
+
+    await asyncio.gather(
+        *(
+            wait_one(item)
+            for state in _group_states(ctx)
+            for item in state["items"]
+            if item["task"] and "result" not in item
+        )
+    )
+    await ctx.save()
+
+
+async def rename_stage(ctx: JobContext):
+    """合集文件夹改为目标名称，并整理所有文件夹内的文件名"""
+    service, client = await _client(ctx)
+
+    for state in _group_states(ctx):
+        for item in state["items"]:
+            result = item.get("result") or {}
+            if (
+                not item["collection"]
+                or item.get("renamed")
+                or result.get("phase") != PHASE_COMPLETE
+                or not result.get("file_id")
+            ):
+                continue
+            if not await service.rename_folder(
+                client, result["file_id"], state["title"]
+            ):
+                raise SystemException(message=f"重命名文件夹失败: {state['title']}")
+            renamed = await service.batch_rename_file(client, result["file_id"])
+            item["renamed"] = True
+            await ctx.save()
+            await ctx.emit(
+                "renamed",
+                title=state["title"],
+                folder_id=result["file_id"],
+                renamed_count=len(renamed.get("renamed_files", [])),
+            )
+
+        if state["folder_id"] and not state.get("renamed"):
+            renamed = await service.batch_rename_file(client, state["folder_id"])
+            state["renamed"] = True
+            await ctx.save()
+            await ctx.emit(
+                "renamed",
+                title=state["title"],
+                folder_id=state["folder_id"],
+                renamed_count=len(renamed.get("renamed_files", [])),
+            )
+
+
+async def sync_stage(ctx: JobContext):
+    """同步云端数据到本地数据库，新文件获取播放连接时发布事件"""
+    service, client = await _client(ctx)
+    if not await service.sync_data(client, _link_events(ctx)):
+        raise SystemException(message="同步数据失败")
+
+
+async def update_links_stage(ctx: JobContext):
+    """获取播放连接并写入数据库"""
+    service, client = await _client(ctx)
+    ctx.state["result"] = await service.update_file_links(
+        client, ctx.payload["folder_id"], ctx.payload["file_ids"], _link_events(ctx)
+    )
+    await ctx.save()
+
+
+job_queue.register(
+    BATCH_DOWNLOAD,
+    [
+        ("submit", submit_stage),
+        ("await", await_stage),
+        ("rename", rename_stage),
+        ("sync", sync_stage),
+    ],
+)
+job_queue.register(SYNC, [("sync", sync_stage)])
+job_queue.register(UPDATE_LINKS, [("resolve", update_links_stage)])
+
+
+async def submit_batch_download(
+    username: str,
+    groups: List[Dict[str, Any]],
+    idempotency_key: Optional[str] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    提交批量下载任务
+
+    Args:
+        username: PikPak 用户名
+        groups: [{title, anime_list: [{id, title, magnet}], folder_id?}]，
+            每组对应一个文件夹，指定 folder_id 时下载到已有的文件夹
+        idempotency_key: 幂等键，相同的键只创建一个任务
+
+    Returns:
+        (任务信息, 是否新建)
+    """
+    payload = {"username": username, "groups": groups}
+    return await job_queue.submit(BATCH_DOWNLOAD, payload, idempotency_key)
+
+
+async def submit_sync(
+    username: str, idempotency_key: Optional[str] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """提交同步数据任务"""
+    payload = {"username": username}
+    return await job_queue.submit(SYNC, payload, idempotency_key)
+
+
+async def submit_update_links(
+    username: str,
+    folder_id: str,
+    file_ids: List[str],
+    idempotency_key: Optional[str] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """提交更新播放链接任务"""
+    payload = {
+        "username": username,
+        "folder_id": folder_id,
+        "file_ids": file_ids,
+    }
+    return await job_queue.submit(UPDATE_LINKS, payload, idempotency_key)
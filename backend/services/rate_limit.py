@@ -0,0 +1,114 @@
+"""
+PikPak API 限流
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    每秒补充 rate 个令牌，最多积攒 burst 个；取不到令牌的调用按到达顺序等待。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+        # 统计
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def configure(self, rate: float, burst: int):
+        """修改速率和容量，已积攒的令牌不超过新容量"""
+        self._refill()
+        self.rate = rate
+        self.burst = burst
+        self.tokens = min(self.tokens, burst)
+
+    async def acquire(self):
+        """取一个令牌，不足时等待"""
+        # 持锁等待，保证先到先得
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                start = time.monotonic()
+                while self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    self._refill()
+                self.waited += 1
+                self.wait_seconds += time.monotonic() - start
+            self.tokens -= 1
+            self.acquired += 1
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "tokens": round(self.tokens, 2),
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class PikPakRateLimiter:
+    """
+    按账号限流的 PikPak API 调用
+
+    同一账号的所有调用共用一个令牌桶，速率和突发容量来自配置，运行中可以调整。
+    """
+
+    def __init__(self, rate_per_minute: float = None, burst: int = None):
+        self.rate_per_minute = rate_per_minute or settings.API_RATE_LIMIT
+        self.burst = burst or settings.API_RATE_BURST
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def _bucket(self, account: str) -> TokenBucket:
+        bucket = self._buckets.get(account)
+        if bucket is None:
+            bucket = TokenBucket(self.rate_per_minute / 60, self.burst)
+            self._buckets[account] = bucket
+        return bucket
+
+    async def acquire(self, account: str):
+        """调用 PikPak API 前取一个令牌"""
+        await self._bucket(account).acquire()
+
+    def configure(
+        self, rate_per_minute: Optional[float] = None, burst: Optional[int] = None
+    ):
+        """调整速率（每分钟请求数）和突发容量，立即对所有账号生效"""
+        if rate_per_minute is not None:
+            self.rate_per_minute = rate_per_minute
+        if burst is not None:
+            self.burst = burst
+        for bucket in self._buckets.values():
+            bucket.configure(self.rate_per_minute / 60, self.burst)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取限流配置和各账号的等待情况"""
+        return {
+            "rate_per_minute": self.rate_per_minute,
+            "burst": self.burst,
+            "accounts": {
+                account: bucket.stats() for account, bucket in self._buckets.items()
+            },
+        }
+
+
+# 全局限流器实例
+pikpak_limiter = PikPakRateLimiter()
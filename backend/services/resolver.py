@@ -0,0 +1,181 @@
+"""
+播放链接并发解析
+"""
+
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from loguru import logger
+
+from config.settings import settings
+
+
+class Overloaded(Exception):
+    """
+    请求被限流或超时，说明并发过高，并发上限减半
+
+    retryable 为 False 表示底层客户端已经重试过（超时、连接错误），这里不再重试
+    """
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class AdaptiveLimit:
+    """
+    AIMD 并发上限
+
+    每成功 limit 次（约一轮）上限加 1，遇到限流或超时时上限减半；
+    文件不存在等与负载无关的错误不调整上限。
+    """
+
+    def __init__(self, initial: int = None, minimum: int = None, maximum: int = None):
+        self.minimum = minimum or settings.PLAY_URL_CONCURRENCY_MIN
+        self.maximum = maximum or settings.PLAY_URL_CONCURRENCY_MAX
+        self.limit = max(
+            self.minimum,
+            min(self.maximum, initial or settings.PLAY_URL_CONCURRENCY_START),
+        )
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+        # 统计
+        self.increases = 0
+        self.decreases = 0
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, ok: Optional[bool]):
+        """ok 为 None 表示与负载无关的失败，不调整上限"""
+        async with self._cond:
+            self.in_flight -= 1
+            if ok is None:
+                pass
+            elif ok:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+                    self.increases += 1
+            else:
+                self._successes = 0
+                if self.limit > self.minimum:
+                    self.limit = max(self.minimum, self.limit // 2)
+                    self.decreases += 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
+def backoff_delay(attempt: int) -> float:
+    """第 attempt 次重试前的等待时间：指数退避加随机抖动"""
+    delay = min(settings.PLAY_URL_BACKOFF_MAX, settings.PLAY_URL_BACKOFF * (2**attempt))
+    return random.uniform(delay / 2, delay)
+
+
+class PlayUrlResolver:
+    """
+    并发获取播放链接
+
+    同一账号共用一个 AIMD 并发上限，跨批次保留。只有限流才在这里按抖动的指数退避重试，
+    超时和连接错误由 PikPakApi 内部重试，其他错误不重试；失败的文件结果为 None。
+    调用仍经过账号令牌桶限流。
+    """
+
+    def __init__(self):
+        self._limits: Dict[str, AdaptiveLimit] = {}
+        self.retries = 0
+        self.failures = 0
+
+    def _limit(self, account: str) -> AdaptiveLimit:
+        limit = self._limits.get(account)
+        if limit is None:
+            limit = AdaptiveLimit()
+            self._limits[account] = limit
+        return limit
+
+    async def resolve(
+        self,
+        account: str,
+        file_ids: Iterable[str],
+        fetch: Callable[[str], Awaitable[Optional[str]]],
+        on_result: Optional[Callable[[str, Optional[str]], Awaitable[None]]] = None,
+    ) -> Dict[str, Optional[str]]:
+        """
+        获取一批文件的播放链接
+
+        Args:
+            account: 账号，决定共用的并发上限
+            file_ids: 文件ID列表
+            fetch: 获取单个文件播放链接，限流或超时抛出 Overloaded，其他失败抛出异常，
+                文件没有链接时返回 None
+            on_result: 每个文件得到结果后等待 on_result(文件ID, 播放链接或 None)
+
+        Returns:
+            {文件ID: 播放链接或 None}，顺序与 file_ids 一致
+        """
+        file_ids = list(dict.fromkeys(file_ids))
+        limit = self._limit(account)
+
+        async def resolve_one(file_id: str) -> Optional[str]:
+            for attempt in range(settings.PLAY_URL_RETRIES + 1):
+                await limit.acquire()
+                try:
+                    play_url = await fetch(file_id)
+                except Overloaded as e:
+                    await limit.release(False)
+                    if not e.retryable or attempt == settings.PLAY_URL_RETRIES:
+                        self.failures += 1
+                        logger.warning(f"获取播放链接失败 {file_id}: {e}")
+                        return None
+                    self.retries += 1
+                    await asyncio.sleep(backoff_delay(attempt))
+                except Exception as e:
+                    # 文件不存在、参数错误等，重试也不会成功，也不说明并发过高
+                    await limit.release(None)
+                    self.failures += 1
+                    logger.warning(f"获取播放链接失败 {file_id}: {e}")
+                    return None
+                else:
+                    await limit.release(True)
+                    return play_url
+
+        # 最多 maximum 个工作协程取任务，实际并发由 limit 控制
+        results: Dict[str, Optional[str]] = dict.fromkeys(file_ids)
+        pending = iter(file_ids)
+
+        async def worker():
+            for file_id in pending:
+                results[file_id] = await resolve_one(file_id)
+                if on_result is not None:
+                    await on_result(file_id, results[file_id])
+
+        await asyncio.gather(
+            *(worker() for _ in range(min(limit.maximum, len(file_ids))))
+        )
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "failures": self.failures,
+            "accounts": {
+                account: limit.stats() for account, limit in self._limits.items()
+            },
+        }
+
+
+# 全局播放链接解析器实例
+play_url_resolver = PlayUrlResolver()
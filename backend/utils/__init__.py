@@ -3,6 +3,8 @@ from .responses import (
     bad_request,
     not_found,
     server_error,
+    encode_success,
+    encoded_response,
 )
 from .analyzer import (
     is_include_subtitles,
@@ -16,6 +18,8 @@ __all__ = [
     "bad_request",
     "not_found",
     "server_error",
+    "encode_success",
+    "encoded_response",
     "is_include_subtitles",
     "is_collection",
     "get_anime_episodes",
@@ -0,0 +1,46 @@
+"""
+HTTP 条件请求（ETag / Cache-Control）
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from config.settings import settings
+
+
+def make_etag(request: Request, version: Any) -> str:
+    """
+    由数据版本和请求地址（路径与查询参数）生成 ETag
+
+    只依赖数据版本，内容相同时各进程、重启前后生成的 ETag 相同
+    """
+    raw = f"{version}|{request.url.path}?{request.url.query}"
+    return '"' + hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+def _cache_headers(etag: str, route: str) -> dict:
+    headers = {"ETag": etag}
+    cache_control = settings.CACHE_CONTROL.get(route)
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return headers
+
+
+def not_modified(request: Request, etag: str, route: str) -> Optional[Response]:
+    """If-None-Match 命中时返回 304，否则返回 None"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if "*" in candidates or etag in candidates:
+        return Response(status_code=304, headers=_cache_headers(etag, route))
+    return None
+
+
+def with_cache_headers(response: Response, etag: str, route: str) -> Response:
+    """为响应加上 ETag 和该路由的 Cache-Control"""
+    response.headers.update(_cache_headers(etag, route))
+    return response
@@ -0,0 +1,99 @@
+"""
+预编码响应缓存
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from config.settings import settings
+
+
+class ResponseCache:
+    """
+    已编码响应体的 LRU 缓存
+
+    每条缓存记录生成时的数据版本（文件夹版本或列表版本），版本变化后视为未命中并重新生成；
+    按条数和总字节数淘汰最久未使用的记录。
+    """
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None):
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_SIZE
+        self.max_bytes = max_bytes or settings.RESPONSE_CACHE_MAX_BYTES
+        self._entries: OrderedDict[Hashable, Tuple[Any, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: Any) -> Optional[bytes]:
+        """获取与 version 一致的响应体"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            if entry is not None:
+                self.stale += 1
+            return None
+
+    def put(self, key: Hashable, version: Any, body: bytes) -> bytes:
+        """缓存响应体并返回它"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[1])
+            if len(body) <= self.max_bytes:
+                self._entries[key] = (version, body)
+                self.bytes += len(body)
+                self._evict()
+        return body
+
+    async def get_or_build(
+        self, key: Hashable, version: Any, build: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        """命中时直接返回，否则调用 build 生成并缓存"""
+        body = self.get(key, version)
+        if body is None:
+            body = self.put(key, version, await build())
+        return body
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries or self.bytes > self.max_bytes
+        ):
+            _, (_, body) = self._entries.popitem(last=False)
+            self.bytes -= len(body)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """获取命中率和内存占用"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# 全局响应缓存实例
+response_cache = ResponseCache()
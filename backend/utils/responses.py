@@ -1,4 +1,6 @@
+from fastapi import Response
 from fastapi.responses import JSONResponse
+from collections.abc import Mapping
 from typing import Any
 from datetime import datetime
 from pydantic import BaseModel
@@ -12,7 +14,8 @@ def _serialize_data(data: Any) -> Any:
         return data.model_dump()
     elif isinstance(data, list):
         return [_serialize_data(item) for item in data]
-    elif isinstance(data, dict):
+    elif isinstance(data, Mapping):
+        # 包括数据库中的紧凑文件记录
         return {key: _serialize_data(value) for key, value in data.items()}
     else:
         return data
@@ -37,6 +40,18 @@ def success(data: Any = None, msg: str = "操作成功") -> JSONResponse:
     return api_response(200, msg, data)
 
 
+def encode_success(data: Any = None, msg: str = "操作成功") -> bytes:
+    """编码成功响应体（与 success 相同），供响应缓存保存"""
+    return success(data, msg).body
+
+
+def encoded_response(body: bytes, status_code: int = 200) -> Response:
+    """直接发送已编码的 JSON 响应体"""
+    return Response(
+        content=body, status_code=status_code, media_type="application/json"
+    )
+
+
 def bad_request(msg: str = "参数错误") -> JSONResponse:
     """参数错误 - 400"""
     return api_response(400, msg, None)
@@ -0,0 +1,106 @@
+"""
+流式 JSON 响应
+"""
+
+import json
+from collections.abc import Mapping
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Union
+
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from config.settings import settings
+from exceptions import ValidationException
+
+# 支持的流式格式: json 为完整的 JSON 文档，ndjson 为每行一个元素
+STREAM_FORMATS = ("json", "ndjson")
+
+_END = object()
+
+
+async def _aiter(items: Union[Iterable, AsyncIterator]) -> AsyncIterator:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def _plain(value: Any) -> Dict[str, Any]:
+    """数据库中的紧凑文件记录按字典编码"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_plain)
+
+
+def check_format(fmt: Optional[str]) -> str:
+    """校验 format 参数"""
+    fmt = fmt or "json"
+    if fmt not in STREAM_FORMATS:
+        raise ValidationException(
+            f"不支持的格式: {fmt}，可选: {', '.join(STREAM_FORMATS)}"
+        )
+    return fmt
+
+
+async def stream_response(
+    items: Union[Iterable, AsyncIterator],
+    fmt: str = "json",
+    head: Optional[Dict[str, Any]] = None,
+    tail: Optional[Callable[[int], Dict[str, Any]]] = None,
+    data_key: str = "data",
+) -> StreamingResponse:
+    """
+    逐个编码列表元素并分块发送，内存中只保留当前块
+
+    json 模式输出 {**head, data_key: [...], **tail(count)}，与一次性返回的响应等价；
+    tail 在全部元素发送完后调用，可以带上总数等只有遍历结束才知道的字段。
+    ndjson 模式每行一个元素，不包含 head/tail。
+
+    第一个元素在响应开始前取出，因此数据源在开始阶段抛出的异常仍按普通错误响应返回；
+    发送过程中出错只能中断响应。
+    """
+    fmt = check_format(fmt)
+    iterator = _aiter(items)
+    first = await anext(iterator, _END)
+
+    async def body():
+        chunk = []
+        size = 0
+        count = 0
+        try:
+            if fmt == "json":
+                prefix = _dumps(head or {})[:-1]
+                chunk.append(f'{prefix}{"," if head else ""}"{data_key}":[')
+
+            item = first
+            while item is not _END:
+                text = _dumps(item)
+                if fmt == "ndjson":
+                    text += "\n"
+                elif count:
+                    text = "," + text
+                chunk.append(text)
+                size += len(text)
+                count += 1
+                if size >= settings.STREAM_CHUNK_SIZE:
+                    yield "".join(chunk).encode("utf-8")
+                    chunk, size = [], 0
+                item = await anext(iterator, _END)
+
+            if fmt == "json":
+                extra = _dumps(tail(count) if tail else {})[1:]
+                chunk.append("]" + ("," + extra if extra != "}" else "}"))
+            if chunk:
+                yield "".join(chunk).encode("utf-8")
+        except Exception as e:
+            logger.error(f"流式响应中断: {e}")
+            raise
+
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    return StreamingResponse(body(), media_type=media_type)